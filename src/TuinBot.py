@@ -1,3 +1,6 @@
+# First import, measures the others.
+from core.monitoring.startup import StartupTimer
+
 from discord import Intents
 
 from application.command.memo_command import MemoCommand
@@ -6,11 +9,22 @@ from application.command.reply_command import ReplyMessageCommand
 from application.command.spoil_command import AutoSpoilerCommand
 from application.command.tuin_command import TuinBotCommand
 from application.command.typing_mess_command import TypingMessageCommand
-from core.client.bot import DiscordBot
+from application.database.db_invalidation import DbInvalidationLog
+from core.client.bot import create_bot
+from core.cluster.worker import ClusterWorker
 from core.command.repository import CommandRepository
+from core.data.invalidation import InvalidationBus
 from core.data.properties import AppProperties
 
+StartupTimer.mark("imports")
+
 AppProperties.load("../data/bot.properties")
+# Set when started by launcher.py.
+ClusterWorker.load_environment()
+
+if AppProperties.invalidation_poll_interval():
+    InvalidationBus.configure(DbInvalidationLog(), AppProperties.invalidation_poll_interval())
+StartupTimer.mark("config")
 
 CommandRepository.set_command_list(TuinBotCommand,
                                    ReplyMessageCommand,
@@ -18,11 +32,12 @@ CommandRepository.set_command_list(TuinBotCommand,
                                    AutoReactionCommand,
                                    AutoSpoilerCommand,
                                    MemoCommand)
+StartupTimer.mark("validation")
 
 intents = Intents.default()
 intents.members = True
 intents.typing = True
 # intents.presences = True
 
-bot = DiscordBot(activity_name=TuinBotCommand.name(), intents=intents)
+bot = create_bot(TuinBotCommand.name(), intents=intents)
 bot.run(AppProperties.bot_token())
@@ -5,7 +5,10 @@ from discord import Message
 from application.database.db_memo import DbMemo
 from application.message.messages import AppMessages
 from application.param.app_params import ApplicationParams
+from core.client.deletion import DeletionScheduler
+from core.client.outbound import OutboundQueue, ActionPriority
 from core.command.base import BaseCommand
+from core.data.properties import AppProperties
 from core.executor.executors import TextParamExecutor, FixedValueParamExecutor, IntParamExecutor
 from core.param.params import CommandParam, ParamType, TextMinMaxParamConfig, NumberMinMaxParamConfig
 from core.param.syntax import CommandSyntax
@@ -13,10 +16,6 @@ from core.utils.parsing_utils import ParsingUtils
 
 
 class MemoCommand(BaseCommand):
-    _MAX_PER_USER = 20
-    _MAX_LINES = 10
-    _MAX_CHARS = 1000
-
     _DELETE_DELAY = 20
 
     @staticmethod
@@ -29,10 +28,11 @@ class MemoCommand(BaseCommand):
 
     @classmethod
     def description_details(cls) -> [str, None]:
-        return "Tu peux enregistrer {} mémos.".format(cls._MAX_PER_USER)
+        return "Tu peux enregistrer {} mémos.".format(AppProperties.config().memo_max_per_user)
 
     @classmethod
     def _build_syntaxes(cls) -> List[CommandSyntax]:
+        config = AppProperties.config()
         # Limit to 3 chars only when creating memo.
         name_param_creation = CommandParam("nom", "Nom du mémo", ParamType.TEXT, TextMinMaxParamConfig(3))
         name_param_use = CommandParam("nom", "Nom *exact* du mémo", ParamType.TEXT)
@@ -46,7 +46,7 @@ class MemoCommand(BaseCommand):
                           CommandParam(ApplicationParams.SENTENCE.name,
                                        ApplicationParams.SENTENCE.description,
                                        ParamType.TEXT,
-                                       TextMinMaxParamConfig(max_length=cls._MAX_CHARS))
+                                       TextMinMaxParamConfig(max_length=config.memo_max_chars))
                           ),
             CommandSyntax("Lis un mémo",
                           cls._get_memo,
@@ -67,14 +67,14 @@ class MemoCommand(BaseCommand):
                           name_part_param,
                           CommandParam("ligne", "", ParamType.FIXED_VALUE),
                           CommandParam("numéro", "Numéro de la ligne", ParamType.INT,
-                                       NumberMinMaxParamConfig(1, cls._MAX_LINES))
+                                       NumberMinMaxParamConfig(1, config.memo_max_lines))
                           ),
             CommandSyntax("Supprime une ligne d'un mémo",
                           cls._remove_memo_line,
                           name_param_use,
                           CommandParam("ligne", "", ParamType.FIXED_VALUE),
                           CommandParam("numéro", "Numéro de la ligne", ParamType.INT,
-                                       NumberMinMaxParamConfig(1, cls._MAX_LINES)),
+                                       NumberMinMaxParamConfig(1, config.memo_max_lines)),
                           delete_param
                           ),
             CommandSyntax("Supprime un mémo",
@@ -90,10 +90,11 @@ class MemoCommand(BaseCommand):
     def _add_memo(cls, message: Message, name_executor: TextParamExecutor, content_executor: TextParamExecutor):
         memo_count = DbMemo.count_user_memos(message.author.id)
 
-        if memo_count >= cls._MAX_PER_USER:
+        max_per_user = AppProperties.config().memo_max_per_user
+        if memo_count >= max_per_user:
             cls._reply(message, ("Tu as déjà enregistré {} mémos, dis-donc tu ne crois pas "
                                  "qu'il serait temps de faire un peu de ménage ? :smirk:"
-                                 ).format(cls._MAX_PER_USER)
+                                 ).format(max_per_user)
                        )
             return
 
@@ -130,17 +131,18 @@ class MemoCommand(BaseCommand):
             cls._display_error(message, "Aucun mémo trouvé commençant par `{}`.".format(name_executor.get_text()))
             return
 
+        config = AppProperties.config()
         line_count = len(memo.lines)
-        if line_count >= cls._MAX_LINES:
+        if line_count >= config.memo_max_lines:
             cls._display_error(message, "Le mémo [**{}**] fait déjà {} lignes, tu ne peux plus rien rajouter.".format(
-                name_executor.get_text(), cls._MAX_LINES))
+                name_executor.get_text(), config.memo_max_lines))
             return
 
         total_char_count = len("".join(memo.lines)) + len(content_executor.get_text())
-        if total_char_count > cls._MAX_CHARS:
+        if total_char_count > config.memo_max_chars:
             cls._display_error(message,
                                "Le mémo [**{}**] va dépasser les {} caractères, il faut en créer un autre.".format(
-                                   name_executor.get_text(), cls._MAX_CHARS))
+                                   name_executor.get_text(), config.memo_max_chars))
             return
 
         if cls._execute_db_bool_request(lambda: DbMemo.edit_memo(message.author.id,
@@ -176,11 +178,11 @@ class MemoCommand(BaseCommand):
         if "*" not in memo_line:
             memo_line = f"**{memo_line}**"
 
-        cls._async(
-            message.channel.send(
-                embed=AppMessages.get_memo_line_embed(memo_line,
-                                                      f"Mémo de {message.author.display_name}")))
-        cls._async(message.delete(delay=cls._delete_delay))
+        OutboundQueue.send(message.channel,
+                           embed=AppMessages.get_memo_line_embed(memo_line,
+                                                                 f"Mémo de {message.author.display_name}"),
+                           priority=ActionPriority.COMMAND)
+        DeletionScheduler.schedule(message, cls._delete_delay)
 
     # noinspection PyUnusedLocal
     @classmethod
@@ -243,7 +245,7 @@ class MemoCommand(BaseCommand):
             cls._reply(message,
                        AppMessages.get_memo_embed("Mes mémos",
                                                   "\u00A0\u0020\u00A0".join(memo_list_str),
-                                                  "{} / {}".format(len(memos), cls._MAX_PER_USER)
+                                                  "{} / {}".format(len(memos), AppProperties.config().memo_max_per_user)
                                                   ),
                        cls._DELETE_DELAY
                        )
@@ -1,11 +1,16 @@
+import asyncio
 from typing import List
 
-from discord import Message, User
+from discord import Message, User, TextChannel
 
 from application.database.db_reaction import DbAutoReaction
 from application.param.app_params import ApplicationParams
+from core.client.deletion import DeletionScheduler
+from core.client.outbound import OutboundQueue
+from core.client.permissions import PermissionCache
 from core.command.base import BaseCommand
 from core.command.types import HookType
+from core.data.properties import AppProperties
 from core.executor.executors import UserParamExecutor, EmojiParamExecutor, FixedValueParamExecutor
 from core.param.params import CommandParam, ParamType
 from core.param.syntax import CommandSyntax
@@ -13,9 +18,6 @@ from core.utils.sanitizer import Sanitizer
 
 
 class AutoReactionCommand(BaseCommand):
-    _MAX_REACTION_PER_TARGET = 6
-    _SHOTS = 10
-
     @staticmethod
     def name() -> str:
         return "reac"
@@ -26,9 +28,11 @@ class AutoReactionCommand(BaseCommand):
 
     @classmethod
     def description_details(cls) -> [str, None]:
-        return (f"La réaction dure {cls._SHOTS} messages et n'apparaît que dans le salon où la commande a été tapée."
+        config = AppProperties.config()
+        return (f"La réaction dure {config.reaction_shots} messages"
+                " et n'apparaît que dans le salon où la commande a été tapée."
                 " Tu peux mettre 1 réaction par tuin,"
-                f" et un tuin peut avoir au maximum {cls._MAX_REACTION_PER_TARGET} réactions sur lui."
+                f" et un tuin peut avoir au maximum {config.reaction_max_per_target} réactions sur lui."
                 )
 
     @classmethod
@@ -66,7 +70,7 @@ class AutoReactionCommand(BaseCommand):
         reaction_count = DbAutoReaction.count_total_target_reactions(message.guild.id,
                                                                      user_executor.get_user().id,
                                                                      message.author.id)
-        if reaction_count >= cls._MAX_REACTION_PER_TARGET:
+        if reaction_count >= AppProperties.config().reaction_max_per_target:
             cls._reply(message,
                        "Le tuin **{}** a déjà {} réactions sur lui, laissons-le respirer un peu.".format(
                            Sanitizer.user_name(user_executor.get_user().display_name), reaction_count)
@@ -89,7 +93,7 @@ class AutoReactionCommand(BaseCommand):
                                                                          message.author.id,
                                                                          user_executor.get_user().id,
                                                                          emoji_executor.get_emoji(),
-                                                                         cls._SHOTS),
+                                                                         AppProperties.config().reaction_shots),
                                         message):
             cls._reply(message,
                        "Réaction %s ajoutée à **%s** !" % (
@@ -131,8 +135,8 @@ class AutoReactionCommand(BaseCommand):
         reactions_string = []
         for reaction in total_reactions:
             user: User = message.guild.get_member(reaction.author_id)
-            user_name = Sanitizer.user_name_special_quotes(user.display_name)
-            user_part = f"`{user_name}`" if user else ""
+            # Not cached if author left, or wasn't active lately with lazy member cache.
+            user_part = f"`{Sanitizer.user_name_special_quotes(user.display_name)}`" if user else ""
             reactions_string.append(f"{reaction.emoji} {user_part}")
 
         reactions_part = " : %s" % " ".join(reactions_string) if total_reactions else ""
@@ -153,8 +157,20 @@ class AutoReactionCommand(BaseCommand):
     def hook_type() -> HookType:
         return HookType.MESSAGE
 
+    @staticmethod
+    def hook_is_cosmetic() -> bool:
+        return True
+
+    @classmethod
+    def has_message_hook_action(cls, message: Message) -> bool:
+        return DbAutoReaction.has_auto_reactions(message.guild.id, message.author.id, message.channel.id)
+
     @classmethod
     def execute_message_hook(cls, message: Message) -> bool:
+        # Checked before using reactions, so they are kept for a channel where we can react.
+        if not cls._can_react(message.channel):
+            return False
+
         reactions = DbAutoReaction.use_auto_reactions(message.guild.id,
                                                       message.author.id,
                                                       message.channel.id)
@@ -164,8 +180,18 @@ class AutoReactionCommand(BaseCommand):
 
         return False
 
+    @staticmethod
+    def _can_react(channel: TextChannel) -> bool:
+        permissions = PermissionCache.get_permissions(channel)
+        return permissions.add_reactions and permissions.read_message_history
+
     @classmethod
     async def _execute_hook_async(cls, message: Message, reactions: List[str]):
-        # Note: when message is spoiled, addind reaction triggers an error cause message is deleted
-        for reaction in reactions:
-            await message.add_reaction(reaction)
+        # Adding a reaction to a deleted message triggers an error.
+        if DeletionScheduler.is_scheduled(message.id):
+            return
+
+        # Reactions are sent concurrently, the outbound queue handles the rate limit.
+        # Errors are already printed by the queue.
+        await asyncio.gather(*[OutboundQueue.add_reaction(message, reaction) for reaction in reactions],
+                             return_exceptions=True)
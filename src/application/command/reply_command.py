@@ -5,17 +5,19 @@ from discord import Message
 from application.database.db_reply import DbAutoReply, AutoReply
 from application.message.messages import AppMessages
 from application.param.app_params import ApplicationParams
+from core.client.members import MemberCache
+from core.client.outbound import OutboundQueue, ActionPriority
 from core.command.base import BaseCommand
 from core.command.types import HookType
+from core.data.properties import AppProperties
 from core.executor.executors import TextParamExecutor, UserParamExecutor, FixedValueParamExecutor
 from core.param.syntax import CommandSyntax
 from core.utils.parsing_utils import ParsingUtils
 from core.utils.sanitizer import Sanitizer
+from core.utils.utils import Utils
 
 
 class ReplyMessageCommand(BaseCommand):
-    _MAX_PER_USER = 2
-
     @staticmethod
     def name() -> str:
         return "rep"
@@ -29,7 +31,7 @@ class ReplyMessageCommand(BaseCommand):
         return ("Le message n'apparaîtra que dans le salon où la commande a été tapée."
                 " Tu peux laisser 1 message par tuin,"
                 " et un tuin peut avoir au maximum {} message(s) planifié(s) sur lui."
-                ).format(cls._MAX_PER_USER)
+                ).format(AppProperties.config().reply_max_per_user)
 
     @classmethod
     def _build_syntaxes(cls) -> List[CommandSyntax]:
@@ -57,7 +59,7 @@ class ReplyMessageCommand(BaseCommand):
     def _add_reply(cls, message: Message, user_executor: UserParamExecutor, text_executor: TextParamExecutor):
         reply_count = DbAutoReply.count_auto_replys(message.guild.id, user_executor.get_user().id, message.author.id)
 
-        if reply_count >= cls._MAX_PER_USER:
+        if reply_count >= AppProperties.config().reply_max_per_user:
             cls._reply(
                 message,
                 "Oups, il y a déjà {} message(s) enregistré(s) pour **{}**, il va falloir attendre ton tour !".format(
@@ -116,6 +118,10 @@ class ReplyMessageCommand(BaseCommand):
     def hook_type() -> HookType:
         return HookType.MESSAGE
 
+    @classmethod
+    def has_message_hook_action(cls, message: Message) -> bool:
+        return DbAutoReply.has_auto_replys(message.guild.id, message.channel.id, message.author.id)
+
     @classmethod
     def execute_message_hook(cls, message: Message) -> bool:
         messages = DbAutoReply.use_auto_replys(message.guild.id, message.channel.id, message.author.id)
@@ -127,12 +133,14 @@ class ReplyMessageCommand(BaseCommand):
 
     @classmethod
     async def _execute_hook_async(cls, message: Message, messages: List[AutoReply]):
-        for text_message in messages:
-            author = message.guild.get_member(text_message.author_id)
-            embed = AppMessages.get_recorded_message_embed(
-                text_message.message,
-                message.author.id,
-                None if not author else author.display_name
-            )
+        authors = {author_id: await MemberCache.fetch_member(message.guild, author_id)
+                   for author_id in {text_message.author_id for text_message in messages}}
+
+        embeds = [AppMessages.get_recorded_message_embed(text_message.message,
+                                                         message.author.id,
+                                                         AppMessages.get_display_name(authors[text_message.author_id]))
+                  for text_message in messages]
 
-            await message.reply(embed=embed)
+        # Several messages recorded for the same target are sent together.
+        for embeds_chunk in Utils.chunks(embeds, OutboundQueue.MAX_EMBEDS_PER_MESSAGE):
+            await OutboundQueue.reply(message, priority=ActionPriority.HOOK, embeds=embeds_chunk)
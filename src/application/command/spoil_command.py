@@ -5,6 +5,8 @@ from discord import Message, User
 from application.database.db_spoiler import DbAutoSpoiler
 from application.message.messages import AppMessages
 from application.param.app_params import ApplicationParams
+from core.client.deletion import DeletionScheduler
+from core.client.outbound import OutboundQueue, ActionPriority
 from core.command.base import BaseCommand
 from core.command.types import HookType
 from core.executor.executors import UserParamExecutor, FixedValueParamExecutor
@@ -111,6 +113,12 @@ class AutoSpoilerCommand(BaseCommand):
     def hook_type() -> HookType:
         return HookType.MESSAGE
 
+    @classmethod
+    def has_message_hook_action(cls, message: Message) -> bool:
+        return cls._can_execute_hook(message) and DbAutoSpoiler.has_auto_spoiler(message.guild.id,
+                                                                                 message.channel.id,
+                                                                                 message.author.id)
+
     @classmethod
     def execute_message_hook(cls, message: Message) -> bool:
         if not cls._can_execute_hook(message):
@@ -165,5 +173,6 @@ class AutoSpoilerCommand(BaseCommand):
         if message.attachments and message.attachments[0].width:
             embed.set_image(url=message.attachments[0].proxy_url)
 
-        await message.channel.send(embed=embed)
-        await message.delete()
+        await OutboundQueue.send(message.channel, embed=embed, priority=ActionPriority.HOOK)
+        # Through the scheduler, so other hooks know this message is being deleted.
+        DeletionScheduler.schedule(message, 0)
@@ -1,13 +1,29 @@
-from typing import List, Union
+import io
+from typing import List, Union, Optional
 
-from discord import Embed
+from discord import Embed, Message, File
 
+from core.client.members import GuildMemberReport
+from core.client.outbound import OutboundQueue
+from core.client.shards import ShardMonitor, ShardReport
+from core.cluster.protocol import ClusterError
+from core.cluster.worker import ClusterWorker
 from core.command.base import BaseCommand
 from core.command.repository import CommandRepository
+from core.data.properties import AppProperties
+from core.executor.executors import FixedValueParamExecutor, IntParamExecutor
+from core.monitoring.loop_lag import LoopLagSampler
+from core.monitoring.profiler import LiveProfiler
+from core.monitoring.slow_callbacks import SlowCallbackMonitor
+from core.param.params import CommandParam, ParamType, NumberMinMaxParamConfig
 from core.param.syntax import CommandSyntax
+from core.utils.clock import Clock
 
 
 class TuinBotCommand(BaseCommand):
+    _SLOW_CALLBACKS_DISPLAYED = 5
+    _GUILDS_DISPLAYED = 10
+    _MAX_PROFILE_SECONDS = 300
 
     @staticmethod
     def name() -> str:
@@ -19,7 +35,31 @@ class TuinBotCommand(BaseCommand):
 
     @classmethod
     def _build_syntaxes(cls) -> List[CommandSyntax]:
-        return []
+        # Admin syntaxes, not displayed in help.
+        return [
+            CommandSyntax("Affiche le lag de la boucle d'événements",
+                          cls._display_lag,
+                          CommandParam("lag", "", ParamType.FIXED_VALUE)
+                          ),
+            CommandSyntax("Profile le bot pendant quelques secondes",
+                          cls._profile,
+                          CommandParam("profile", "", ParamType.FIXED_VALUE),
+                          CommandParam("secondes", "Durée du profilage", ParamType.INT,
+                                       NumberMinMaxParamConfig(1, cls._MAX_PROFILE_SECONDS))
+                          ),
+            CommandSyntax("Affiche la latence et l'état de chaque shard",
+                          cls._display_shards,
+                          CommandParam("shards", "", ParamType.FIXED_VALUE)
+                          ),
+            CommandSyntax("Affiche la mémoire prise par les membres, par serveur",
+                          cls._display_members,
+                          CommandParam("membres", "", ParamType.FIXED_VALUE)
+                          ),
+            CommandSyntax("Recharge bot.properties sans redémarrer",
+                          cls._reload_config,
+                          CommandParam("reload", "", ParamType.FIXED_VALUE)
+                          ),
+        ]
 
     @classmethod
     def get_help(cls) -> Union[Embed, str]:
@@ -35,3 +75,179 @@ class TuinBotCommand(BaseCommand):
                           description=desc, color=0x967b29)
 
         return help_mess
+
+    # noinspection PyUnusedLocal
+    @classmethod
+    def _display_lag(cls, message: Message, lag_executor: FixedValueParamExecutor):
+        if not cls._check_admin(message):
+            return
+
+        histogram = LoopLagSampler.get_histogram()
+        slow_stats = SlowCallbackMonitor.stats()
+
+        lines = ["Lag (10 min) : moyenne {}, p50 {}, p99 {}, max {}".format(
+            cls._format_ms(histogram.sum / histogram.count if histogram.count else None),
+            cls._format_ms(histogram.percentile(50)),
+            cls._format_ms(histogram.percentile(99)),
+            cls._format_ms(histogram.max))]
+
+        lines.append("Appels lents (> {}) :".format(cls._format_ms(slow_stats["threshold"])))
+        for name, count in sorted(slow_stats["slow_counts"].items(), key=lambda item: item[1], reverse=True):
+            lines.append("  {} : {}".format(name, count))
+
+        lines.append("Derniers :")
+        for record in SlowCallbackMonitor.get_records()[-cls._SLOW_CALLBACKS_DISPLAYED:]:
+            lines.append("  {} : {} il y a {} s".format(record.name, cls._format_ms(record.duration),
+                                                       int(Clock.wall_time() - record.timestamp)))
+
+        cls._reply(message, "```%s```" % "\n".join(lines), cls._delete_delay_help)
+
+    # noinspection PyUnusedLocal
+    @classmethod
+    def _profile(cls, message: Message, profile_executor: FixedValueParamExecutor,
+                 seconds_executor: IntParamExecutor):
+        if not cls._check_admin(message):
+            return
+
+        if LiveProfiler.is_running():
+            cls._display_error(message, "Un profilage est déjà en cours.")
+            return
+
+        cls._async(cls._profile_and_reply(message, seconds_executor.get_int()))
+
+    @classmethod
+    async def _profile_and_reply(cls, message: Message, seconds: int):
+        try:
+            report = await LiveProfiler.profile(seconds)
+        except (RuntimeError, ValueError) as e:
+            # ValueError: another profiler is active (Python 3.12+).
+            cls._display_error(message, "Profilage impossible : %s" % e)
+            return
+
+        # Not deleted, it's meant to be downloaded.
+        await OutboundQueue.reply(message, "Profil sur %s s :" % seconds,
+                                  file=File(io.BytesIO(report.encode("utf-8")), filename="profile.txt"))
+
+    # noinspection PyUnusedLocal
+    @classmethod
+    def _display_shards(cls, message: Message, shards_executor: FixedValueParamExecutor):
+        if not cls._check_admin(message):
+            return
+
+        cls._async(cls._display_cluster_shards(message))
+
+    @classmethod
+    async def _display_cluster_shards(cls, message: Message):
+        """Shards of every worker when started by launcher.py."""
+        try:
+            results = await ClusterWorker.query_cluster("shards")
+        except ClusterError as e:
+            cls._display_error(message, "Impossible de joindre les workers : %s" % e)
+            return
+
+        current_shard_id = ShardMonitor.shard_of(message.guild)
+        lines = []
+        for worker_id, reports in sorted(results.items()):
+            if ClusterWorker.is_worker():
+                lines.append("Worker {} :".format(worker_id))
+            if isinstance(reports, dict):
+                lines.append("  {}".format(reports.get("error")))
+                continue
+
+            for report in (ShardReport(**report) for report in reports):
+                if report.is_ready:
+                    state = "prêt"
+                elif report.is_connected:
+                    state = "connexion"
+                else:
+                    state = "déconnecté"
+
+                lines.append("Shard {}{} : {} depuis {} s, latence {}, {} serveur(s), {:.1f} évt/s,"
+                             " {} déconnexion(s), {} reprise(s)".format(
+                                report.shard_id, " (ici)" if report.shard_id == current_shard_id else "", state,
+                                int(report.state_age), cls._format_ms(report.latency), report.guild_count,
+                                report.events_per_second, report.disconnect_count, report.resume_count))
+
+        cls._reply(message, "```%s```" % "\n".join(lines), cls._delete_delay_help)
+
+    # noinspection PyUnusedLocal
+    @classmethod
+    def _display_members(cls, message: Message, members_executor: FixedValueParamExecutor):
+        if not cls._check_admin(message):
+            return
+
+        cls._async(cls._display_cluster_members(message))
+
+    @classmethod
+    async def _display_cluster_members(cls, message: Message):
+        """Member cache of every worker, with startup durations: run each member_cache policy to compare them."""
+        try:
+            results = await ClusterWorker.query_cluster("members", limit=cls._GUILDS_DISPLAYED)
+        except ClusterError as e:
+            cls._display_error(message, "Impossible de joindre les workers : %s" % e)
+            return
+
+        lines = []
+        for worker_id, result in sorted(results.items()):
+            if ClusterWorker.is_worker():
+                lines.append("Worker {} :".format(worker_id))
+            if "error" in result:
+                lines.append("  {}".format(result["error"]))
+                continue
+
+            stats = result["stats"]
+            phases = dict(result["startup"])
+            reports = [GuildMemberReport(**report) for report in result["guilds"]]
+            lines.append("  Cache {} : {} membres actifs, {} requêtes, {} évictions".format(
+                stats["policy"], stats["active"], stats["queries"], stats["evictions"]))
+            lines.append("  Démarrage {:.1f} s, dont connexion jusqu'à on_ready {:.1f} s".format(
+                sum(phases.values()), phases.get("ready", 0)))
+
+            for report in reports:
+                lines.append("  {} : {} / {} membres, ~{:.1f} Ko".format(
+                    report.name, report.cached_count, report.member_count, report.estimated_bytes / 1024))
+
+        cls._reply(message, "```%s```" % "\n".join(lines), cls._delete_delay_help)
+
+    # noinspection PyUnusedLocal
+    @classmethod
+    def _reload_config(cls, message: Message, reload_executor: FixedValueParamExecutor):
+        if not cls._check_admin(message):
+            return
+
+        cls._async(cls._reload_cluster_config(message))
+
+    @classmethod
+    async def _reload_cluster_config(cls, message: Message):
+        """Every worker reads the file again when started by launcher.py."""
+        try:
+            results = await ClusterWorker.query_cluster("reload")
+        except (ClusterError, OSError, ValueError) as e:
+            cls._display_error(message, "Config non rechargée : %s" % e)
+            return
+
+        lines = []
+        for worker_id, changed_fields in sorted(results.items()):
+            prefix = "Worker {} : ".format(worker_id) if ClusterWorker.is_worker() else ""
+            if isinstance(changed_fields, dict):
+                lines.append("{}erreur, {}".format(prefix, changed_fields.get("error")))
+                continue
+
+            restart_fields = [name for name in changed_fields if name in AppProperties.RESTART_FIELDS]
+            lines.append("{}modifié : {}".format(prefix, ", ".join(changed_fields) or "rien"))
+            if restart_fields:
+                lines.append("{}redémarrage nécessaire pour : {}".format(prefix, ", ".join(restart_fields)))
+
+        cls._reply(message, "```%s```" % "\n".join(lines), cls._delete_delay_help)
+
+    @classmethod
+    def _check_admin(cls, message: Message) -> bool:
+        if message.author.id in AppProperties.admin_ids():
+            return True
+
+        cls._display_error(message, "Cette commande est réservée aux admins.")
+        return False
+
+    @staticmethod
+    def _format_ms(seconds: Optional[float]) -> str:
+        return "-" if seconds is None else "%.1f ms" % (seconds * 1000)
@@ -5,19 +5,23 @@ from discord import Message, TextChannel, Member
 from application.database.db_typing_mess import DbTypingMessage, TypingMessage
 from application.message.messages import AppMessages
 from application.param.app_params import ApplicationParams
+from core.client.members import MemberCache
+from core.client.outbound import OutboundQueue, ActionPriority
 from core.command.base import BaseCommand
+from core.command.manager import CommandManager
 from core.command.types import HookType
+from core.data.invalidation import InvalidationBus
+from core.data.properties import AppProperties
 from core.executor.executors import TextParamExecutor, UserParamExecutor, FixedValueParamExecutor
 from core.param.syntax import CommandSyntax
 from core.utils.parsing_utils import ParsingUtils
 from core.utils.sanitizer import Sanitizer
+from core.utils.utils import Utils
 
 
 class TypingMessageCommand(BaseCommand):
     # TODO commande très semblable à reply, généraliser ?
 
-    _MAX_PER_USER = 1
-
     @staticmethod
     def name() -> str:
         return "tape"
@@ -31,7 +35,7 @@ class TypingMessageCommand(BaseCommand):
         return ("Le message n'apparaîtra que dans le salon où la commande a été tapée."
                 " Tu peux laisser 1 message par tuin,"
                 " et un tuin peut avoir au maximum {} message(s) planifié(s) sur lui."
-                ).format(cls._MAX_PER_USER)
+                ).format(AppProperties.config().typing_message_max_per_user)
 
     @classmethod
     def _build_syntaxes(cls) -> List[CommandSyntax]:
@@ -60,7 +64,7 @@ class TypingMessageCommand(BaseCommand):
         typing_count = DbTypingMessage.count_typing_messages(message.guild.id, user_executor.get_user().id,
                                                              message.author.id)
 
-        if typing_count >= cls._MAX_PER_USER:
+        if typing_count >= AppProperties.config().typing_message_max_per_user:
             cls._reply(
                 message,
                 "Oups, il y a déjà {} message(s) enregistré(s) pour **{}**, il va falloir attendre ton tour !".format(
@@ -120,21 +124,28 @@ class TypingMessageCommand(BaseCommand):
         return HookType.TYPING
 
     @classmethod
-    def execute_typing_hook(cls, channel: TextChannel, user: Member):
+    def execute_typing_hook(cls, channel: TextChannel, user: Member) -> bool:
         messages = DbTypingMessage.use_typing_messages(user.guild.id, channel.id, user.id)
 
         if messages:
             cls._async(cls._execute_hook_async(channel, user, messages))
 
+        return bool(messages)
+
     @classmethod
     async def _execute_hook_async(cls, channel: TextChannel, user: Member, messages: List[TypingMessage]):
-        for message in messages:
-            author = channel.guild.get_member(message.author_id)
+        authors = {author_id: await MemberCache.fetch_member(channel.guild, author_id)
+                   for author_id in {message.author_id for message in messages}}
+
+        embeds = [AppMessages.get_recorded_message_embed(message.message,
+                                                         user.id,
+                                                         AppMessages.get_display_name(authors[message.author_id]))
+                  for message in messages]
+
+        # Several messages recorded for the same target are sent together.
+        for embeds_chunk in Utils.chunks(embeds, OutboundQueue.MAX_EMBEDS_PER_MESSAGE):
+            await OutboundQueue.send(channel, priority=ActionPriority.HOOK, embeds=embeds_chunk)
 
-            embed = AppMessages.get_recorded_message_embed(
-                message.message,
-                user.id,
-                None if not author else author.display_name
-            )
 
-            await channel.send(embed=embed)
+# Typing events of a user are ignored for a while when they have nothing to do, until a message is added.
+InvalidationBus.subscribe("typing_message", CommandManager.invalidate_typing_target)
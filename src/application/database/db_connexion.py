@@ -1,14 +1,128 @@
-import mysql.connector
+import threading
+import time
+from typing import Optional, TYPE_CHECKING
 
-from core.data.properties import AppProperties
+from core.command.admission import AdmissionController
+from core.data.properties import AppProperties, BotConfig
+from core.monitoring.metrics import Metrics
+from core.utils.lazy_module import LazyModule
+
+if TYPE_CHECKING:
+    from mysql.connector.pooling import MySQLConnectionPool
+
+# Imported by the first query, or preloaded while connecting to Discord.
+_mysql_connector = LazyModule("mysql.connector")
+_mysql_pooling = LazyModule("mysql.connector.pooling")
 
 
 class DatabaseConnection:
     # Doc mysql python : https://python.doctor/page-database-data-base-donnees-query-sql-mysql-postgre-sqlite
     # Utiliser des Dict : https://stackoverflow.com/a/61897954/2573194
 
+    _pool: Optional["MySQLConnectionPool"] = None
+    _pool_lock = threading.Lock()
+    _POOL_FIELDS = ("db_host", "db_user", "db_password", "db_name", "db_pool_size")
+    # Queries run in executor threads.
+    _count_lock = threading.Lock()
+    _in_use = 0
+    _overflow_count = 0
+
+    _request_duration = Metrics.histogram("tuinbot_db_request_duration_seconds",
+                                          "DB requests, from getting a connection to commit.")
+    Metrics.collected("tuinbot_db_pool_size", "DB connections in pool.",
+                      lambda: {(): AppProperties.db_pool_size()})
+    Metrics.collected("tuinbot_db_connections_in_use", "DB connections currently used.",
+                      lambda: {(): DatabaseConnection._in_use})
+    Metrics.collected("tuinbot_db_pool_overflow_total", "Connections opened outside of exhausted pool.",
+                      lambda: {(): DatabaseConnection._overflow_count}, metric_type="counter")
+
     def __enter__(self):
-        self.conn = mysql.connector.connect(
+        self.start_time = time.perf_counter()
+
+        # Pool the connection comes from, None for a direct one.
+        self.pool = self._get_pool()
+        try:
+            self.conn = self.pool.get_connection()
+        except _mysql_pooling.PoolError:
+            # Pool exhausted: a direct connection is slower but better than failing.
+            self.pool = None
+            self.conn = self._connect()
+            with self._count_lock:
+                DatabaseConnection._overflow_count += 1
+
+        with self._count_lock:
+            DatabaseConnection._in_use += 1
+
+        return self.conn.cursor()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.conn.commit()
+        finally:
+            self._release()
+            with self._count_lock:
+                DatabaseConnection._in_use -= 1
+
+        duration = time.perf_counter() - self.start_time
+        AdmissionController.record_db_latency(duration)
+        self._request_duration.observe(duration)
+
+    def _release(self):
+        if self.pool is not None and self.pool is not DatabaseConnection._pool:
+            # Pool replaced by a config reload: nothing would use the connection again.
+            # Pooled connections forward other methods to the real connection.
+            self.conn.disconnect()
+            return
+
+        # Pooled connections go back to the pool.
+        self.conn.close()
+        if self.pool is not None and self.pool is not DatabaseConnection._pool:
+            # Pool replaced while the connection was going back to it.
+            self._close_idle_connections(self.pool)
+
+    @classmethod
+    def _get_pool(cls) -> "MySQLConnectionPool":
+        if cls._pool is None:
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._pool = _mysql_pooling.MySQLConnectionPool(pool_name="tuinbot",
+                                                                   pool_size=AppProperties.db_pool_size(),
+                                                                   **cls._connection_args())
+        return cls._pool
+
+    @classmethod
+    def on_config_reload(cls, old_config: BotConfig, new_config: BotConfig):
+        """Next requests use a new pool when connection settings changed. Idle connections of the old pool
+        are closed now, the ones in use when they are released.
+        """
+        if set(old_config.changed_fields(new_config)).isdisjoint(cls._POOL_FIELDS):
+            return
+
+        with cls._pool_lock:
+            old_pool = cls._pool
+            cls._pool = None
+
+        if old_pool is not None:
+            cls._close_idle_connections(old_pool)
+
+    @staticmethod
+    def _close_idle_connections(pool: "MySQLConnectionPool"):
+        """Takes every connection left in pool, until it's empty."""
+        while True:
+            try:
+                conn = pool.get_connection()
+            except _mysql_connector.Error:
+                # Empty (PoolError), or the ones left are already disconnected and can't reconnect.
+                return
+            conn.disconnect()
+
+    @classmethod
+    def _connect(cls):
+        return _mysql_connector.connect(**cls._connection_args())
+
+    @staticmethod
+    def _connection_args():
+        return dict(
             host=AppProperties.db_host(),
             user=AppProperties.db_user(),
             password=AppProperties.db_password(),
@@ -17,8 +131,5 @@ class DatabaseConnection:
             collation="utf8mb4_unicode_ci"
         )
 
-        return self.conn.cursor()
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.conn.commit()
-        self.conn.close()
+AppProperties.add_reload_listener(DatabaseConnection.on_config_reload)
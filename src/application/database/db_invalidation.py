@@ -0,0 +1,69 @@
+from typing import List, Tuple
+
+from application.database.db_connexion import DatabaseConnection
+from core.data.invalidation import InvalidationLog, CacheKey, LogEntry
+
+
+class DbInvalidationLog(InvalidationLog):
+    """invalidation_log table, shared by every bot process using the database."""
+
+    def append(self, origin: str, changes: List[Tuple[str, CacheKey]]):
+        with DatabaseConnection() as cursor:
+            cursor.executemany("""
+                                INSERT INTO
+                                    invalidation_log (origin, table_name, cache_key)
+                                VALUES (
+                                    %(origin)s,
+                                    %(table_name)s,
+                                    %(cache_key)s
+                                )
+                               """,
+                               [{"origin": origin, "table_name": table, "cache_key": self._encode_key(key)}
+                                for table, key in changes])
+
+    def read_after(self, entry_id: int, limit: int) -> List[LogEntry]:
+        with DatabaseConnection() as cursor:
+            cursor.execute("""
+                                SELECT
+                                    id, origin, table_name, cache_key
+                                FROM
+                                    invalidation_log
+                                WHERE
+                                    id > %(entry_id)s
+                                ORDER BY
+                                    id
+                                LIMIT %(limit)s
+                                """,
+                           {"entry_id": entry_id, "limit": limit})
+
+            return [(row_id, origin, table, self._decode_key(cache_key))
+                    for row_id, origin, table, cache_key in cursor.fetchall()]
+
+    def last_id(self) -> int:
+        with DatabaseConnection() as cursor:
+            cursor.execute("""
+                                SELECT
+                                    COALESCE(MAX(id), 0)
+                                FROM
+                                    invalidation_log
+                                """)
+
+            return cursor.fetchone()[0]
+
+    def purge(self, max_age: int):
+        with DatabaseConnection() as cursor:
+            cursor.execute("""
+                                DELETE FROM
+                                    invalidation_log
+                                WHERE
+                                    created < NOW() - INTERVAL %(max_age)s SECOND
+                                """,
+                           {"max_age": max_age})
+
+    @staticmethod
+    def _encode_key(key: CacheKey) -> str:
+        return ":".join(str(part) for part in key)
+
+    @staticmethod
+    def _decode_key(cache_key: str) -> CacheKey:
+        return tuple(int(part) for part in cache_key.split(":"))
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import List, Union
 
 from application.database.db_connexion import DatabaseConnection
+from core.monitoring.tracing import Tracer
 
 
 @dataclass
@@ -16,6 +17,7 @@ class MemoListItem:
     position: int
 
 
+@Tracer.trace_methods
 class DbMemo:
 
     @staticmethod
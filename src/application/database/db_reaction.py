@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import List
 
 from application.database.db_connexion import DatabaseConnection
+from core.monitoring.tracing import Tracer
 
 
 @dataclass
@@ -10,6 +11,7 @@ class AutoReac:
     author_id: str
 
 
+@Tracer.trace_methods
 class DbAutoReaction:
     @staticmethod
     def add_auto_reaction(guild_id: int, channel_id: int, author_id: int, target_id: int, emoji: str,
@@ -165,6 +167,28 @@ class DbAutoReaction:
 
             return [AutoReac(i[0], i[1]) for i in cursor.fetchall()]
 
+    @staticmethod
+    def has_auto_reactions(guild_id: int, user_id: int, channel_id: int) -> bool:
+        """Doesn't decrement remaining reactions."""
+        sql = """
+                    SELECT 1
+                        FROM
+                            auto_reaction
+                        WHERE
+                            guild_id = %(guild_id)s
+                        AND
+                            target_id = %(user_id)s
+                        AND
+                            channel_id = %(channel_id)s
+                        LIMIT 1
+                    """
+
+        with DatabaseConnection() as cursor:
+            cursor.execute(sql,
+                           {"guild_id": guild_id, "channel_id": channel_id, "user_id": user_id})
+
+            return cursor.fetchone() is not None
+
     @staticmethod
     def use_auto_reactions(guild_id: int, user_id: int, channel_id: int = None) -> List[str]:
         with DatabaseConnection() as cursor:
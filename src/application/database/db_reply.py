@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import Union, List
 
 from application.database.db_connexion import DatabaseConnection
+from core.monitoring.tracing import Tracer
 
 
 @dataclass
@@ -10,6 +11,7 @@ class AutoReply:
     author_id: int
 
 
+@Tracer.trace_methods
 class DbAutoReply:
 
     @staticmethod
@@ -97,6 +99,28 @@ class DbAutoReply:
             result = cursor.fetchone()
             return None if not result else result[0]
 
+    @staticmethod
+    def has_auto_replys(guild_id: int, channel_id: int, target_id: int) -> bool:
+        """Doesn't delete the replies from database."""
+        sql = """
+                    SELECT 1
+                        FROM
+                            auto_reply
+                        WHERE
+                            guild_id = %(guild_id)s
+                        AND
+                            channel_id = %(channel_id)s
+                        AND
+                            target_id = %(target_id)s
+                        LIMIT 1
+                    """
+
+        with DatabaseConnection() as cursor:
+            cursor.execute(sql,
+                           {"guild_id": guild_id, "channel_id": channel_id, "target_id": target_id})
+
+            return cursor.fetchone() is not None
+
     @classmethod
     def use_auto_replys(cls, guild_id: int, channel_id: int, target_id: int) -> List[AutoReply]:
         """Delete the spoiler from database."""
@@ -1,8 +1,10 @@
 from typing import Union
 
 from application.database.db_connexion import DatabaseConnection
+from core.monitoring.tracing import Tracer
 
 
+@Tracer.trace_methods
 class DbAutoSpoiler:
 
     @staticmethod
@@ -59,6 +61,28 @@ class DbAutoSpoiler:
             result = cursor.fetchone()
             return None if not result else result[0]
 
+    @staticmethod
+    def has_auto_spoiler(guild_id: int, channel_id: int, target_id: int) -> bool:
+        """Doesn't delete the spoiler from database."""
+        sql = """
+                    SELECT 1
+                        FROM
+                            auto_spoiler
+                        WHERE
+                            guild_id = %(guild_id)s
+                        AND
+                            target_id = %(target_id)s
+                        AND
+                            channel_id = %(channel_id)s
+                        LIMIT 1
+                    """
+
+        with DatabaseConnection() as cursor:
+            cursor.execute(sql,
+                           {"guild_id": guild_id, "channel_id": channel_id, "target_id": target_id})
+
+            return cursor.fetchone() is not None
+
     @classmethod
     def use_auto_spoiler(cls, guild_id: int, channel_id: int, target_id: int) -> Union[int, None]:
         """Delete the spoiler from database."""
@@ -2,6 +2,8 @@ from dataclasses import dataclass
 from typing import Union, List
 
 from application.database.db_connexion import DatabaseConnection
+from core.data.invalidation import InvalidationBus
+from core.monitoring.tracing import Tracer
 
 
 @dataclass
@@ -10,6 +12,7 @@ class TypingMessage:
     author_id: int
 
 
+@Tracer.trace_methods
 class DbTypingMessage:
 
     @staticmethod
@@ -32,7 +35,12 @@ class DbTypingMessage:
                            {"guild_id": guild_id, "channel_id": channel_id, "author_id": author_id,
                             "target_id": target_id, "message": message})
 
-            return cursor.rowcount > 0
+            is_added = cursor.rowcount > 0
+
+        # After commit, so caches can't read the previous state again.
+        if is_added:
+            InvalidationBus.publish("typing_message", guild_id, target_id)
+        return is_added
 
     @staticmethod
     def count_typing_messages(guild_id: int, target_id: int, exclude_user_id: int = None) -> int:
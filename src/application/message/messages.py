@@ -1,4 +1,6 @@
-from discord import Embed
+from typing import Optional
+
+from discord import Embed, Member
 
 from core.utils.parsing_utils import ParsingUtils
 
@@ -46,6 +48,10 @@ class AppMessages:
 
         return embed
 
+    @staticmethod
+    def get_display_name(member: Optional[Member]) -> Optional[str]:
+        return member.display_name if member else None
+
     @classmethod
     def get_memo_embed(cls, title: str, content: str, footer: str = None) -> Embed:
         embed = Embed(title=f"Mémo [{title}]",
@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Any
+
+from discord import Member, Guild, TextChannel, Message, Client
+from discord.utils import time_snowflake
+
+from core.utils.clock import Clock
+
+
+@dataclass
+class ApiCall:
+    time: float
+    method: str
+    channel_id: int
+    # Created message for sends, target message for reactions and deletions.
+    message_id: Optional[int] = None
+    detail: Any = None
+
+
+class FakeApi:
+    """Stands for Discord API: counts calls, with an optional latency.
+    With `record`, every call is kept with the (Clock) time it was received at.
+    """
+    latency = 0.0
+    calls: Dict[str, int] = {}
+    record = False
+    records: List[ApiCall] = []
+
+    @classmethod
+    async def call(cls, method: str, channel_id: int, message_id: int = None, detail: Any = None):
+        cls.calls[method] = cls.calls.get(method, 0) + 1
+        if cls.record:
+            cls.records.append(ApiCall(Clock.monotonic(), method, channel_id, message_id, detail))
+        if cls.latency:
+            await asyncio.sleep(cls.latency)
+
+    @classmethod
+    def reset(cls, latency: float = 0.0, record: bool = False):
+        cls.latency = latency
+        cls.calls = {}
+        cls.record = record
+        cls.records = []
+
+
+_ids = itertools.count()
+
+
+def new_snowflake() -> int:
+    """Real snowflakes, so code computing message age (bulk deletions) works."""
+    return time_snowflake(datetime.fromtimestamp(Clock.wall_time(), timezone.utc)) | next(_ids) % (1 << 22)
+
+
+class FakePermissions:
+
+    def __init__(self):
+        self.add_reactions = True
+        self.read_message_history = True
+        self.send_messages = True
+        self.manage_messages = True
+
+
+# __class__ is a property so isinstance checks of the bot code see the discord.py classes.
+
+class FakeMember:
+    __class__ = property(lambda self: Member)
+
+    def __init__(self, member_id: int, guild: "FakeGuild", name: str, bot: bool = False):
+        self.id = member_id
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.bot = bot
+        self.mention = "<@%s>" % member_id
+
+
+class FakeGuild:
+    __class__ = property(lambda self: Guild)
+
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.members: Dict[int, FakeMember] = {}
+        self.channels: List[FakeTextChannel] = []
+        self.me: Optional[FakeMember] = None
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self.members.get(member_id)
+
+    def add_member(self, member_id: int, name: str, bot: bool = False) -> FakeMember:
+        member = self.members[member_id] = FakeMember(member_id, self, name, bot)
+        return member
+
+
+class FakeTextChannel:
+    __class__ = property(lambda self: TextChannel)
+
+    def __init__(self, channel_id: int, guild: FakeGuild):
+        self.id = channel_id
+        self.guild = guild
+        self.name = "channel-%s" % channel_id
+
+    @property
+    def members(self) -> List[FakeMember]:
+        return list(self.guild.members.values())
+
+    # noinspection PyUnusedLocal
+    def permissions_for(self, member: FakeMember) -> FakePermissions:
+        return FakePermissions()
+
+    # noinspection PyUnusedLocal
+    async def send(self, content: str = None, **kwargs) -> "FakeMessage":
+        message = FakeMessage(self, self.guild.me, content or "")
+        await FakeApi.call("send", self.id, message.id, content or kwargs.get("embeds"))
+        return message
+
+    # noinspection PyUnusedLocal
+    async def delete_messages(self, messages: List[Any], **kwargs):
+        await FakeApi.call("delete_messages", self.id, detail=sorted(message.id for message in messages))
+
+    def get_partial_message(self, message_id: int) -> "FakeMessage":
+        message = FakeMessage(self, self.guild.me, "")
+        message.id = message_id
+        return message
+
+
+class FakeAttachment:
+    """Recordings only keep attachments count, they are considered as images."""
+
+    def __init__(self):
+        self.width = 800
+        self.height = 600
+        self.proxy_url = "https://media.example.com/image.png"
+
+
+class FakeMessage:
+    __class__ = property(lambda self: Message)
+
+    def __init__(self, channel: FakeTextChannel, author: FakeMember, content: str):
+        self.id = new_snowflake()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.attachments = []
+        self.mentions = []
+        self.created_at = datetime.fromtimestamp(Clock.wall_time(), timezone.utc)
+
+    # noinspection PyUnusedLocal
+    async def reply(self, content: str = None, **kwargs) -> "FakeMessage":
+        message = FakeMessage(self.channel, self.guild.me, content or "")
+        await FakeApi.call("reply", self.channel.id, message.id, content or kwargs.get("embed") or kwargs.get("embeds"))
+        return message
+
+    async def add_reaction(self, emoji: str):
+        await FakeApi.call("add_reaction", self.channel.id, self.id, emoji)
+
+    async def delete(self):
+        await FakeApi.call("delete", self.channel.id, self.id)
+
+
+class FakeClient:
+    __class__ = property(lambda self: Client)
+
+    def __init__(self, guild: FakeGuild):
+        self.guilds = [guild]
+        self.user = guild.me
+        self._channels = {channel.id: channel for channel in guild.channels}
+
+    def get_channel(self, channel_id: int) -> Optional[FakeTextChannel]:
+        return self._channels.get(channel_id)
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
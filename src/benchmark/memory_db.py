@@ -0,0 +1,149 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Tuple, Optional, Callable
+
+from application.database.db_memo import DbMemo, Memo, MemoListItem
+from application.database.db_reaction import DbAutoReaction, AutoReac
+from application.database.db_reply import DbAutoReply, AutoReply
+from application.database.db_spoiler import DbAutoSpoiler
+from application.database.db_typing_mess import DbTypingMessage, TypingMessage
+
+
+class InMemoryDb:
+    """Replaces the Db methods used by hooks and read commands, so benchmarks run without MySQL.
+    SQL of Db classes is MySQL specific (INSERT IGNORE, user variables), so SQLite can't be used instead.
+
+    By default, entries are not consumed by hooks, so targeted users trigger them on every message.
+    With `consume`, they are used like the real DB: replies, typing messages and spoilers are used once,
+    reactions have `reaction_shots`.
+    Each request sleeps `latency` seconds (blocking, like the MySQL connector) and is counted.
+    """
+    latency = 0.0
+    query_count = 0
+    consume = False
+    # Set a list in the context handling an event to count its queries in its first item
+    # (copied contexts of executor threads and tasks share the list).
+    event_queries: ContextVar[Optional[List[int]]] = ContextVar("event_queries", default=None)
+
+    # (guild id, channel id, target id) -> values
+    reactions: Dict[Tuple[int, int, int], List[AutoReac]] = {}
+    replies: Dict[Tuple[int, int, int], List[AutoReply]] = {}
+    spoilers: Dict[Tuple[int, int, int], int] = {}
+    typing_messages: Dict[Tuple[int, int, int], List[TypingMessage]] = {}
+    # author id -> {name: lines}
+    memos: Dict[int, Dict[str, List[str]]] = {}
+    # ((guild id, channel id, target id), emoji) -> remaining shots, reactions without shots are kept.
+    reaction_shots: Dict[Tuple[Tuple[int, int, int], str], int] = {}
+
+    @classmethod
+    def install(cls, latency: float = 0.0, consume: bool = False):
+        cls.latency = latency
+        cls.query_count = 0
+        cls.consume = consume
+
+        cls._patch(DbAutoReaction, "has_auto_reactions",
+                   lambda guild_id, user_id, channel_id: (guild_id, channel_id, user_id) in cls.reactions)
+        cls._patch(DbAutoReaction, "use_auto_reactions", cls._use_reactions)
+        cls._patch(DbAutoReaction, "get_auto_reactions", cls._get_reactions)
+        cls._patch(DbAutoReaction, "count_channel_target_reactions",
+                   lambda guild_id, channel_id, target_id: len(cls.reactions.get((guild_id, channel_id, target_id),
+                                                                                 [])))
+        cls._patch(DbAutoReply, "has_auto_replys",
+                   lambda guild_id, channel_id, target_id: (guild_id, channel_id, target_id) in cls.replies)
+        cls._patch(DbAutoReply, "use_auto_replys",
+                   lambda guild_id, channel_id, target_id: list(cls._use(cls.replies, (guild_id, channel_id,
+                                                                                       target_id), [])))
+        cls._patch(DbAutoSpoiler, "has_auto_spoiler",
+                   lambda guild_id, channel_id, target_id: (guild_id, channel_id, target_id) in cls.spoilers)
+        cls._patch(DbAutoSpoiler, "use_auto_spoiler",
+                   lambda guild_id, channel_id, target_id: cls._use(cls.spoilers, (guild_id, channel_id, target_id),
+                                                                    None))
+        cls._patch(DbTypingMessage, "use_typing_messages",
+                   lambda guild_id, channel_id, target_id: list(
+                       cls._use(cls.typing_messages, (guild_id, channel_id, target_id), [])))
+
+        cls._patch(DbMemo, "get_memo_name", cls._get_memo_name)
+        cls._patch(DbMemo, "get_memo", cls._get_memo)
+        cls._patch(DbMemo, "get_memo_list",
+                   lambda author_id: [MemoListItem(name, position + 1)
+                                      for position, name in enumerate(sorted(cls.memos.get(author_id, {})))])
+        cls._patch(DbMemo, "count_user_memos", lambda author_id: len(cls.memos.get(author_id, {})))
+        cls._patch(DbMemo, "count_memo_lines", cls._count_memo_lines)
+        cls._patch(DbMemo, "get_memo_line", cls._get_memo_line)
+
+    @classmethod
+    def clear(cls):
+        cls.reactions.clear()
+        cls.replies.clear()
+        cls.spoilers.clear()
+        cls.typing_messages.clear()
+        cls.memos.clear()
+        cls.reaction_shots.clear()
+
+    @classmethod
+    def _patch(cls, db_class: type, method_name: str, implementation: Callable):
+        def request(*args, **kwargs):
+            cls.query_count += 1
+            event_queries = cls.event_queries.get()
+            if event_queries is not None:
+                event_queries[0] += 1
+            if cls.latency:
+                time.sleep(cls.latency)
+            return implementation(*args, **kwargs)
+
+        setattr(db_class, method_name, staticmethod(request))
+
+    @classmethod
+    def _use(cls, entries: Dict, key: Tuple[int, int, int], default):
+        return entries.pop(key, default) if cls.consume else entries.get(key, default)
+
+    @classmethod
+    def _use_reactions(cls, guild_id: int, user_id: int, channel_id: int = None) -> List[str]:
+        key = (guild_id, channel_id, user_id)
+        reactions = cls.reactions.get(key, [])
+        emojis = [reaction.emoji for reaction in reactions]
+
+        if cls.consume:
+            for reaction in list(reactions):
+                shots = cls.reaction_shots.get((key, reaction.emoji))
+                if shots is None:
+                    continue
+                if shots > 1:
+                    cls.reaction_shots[(key, reaction.emoji)] = shots - 1
+                else:
+                    del cls.reaction_shots[(key, reaction.emoji)]
+                    reactions.remove(reaction)
+
+            if not reactions:
+                cls.reactions.pop(key, None)
+
+        return emojis
+
+    @classmethod
+    def _get_reactions(cls, guild_id: int, user_id: int, channel_id: int = None) -> List[AutoReac]:
+        if channel_id is not None:
+            return list(cls.reactions.get((guild_id, channel_id, user_id), []))
+
+        return [reaction for (reaction_guild_id, _, target_id), reactions in cls.reactions.items()
+                if reaction_guild_id == guild_id and target_id == user_id for reaction in reactions]
+
+    @classmethod
+    def _get_memo_name(cls, author_id: int, name_part: str, exact_name: bool = False) -> Optional[str]:
+        names = sorted(cls.memos.get(author_id, {}))
+        return next((name for name in names if name == name_part or (not exact_name and name.startswith(name_part))),
+                    None)
+
+    @classmethod
+    def _get_memo(cls, author_id: int, name_part: str, exact_name: bool = False) -> Optional[Memo]:
+        name = cls._get_memo_name(author_id, name_part, exact_name)
+        return Memo(name, list(cls.memos[author_id][name])) if name else None
+
+    @classmethod
+    def _count_memo_lines(cls, author_id: int, name_part: str, exact_name: bool = False) -> int:
+        memo = cls._get_memo(author_id, name_part, exact_name)
+        return len(memo.lines) if memo else 0
+
+    @classmethod
+    def _get_memo_line(cls, author_id: int, name_part: str, line_position: int) -> Optional[str]:
+        memo = cls._get_memo(author_id, name_part)
+        return memo.lines[line_position - 1] if memo and line_position <= len(memo.lines) else None
@@ -0,0 +1,267 @@
+"""Benchmarks compared to a saved baseline, to catch slowdowns of hot paths.
+
+Run from src directory:
+    python -m benchmark.regression --save      # writes baseline
+    python -m benchmark.regression             # compares, exit code 1 on significant slowdown
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from application.command.memo_command import MemoCommand
+from application.command.reac_command import AutoReactionCommand
+from application.command.reply_command import ReplyMessageCommand
+from benchmark.fakes import FakeMessage
+from benchmark.memory_db import InMemoryDb
+from benchmark.throughput import BenchmarkConfig, build_world, run_benchmark, setup_bot, wait_for_outbound
+from core.command.manager import CommandManager
+from core.utils.parsing_utils import ParsingUtils
+from core.utils.sanitizer import Sanitizer
+
+DEFAULT_BASELINE = "../data/benchmark_baseline.json"
+_BASELINE_VERSION = 1
+# Time of a microbenchmark round, calls count is adjusted to it.
+_ROUND_TIME = 0.02
+# Smaller differences of medians (relative to baseline) are never significant: a side with a single sample
+# has no variance, and very stable samples make any tiny difference look significant.
+_MIN_RELATIVE_NOISE = 0.05
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline: Optional[float]
+    current: float
+    change: Optional[float]
+    is_regression: bool
+    is_improvement: bool
+
+
+def _median(samples: List[float]) -> float:
+    return statistics.median(samples)
+
+
+def _noise(baseline: List[float], current: List[float]) -> float:
+    """About 95% confidence interval of the difference of means (Welch), at least the minimum noise."""
+    variance = sum(statistics.variance(samples) / len(samples) for samples in (baseline, current)
+                   if len(samples) > 1)
+    return max(2 * math.sqrt(variance), _MIN_RELATIVE_NOISE * _median(baseline))
+
+
+def single_sample_names(baseline: Dict[str, List[float]], current: Dict[str, List[float]]) -> List[str]:
+    """Metrics with a single sample on a side, their noise can't be measured."""
+    return [name for name, samples in current.items()
+            if len(samples) < 2 or 0 < len(baseline.get(name, [])) < 2]
+
+
+def compare(baseline: Dict[str, List[float]], current: Dict[str, List[float]],
+            threshold: float) -> List[Comparison]:
+    """A metric regresses when its median is slower by more than threshold (relative)
+    and the difference is beyond measurement noise.
+    """
+    comparisons = []
+
+    for name, samples in current.items():
+        current_median = _median(samples)
+        baseline_samples = baseline.get(name)
+
+        if not baseline_samples:
+            comparisons.append(Comparison(name, None, current_median, None, False, False))
+            continue
+
+        baseline_median = _median(baseline_samples)
+        difference = current_median - baseline_median
+        change = difference / baseline_median if baseline_median else 0.0
+        is_significant = abs(difference) > _noise(baseline_samples, samples)
+
+        comparisons.append(Comparison(name, baseline_median, current_median, change,
+                                      is_significant and change > threshold,
+                                      is_significant and change < -threshold))
+
+    return comparisons
+
+
+async def measure(func: Callable[[], object], rounds: int) -> List[float]:
+    """Seconds per call, one sample per round. Background work (replies) is flushed between rounds.
+    Coroutines returned by func are awaited in the call.
+    """
+    number = 1
+    while True:
+        start_time = time.perf_counter()
+        for _ in range(number):
+            result = func()
+            if asyncio.iscoroutine(result):
+                await result
+        if time.perf_counter() - start_time >= _ROUND_TIME or number >= 1 << 20:
+            break
+        number *= 2
+    await wait_for_outbound()
+
+    samples = []
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        for _ in range(number):
+            result = func()
+            if asyncio.iscoroutine(result):
+                await result
+        samples.append((time.perf_counter() - start_time) / number)
+        await wait_for_outbound()
+
+    return samples
+
+
+def get_microbenchmarks() -> Dict[str, Callable[[], object]]:
+    config = BenchmarkConfig()
+    world = build_world(config)
+    channel = world.guild.channels[0]
+    author = world.users[-1]
+    client = world.client
+    members = channel.members
+    links_text = "regarde https://example.com/a et https://example.com/b, c'est drôle"
+
+    def execute(command, params: List[str]):
+        return lambda: command.execute(FakeMessage(channel, author, ""), params, client)
+
+    return {
+        "parsing.find_user": lambda: ParsingUtils.find_user(members, "tuin4"),
+        "parsing.find_user_missing": lambda: ParsingUtils.find_user(members, "personne"),
+        "parsing.format_links": lambda: ParsingUtils.format_links(links_text),
+        "parsing.is_unique_link": lambda: ParsingUtils.is_unique_link("https://example.com/video"),
+        "parsing.to_single_line": lambda: ParsingUtils.to_single_line("une\nphrase\nsur\nplusieurs lignes"),
+        "sanitizer.user_name": lambda: Sanitizer.user_name("tuin_*du*~~58~~"),
+        "sanitizer.user_name_special_quotes": lambda: Sanitizer.user_name_special_quotes("`tuin`"),
+        "execute.memo_line": execute(MemoCommand, ["bench", "ligne", "2"]),
+        "execute.reac_list": execute(AutoReactionCommand, ["tuin1"]),
+        "execute.reply_help": execute(ReplyMessageCommand, []),
+        "manager.handle_command": lambda: CommandManager._handle_command(
+            FakeMessage(channel, author, '!memo "bench" ligne 2'), client),
+    }
+
+
+async def run_all(rounds: int, e2e_rounds: int, e2e_events: int,
+                  name_filter: Optional[str]) -> Dict[str, List[float]]:
+    setup_bot()
+    InMemoryDb.install()
+    results: Dict[str, List[float]] = {}
+
+    for name, func in get_microbenchmarks().items():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = await measure(func, rounds)
+        print("  %-40s %12s" % (name, _format_time(_median(results[name]))), file=sys.stderr)
+
+    if e2e_rounds and (not name_filter or name_filter.startswith("e2e")):
+        for _ in range(e2e_rounds):
+            result = await run_benchmark(BenchmarkConfig(events=e2e_events))
+            results.setdefault("e2e.time_per_event", []).append(result.duration / e2e_events)
+            for path, path_result in result.paths.items():
+                results.setdefault("e2e.%s.p50" % path, []).append(path_result.p50)
+                results.setdefault("e2e.%s.p99" % path, []).append(path_result.p99)
+        print("  e2e done", file=sys.stderr)
+
+    return {name: samples for name, samples in results.items() if not name_filter or name_filter in name}
+
+
+def _format_time(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    if seconds < 1e-3:
+        return "%.2f µs" % (seconds * 1e6)
+    return "%.3f ms" % (seconds * 1e3)
+
+
+def _environment() -> Dict[str, str]:
+    return {"python": platform.python_version(), "machine": platform.machine(), "node": platform.node()}
+
+
+def save_baseline(path: str, results: Dict[str, List[float]]):
+    with open(path, "w") as baseline_file:
+        json.dump({"version": _BASELINE_VERSION, "created": time.time(), "environment": _environment(),
+                   "results": results}, baseline_file, indent=1)
+    print("Baseline saved to %s" % path)
+
+
+def load_baseline(path: str) -> Tuple[Dict[str, List[float]], Dict[str, str]]:
+    with open(path) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    if baseline.get("version") != _BASELINE_VERSION:
+        raise ValueError("Baseline version %s is not supported, save a new one" % baseline.get("version"))
+
+    return baseline["results"], baseline.get("environment", {})
+
+
+def print_comparisons(comparisons: List[Comparison]):
+    print("%-40s %12s %12s %9s  %s" % ("benchmark", "baseline", "current", "change", "status"))
+    for comparison in comparisons:
+        if comparison.baseline is None:
+            status = "new"
+        elif comparison.is_regression:
+            status = "REGRESSION"
+        elif comparison.is_improvement:
+            status = "faster"
+        else:
+            status = "ok"
+
+        change = "-" if comparison.change is None else "%+.1f%%" % (comparison.change * 100)
+        print("%-40s %12s %12s %9s  %s" % (comparison.name, _format_time(comparison.baseline),
+                                           _format_time(comparison.current), change, status))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="TuinBot benchmarks compared to a baseline.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Save results as baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown considered as a regression, if beyond noise")
+    parser.add_argument("--rounds", type=int, default=15, help="Samples by microbenchmark")
+    parser.add_argument("--e2e-rounds", type=int, default=5, help="0 to skip end-to-end benchmark")
+    parser.add_argument("--e2e-events", type=int, default=5000)
+    parser.add_argument("--filter", dest="name_filter", help="Only run benchmarks containing this text")
+    args = parser.parse_args()
+    # Noise is measured from the variance of samples.
+    if args.rounds < 2:
+        parser.error("--rounds should be at least 2")
+    if args.e2e_rounds == 1:
+        parser.error("--e2e-rounds should be 0 or at least 2")
+
+    results = asyncio.run(run_all(args.rounds, args.e2e_rounds, args.e2e_events, args.name_filter))
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        return 0
+
+    try:
+        baseline, environment = load_baseline(args.baseline)
+    except FileNotFoundError:
+        print("No baseline at %s, run with --save first." % args.baseline)
+        return 2
+
+    if environment != _environment():
+        print("Warning: baseline was made on another environment (%s)" % environment)
+
+    single_samples = single_sample_names(baseline, results)
+    if single_samples:
+        print("Warning: single sample for %s, only changes beyond %d%% can be significant, save a new baseline"
+              % (", ".join(single_samples), _MIN_RELATIVE_NOISE * 100))
+
+    comparisons = compare(baseline, results, args.threshold)
+    print_comparisons(comparisons)
+
+    regressions = [comparison.name for comparison in comparisons if comparison.is_regression]
+    if regressions:
+        print("\n%s regression(s): %s" % (len(regressions), ", ".join(regressions)))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
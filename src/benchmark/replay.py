@@ -0,0 +1,229 @@
+"""Replays events recorded by EventRecorder (record_file property) against fake Discord objects
+and in-memory storage, keeping the real traffic shape (bursts, busy channels, typing events).
+
+Run from src directory:
+    python -m benchmark.replay ../data/events.jsonl.gz --speed 10
+"""
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Any, Optional
+
+from application.database.db_reaction import AutoReac
+from application.database.db_reply import AutoReply
+from application.database.db_typing_mess import TypingMessage
+from benchmark.fakes import FakeGuild, FakeTextChannel, FakeMember, FakeMessage, FakeClient, FakeApi, FakeAttachment
+from benchmark.memory_db import InMemoryDb
+from benchmark.throughput import setup_bot, percentile, wait_for_outbound
+from core.client.dispatcher import EventDispatcher, OverloadPolicy
+from core.client.recorder import EventRecorder
+from core.command.manager import CommandManager
+from core.monitoring.histogram import Histogram
+
+# Bounds of DB queries count histogram.
+_QUERY_BOUNDS = (0, 1, 2, 3, 5, 8, 13)
+
+
+@dataclass
+class ReplayStats:
+    latencies: List[float] = field(default_factory=list)
+    # One counter list per event, filled by InMemoryDb.
+    queries: List[List[int]] = field(default_factory=list)
+
+
+class ReplayWorld:
+    """Fake objects created from hashed ids. A part of users, chosen from their hash, are hook targets
+    (the recording doesn't contain DB contents).
+    """
+
+    def __init__(self, hook_target_ratio: float):
+        self.hook_target_ratio = hook_target_ratio
+        self.guilds: Dict[int, FakeGuild] = {}
+        self.channels: Dict[Tuple[int, int], FakeTextChannel] = {}
+        self.clients: Dict[int, FakeClient] = {}
+        self._targeted_keys = set()
+
+    def get_guild(self, guild_id: int) -> FakeGuild:
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = FakeGuild(guild_id)
+            guild.me = guild.add_member(1, "TuinBot", bot=True)
+            self.clients[guild_id] = FakeClient(guild)
+        return guild
+
+    def get_channel(self, guild_id: int, channel_id: int) -> FakeTextChannel:
+        channel = self.channels.get((guild_id, channel_id))
+        if channel is None:
+            guild = self.get_guild(guild_id)
+            channel = self.channels[(guild_id, channel_id)] = FakeTextChannel(channel_id, guild)
+            guild.channels.append(channel)
+            self.clients[guild_id]._channels[channel_id] = channel
+        return channel
+
+    def get_member(self, guild_id: int, user_id: int, bot: bool) -> FakeMember:
+        guild = self.get_guild(guild_id)
+        return guild.get_member(user_id) or guild.add_member(user_id, "tuin%s" % (user_id % 10000), bot)
+
+    def arm_hooks(self, guild_id: int, channel_id: int, user_id: int):
+        key = (guild_id, channel_id, user_id)
+        if key in self._targeted_keys or user_id % 1000 >= self.hook_target_ratio * 1000:
+            return
+
+        self._targeted_keys.add(key)
+        InMemoryDb.reactions[key] = [AutoReac("👍", 1)]
+        InMemoryDb.replies[key] = [AutoReply("coucou", 1)]
+        InMemoryDb.typing_messages[key] = [TypingMessage("tu tapes quoi ?", 1)]
+
+
+def load_events(file_path: str) -> List[Dict[str, Any]]:
+    """Times of successive recording runs are put one after the other."""
+    events = []
+    offset = 0.0
+    last_time = 0.0
+
+    for event in EventRecorder.read(file_path):
+        if event["e"] == EventRecorder.RUN_START:
+            offset = last_time
+            continue
+
+        event["t"] += offset
+        last_time = event["t"]
+        events.append(event)
+
+    return events
+
+
+def build_content(event: Dict[str, Any]) -> str:
+    command = event.get("cmd")
+    length = event.get("l", 0)
+
+    if not command:
+        return "x" * length
+
+    arguments_length = length - len(command) - 1
+    return command + (" " + "x" * arguments_length if arguments_length > 0 else "")
+
+
+async def replay(events: List[Dict[str, Any]], world: ReplayWorld, speed: Optional[float],
+                 max_in_flight: int) -> Tuple[Dict[str, ReplayStats], float]:
+    """speed None replays as fast as possible, keeping at most max_in_flight events queued."""
+    stats: Dict[str, ReplayStats] = {}
+    start_time = time.perf_counter()
+
+    async def handle(event_type: str, handler, dispatch_time: float):
+        queries = [0]
+        InMemoryDb.event_queries.set(queries)
+        await handler()
+
+        event_stats = stats.setdefault(event_type, ReplayStats())
+        event_stats.latencies.append(time.perf_counter() - dispatch_time)
+        event_stats.queries.append(queries)
+
+    for event in events:
+        guild_id = event.get("g")
+        if guild_id is None:
+            # Private messages, not handled by the bot.
+            continue
+
+        if speed is None:
+            while EventDispatcher.stats()["queued_events"] >= max_in_flight:
+                await asyncio.sleep(0)
+        else:
+            delay = start_time + event["t"] / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        channel = world.get_channel(guild_id, event["c"])
+        member = world.get_member(guild_id, event["u"], bool(event.get("b")))
+        world.arm_hooks(guild_id, channel.id, member.id)
+
+        if event["e"] == EventRecorder.TYPING:
+            event_type = "typing"
+            handler = (lambda c=channel, m=member: CommandManager.manage_typing(c, m, None))
+        else:
+            message = FakeMessage(channel, member, build_content(event))
+            message.attachments = [FakeAttachment() for _ in range(event.get("a", 0))]
+            event_type = "command" if event.get("cmd") else "message"
+            handler = (lambda m=message, c=world.clients[guild_id]: CommandManager.manage_message(m, c))
+
+        dispatch_time = time.perf_counter()
+        EventDispatcher.dispatch(channel.id,
+                                 lambda t=event_type, h=handler, d=dispatch_time: handle(t, h, d),
+                                 event_type == "command")
+        await asyncio.sleep(0)
+
+    # A channel is forgotten when its last event is handled.
+    while EventDispatcher.stats()["channels"]:
+        await asyncio.sleep(0.01)
+    duration = time.perf_counter() - start_time
+
+    await wait_for_outbound()
+    return stats, duration
+
+
+def print_histogram(histogram: Histogram, unit_scale: float, unit: str):
+    bounds = ["<= %g%s" % (bound * unit_scale, unit) for bound in histogram.bounds] + ["> %g%s" % (
+        histogram.bounds[-1] * unit_scale, unit)]
+    for label, count in zip(bounds, histogram.counts):
+        if count:
+            print("    %-12s %8s %s" % (label, count, "#" * max(1, round(40 * count / histogram.count))))
+
+
+def print_report(stats: Dict[str, ReplayStats], duration: float, event_count: int):
+    print("%s events replayed in %.2f s (%.0f events/s), %s dropped by dispatcher" % (
+        event_count, duration, event_count / duration if duration else 0, EventDispatcher.stats()["dropped_events"]))
+
+    for event_type, event_stats in sorted(stats.items()):
+        latencies = sorted(event_stats.latencies)
+        latency_histogram = Histogram()
+        for latency in latencies:
+            latency_histogram.observe(latency)
+
+        query_counts = [queries[0] for queries in event_stats.queries]
+        query_histogram = Histogram(_QUERY_BOUNDS)
+        for count in query_counts:
+            query_histogram.observe(count)
+
+        print("\n%s: %s events, p50 %.3f ms, p99 %.3f ms, max %.3f ms" % (
+            event_type, len(latencies), percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+            latencies[-1] * 1000))
+        print("  Latency (from dispatch):")
+        print_histogram(latency_histogram, 1000, " ms")
+        print("  DB queries per event: mean %.2f, max %s" % (sum(query_counts) / len(query_counts),
+                                                             max(query_counts)))
+        print_histogram(query_histogram, 1, "")
+
+    print("\nAPI calls: %s" % ", ".join("%s=%s" % item for item in sorted(FakeApi.calls.items())))
+
+
+def parse_speed(value: str) -> Optional[float]:
+    return None if value == "max" else float(value)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replays recorded TuinBot events.")
+    parser.add_argument("file", help="File written by EventRecorder")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1, 10... or max")
+    parser.add_argument("--hook-target-ratio", type=float, default=0.1,
+                        help="Part of users targeted by reactions, replies and typing messages")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=50, help="Dispatcher queue size by channel")
+    parser.add_argument("--db-latency-ms", type=float, default=0)
+    parser.add_argument("--api-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    setup_bot()
+    InMemoryDb.install(args.db_latency_ms / 1000)
+    InMemoryDb.clear()
+    FakeApi.reset(args.api_latency_ms / 1000)
+    EventDispatcher.configure(args.workers, args.queue_size, OverloadPolicy.DROP_HOOKS)
+
+    events = load_events(args.file)
+    stats, duration = await replay(events, ReplayWorld(args.hook_target_ratio), args.speed,
+                                   args.workers * 4)
+    print_report(stats, duration, len(events))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,246 @@
+"""Message handling throughput, without Discord nor MySQL.
+
+Run from src directory:
+    python -m benchmark.throughput --events 20000 --mix chat=70,command=10,hook=10,typing=10
+"""
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Callable, Coroutine, Optional
+
+from application.command.memo_command import MemoCommand
+from application.command.reac_command import AutoReactionCommand
+from application.command.reply_command import ReplyMessageCommand
+from application.command.spoil_command import AutoSpoilerCommand
+from application.command.tuin_command import TuinBotCommand
+from application.command.typing_mess_command import TypingMessageCommand
+from application.database.db_reaction import AutoReac
+from application.database.db_reply import AutoReply
+from application.database.db_typing_mess import TypingMessage
+from benchmark.fakes import FakeGuild, FakeTextChannel, FakeMember, FakeMessage, FakeClient, FakeApi
+from benchmark.memory_db import InMemoryDb
+from core.client.outbound import OutboundQueue, ActionRoute
+from core.client.tasks import TaskSupervisor
+from core.command.manager import CommandManager
+from core.command.rate_limit import CommandRateLimiter
+from core.command.repository import CommandRepository
+
+PATHS = ("chat", "command", "hook", "typing")
+
+_COMMANDS = ("!memo bench", "!memo bench ligne 2", "!memo list", "!tuin", "!reply", "!reac tuin1")
+_CHAT = ("salut les tuins", "quelqu'un a vu le match hier ?", "https://example.com/video",
+         "ok", "je vais manger, à plus " * 5)
+
+
+@dataclass
+class BenchmarkConfig:
+    events: int = 10000
+    mix: Dict[str, float] = field(default_factory=lambda: {"chat": 70, "command": 10, "hook": 10, "typing": 10})
+    users: int = 50
+    channels: int = 5
+    hook_targets: int = 5
+    concurrency: int = 8
+    db_latency: float = 0.0
+    api_latency: float = 0.0
+    seed: int = 42
+
+
+@dataclass
+class PathResult:
+    count: int
+    p50: float
+    p99: float
+    max: float
+
+
+@dataclass
+class BenchmarkResult:
+    duration: float
+    events_per_second: float
+    paths: Dict[str, PathResult]
+    db_queries: int
+    api_calls: Dict[str, int]
+
+
+@dataclass
+class World:
+    guild: FakeGuild
+    client: FakeClient
+    users: List[FakeMember]
+    targets: List[FakeMember]
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def setup_bot():
+    """Same commands as TuinBot.py, without rate limits (benchmark users send a lot of commands)."""
+    if not CommandRepository.LIST:
+        CommandRepository.set_command_list(TuinBotCommand,
+                                           ReplyMessageCommand,
+                                           TypingMessageCommand,
+                                           AutoReactionCommand,
+                                           AutoSpoilerCommand,
+                                           MemoCommand)
+
+    unlimited = (1e9, 1e9)
+    CommandRateLimiter.configure(unlimited, unlimited, unlimited)
+    # Discord rate limits aren't simulated, they would only make benchmarks wait.
+    for route in ActionRoute:
+        OutboundQueue._CHANNEL_LIMITS[route] = unlimited
+        OutboundQueue._GLOBAL_LIMITS[route] = unlimited
+
+
+def build_world(config: BenchmarkConfig) -> World:
+    guild = FakeGuild(1)
+    guild.me = guild.add_member(1000, "TuinBot", bot=True)
+    guild.channels = [FakeTextChannel(2000 + index, guild) for index in range(config.channels)]
+
+    users = [guild.add_member(3000 + index, "tuin%s" % index) for index in range(config.users)]
+    targets = users[:config.hook_targets]
+
+    InMemoryDb.clear()
+    for user in users:
+        InMemoryDb.memos[user.id] = {"bench": ["première ligne", "deuxième ligne"], "courses": ["pain"]}
+
+    for index, target in enumerate(targets):
+        author = users[-1 - index]
+        for channel in guild.channels:
+            key = (guild.id, channel.id, target.id)
+            InMemoryDb.reactions[key] = [AutoReac("👍", author.id), AutoReac("🎉", author.id)]
+            InMemoryDb.replies[key] = [AutoReply("coucou", author.id)]
+            InMemoryDb.typing_messages[key] = [TypingMessage("tu tapes quoi ?", author.id)]
+            # A spoiler deletes the message and stops next hooks, only for some targets.
+            if index % 3 == 0:
+                InMemoryDb.spoilers[key] = author.id
+
+    return World(guild, FakeClient(guild), users, targets)
+
+
+def generate_events(config: BenchmarkConfig, world: World) -> List[Tuple[str, Callable[[], Coroutine]]]:
+    rand = random.Random(config.seed)
+    non_targets = [user for user in world.users if user not in world.targets] or world.users
+    paths = list(config.mix.keys())
+    weights = list(config.mix.values())
+    events = []
+
+    for path in rand.choices(paths, weights, k=config.events):
+        channel = rand.choice(world.guild.channels)
+
+        if path == "typing":
+            user = rand.choice(world.users)
+            events.append((path, lambda c=channel, u=user: CommandManager.manage_typing(c, u, None)))
+            continue
+
+        if path == "command":
+            author, content = rand.choice(non_targets), rand.choice(_COMMANDS)
+        elif path == "hook":
+            author, content = rand.choice(world.targets), rand.choice(_CHAT)
+        else:
+            author, content = rand.choice(non_targets), rand.choice(_CHAT)
+
+        message = FakeMessage(channel, author, content)
+        events.append((path, lambda m=message: CommandManager.manage_message(m, world.client)))
+
+    return events
+
+
+async def wait_for_outbound(timeout: float = 30):
+    """Background work (replies, reactions) finishes after handlers return."""
+    end_time = time.monotonic() + timeout
+    while time.monotonic() < end_time:
+        if OutboundQueue.stats()["queue_depth"] == 0 and TaskSupervisor.running_count() == 0:
+            return
+        await asyncio.sleep(0.05)
+
+
+async def run_benchmark(config: BenchmarkConfig) -> BenchmarkResult:
+    setup_bot()
+    InMemoryDb.install(config.db_latency)
+    FakeApi.reset(config.api_latency)
+
+    world = build_world(config)
+    events = generate_events(config, world)
+    durations: Dict[str, List[float]] = {path: [] for path in config.mix}
+    next_index = 0
+
+    async def work():
+        nonlocal next_index
+        while next_index < len(events):
+            path, handler = events[next_index]
+            next_index += 1
+
+            start_time = time.perf_counter()
+            await handler()
+            durations[path].append(time.perf_counter() - start_time)
+            # Gives control back, like between two gateway events.
+            await asyncio.sleep(0)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*[work() for _ in range(config.concurrency)])
+    duration = time.perf_counter() - start_time
+
+    await wait_for_outbound()
+
+    paths = {}
+    for path, values in durations.items():
+        values.sort()
+        paths[path] = PathResult(len(values), percentile(values, 50), percentile(values, 99),
+                                 values[-1] if values else 0.0)
+
+    return BenchmarkResult(duration, len(events) / duration, paths, InMemoryDb.query_count, dict(FakeApi.calls))
+
+
+def print_result(result: BenchmarkResult):
+    print("%.0f events/s (%.2f s)" % (result.events_per_second, result.duration))
+    print("%-10s %8s %10s %10s %10s" % ("path", "count", "p50 ms", "p99 ms", "max ms"))
+    for path, path_result in result.paths.items():
+        print("%-10s %8s %10.3f %10.3f %10.3f" % (path, path_result.count, path_result.p50 * 1000,
+                                                  path_result.p99 * 1000, path_result.max * 1000))
+    print("DB queries: %s" % result.db_queries)
+    print("API calls: %s" % ", ".join("%s=%s" % item for item in sorted(result.api_calls.items())))
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        path, weight = part.split("=")
+        if path not in PATHS:
+            raise argparse.ArgumentTypeError("Unknown path '%s', expected one of %s" % (path, ", ".join(PATHS)))
+        mix[path] = float(weight)
+    return mix
+
+
+def parse_args(args: Optional[List[str]] = None) -> BenchmarkConfig:
+    parser = argparse.ArgumentParser(description="TuinBot message handling throughput.")
+    parser.add_argument("--events", type=int, default=BenchmarkConfig.events)
+    parser.add_argument("--mix", type=parse_mix, default=None,
+                        help="Weights by path, e.g. chat=70,command=10,hook=10,typing=10")
+    parser.add_argument("--users", type=int, default=BenchmarkConfig.users)
+    parser.add_argument("--channels", type=int, default=BenchmarkConfig.channels)
+    parser.add_argument("--hook-targets", type=int, default=BenchmarkConfig.hook_targets,
+                        help="Users targeted by reactions, replies, typing messages and spoilers")
+    parser.add_argument("--concurrency", type=int, default=BenchmarkConfig.concurrency)
+    parser.add_argument("--db-latency-ms", type=float, default=0)
+    parser.add_argument("--api-latency-ms", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=BenchmarkConfig.seed)
+    parsed = parser.parse_args(args)
+
+    config = BenchmarkConfig(events=parsed.events, users=parsed.users, channels=parsed.channels,
+                             hook_targets=parsed.hook_targets, concurrency=parsed.concurrency,
+                             db_latency=parsed.db_latency_ms / 1000, api_latency=parsed.api_latency_ms / 1000,
+                             seed=parsed.seed)
+    if parsed.mix:
+        config.mix = parsed.mix
+
+    return config
+
+
+if __name__ == "__main__":
+    print_result(asyncio.run(run_benchmark(parse_args())))
@@ -1,26 +1,252 @@
+import asyncio
+import signal
+from dataclasses import asdict
 from datetime import datetime
-from typing import Union
+from typing import Union, Optional, Set
 
-from discord import Client, Game, Message, User, Member
-from discord.abc import Messageable
+from discord import Client, AutoShardedClient, Game, Message, User, Member, Role
+from discord.abc import Messageable, GuildChannel
 
+from core.client.deletion import DeletionScheduler
+from core.client.dispatcher import EventDispatcher, OverloadPolicy
+from core.client.members import MemberCache, MemberCachePolicy
+from core.client.outbound import OutboundQueue
+from core.client.permissions import PermissionCache
+from core.client.recorder import EventRecorder
+from core.client.shards import ShardMonitor
+from core.client.tasks import TaskSupervisor
+from core.cluster.worker import ClusterWorker
+from core.command.admission import AdmissionController, LoadLevel
 from core.command.manager import CommandManager
+from core.command.rate_limit import CommandRateLimiter
+from core.command.repository import CommandRepository
+from core.data.invalidation import InvalidationBus
+from core.data.properties import AppProperties, BotConfig
+from core.monitoring.exporter import MetricsExporter
+from core.monitoring.histogram import RateMeter
+from core.monitoring.loop_lag import LoopLagSampler
+from core.monitoring.metrics import Metrics
+from core.monitoring.slow_callbacks import SlowCallbackMonitor
+from core.monitoring.startup import StartupTimer
+from core.monitoring.tracing import Tracer
+from core.utils.lazy_module import LazyModule
 
 
-class DiscordBot(Client):
+class DiscordBotMixin:
+    """Event handlers of the bot, for a single connection (DiscordBot) or several shards (ShardedDiscordBot).
+    Shard events are tracked by ShardMonitor, on shard 0 without sharding.
+    """
+    _gateway_events = Metrics.counter("tuinbot_gateway_events_total", "Gateway events received, by event.",
+                                      ("event",))
+    _gateway_rate = RateMeter()
+    Metrics.collected("tuinbot_gateway_events_per_second", "Gateway events per second, last minute.",
+                      lambda: {(): DiscordBotMixin._gateway_rate.get_rate()})
 
     def __init__(self, activity_name: str = None, **options):
         super().__init__(**options)
         self.activity_name = activity_name
+        self._is_started = False
+        ShardMonitor.configure(self)
+        MemberCache.attach(self)
+        EventDispatcher.configure(AppProperties.dispatcher_workers(),
+                                  AppProperties.dispatcher_queue_size(),
+                                  OverloadPolicy(AppProperties.dispatcher_overload_policy()))
+        self._configure(AppProperties.config())
+        AppProperties.add_reload_listener(self._on_config_reload)
+        EventRecorder.start(ClusterWorker.worker_path(AppProperties.record_file()))
+        ClusterWorker.register("metrics", lambda args: Metrics.render())
+        ClusterWorker.register("shards", lambda args: [asdict(report) for report in ShardMonitor.get_reports()])
+        ClusterWorker.register("members", lambda args: {
+            "stats": MemberCache.stats(),
+            "startup": StartupTimer.phases(),
+            "guilds": [asdict(report) for report in MemberCache.get_guild_reports()[:args.get("limit")]]})
+        ClusterWorker.register("reload", lambda args: AppProperties.reload())
         print("Starting Discord bot...")
 
+    @staticmethod
+    def _configure(config: BotConfig, changed_fields: Optional[Set[str]] = None):
+        """Components which can be configured again while running. On reload, only components whose
+        config changed are configured, as it resets their state (caches, rate limit buckets).
+        """
+        def has_changed(*names: str) -> bool:
+            return changed_fields is None or not changed_fields.isdisjoint(names)
+
+        AdmissionController.configure({LoadLevel.SHED_TYPING: config.shed_typing_thresholds,
+                                       LoadLevel.SHED_COSMETIC: config.shed_cosmetic_thresholds})
+        SlowCallbackMonitor.configure(config.slow_callback_threshold)
+        Tracer.configure(ClusterWorker.worker_path(config.trace_file), config.trace_sample_rate)
+
+        if has_changed("rate_limit_user", "rate_limit_guild", "rate_limit_command"):
+            CommandRateLimiter.configure(config.rate_limit_user, config.rate_limit_guild, config.rate_limit_command)
+        if has_changed("idle_typing_ttl", "idle_typing_cache_size"):
+            CommandManager.configure(config.idle_typing_ttl, config.idle_typing_cache_size)
+        if has_changed("permission_cache_ttl"):
+            PermissionCache.configure(config.permission_cache_ttl)
+
+    def _on_config_reload(self, old_config: BotConfig, new_config: BotConfig):
+        self._configure(new_config, set(old_config.changed_fields(new_config)))
+        # Commands help and param configs show limits.
+        CommandRepository.reload_commands()
+
+    @staticmethod
+    def _reload_config():
+        try:
+            AppProperties.reload()
+        except (OSError, ValueError) as e:
+            print("Config not reloaded: %s" % e)
+
+    async def setup_hook(self):
+        """Called after login, before connecting to gateway."""
+        StartupTimer.mark("login")
+        ClusterWorker.start()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self._reload_config)
+        except (AttributeError, NotImplementedError):
+            # No SIGHUP on Windows, "!tuin reload" only.
+            pass
+        # Imports overlap the gateway connection instead of delaying the first command.
+        TaskSupervisor.spawn(self._preload_modules(), "preload_modules", bounded=False)
+
+    @staticmethod
+    async def _preload_modules():
+        # Blocking imports, in a thread.
+        await asyncio.get_running_loop().run_in_executor(None, LazyModule.preload)
+
     async def on_ready(self):
-        print(f"Logged in as {self.user}!")
-        await self.change_presence(activity=Game("!" + self.activity_name))
+        """Called when all shards are ready, and again after a shard reconnects with a new session."""
+        if self._is_started:
+            return
+        self._is_started = True
+
+        print(f"Logged in as {self.user} ({ShardMonitor.ready_count()}/{ShardMonitor.shard_count()} shard(s) ready)!")
+        StartupTimer.mark("ready")
+        StartupTimer.report()
+        DeletionScheduler.start(self, ClusterWorker.worker_path(AppProperties.pending_deletions_file()))
+        LoopLagSampler.start()
+        InvalidationBus.start()
+
+        # Workers metrics are served by the launcher.
+        if AppProperties.metrics_port() and not ClusterWorker.is_worker():
+            await MetricsExporter.start(AppProperties.metrics_port())
+
+    async def on_shard_ready(self, shard_id: int):
+        ShardMonitor.on_ready(shard_id)
+        await self._set_presence(shard_id)
+
+    # noinspection PyMethodMayBeStatic
+    async def on_shard_connect(self, shard_id: int):
+        ShardMonitor.on_connect(shard_id)
+
+    # noinspection PyMethodMayBeStatic
+    async def on_shard_disconnect(self, shard_id: int):
+        ShardMonitor.on_disconnect(shard_id)
+
+    # noinspection PyMethodMayBeStatic
+    async def on_shard_resumed(self, shard_id: int):
+        ShardMonitor.on_resumed(shard_id)
+
+    def _get_activity(self) -> Game:
+        return Game("!" + self.activity_name)
+
+    async def _set_presence(self, shard_id: int):
+        raise NotImplementedError
+
+    async def close(self):
+        await TaskSupervisor.drain()
+        DeletionScheduler.save()
+        await MetricsExporter.stop()
+        await ClusterWorker.stop()
+        await InvalidationBus.stop()
+        Tracer.flush()
+        EventRecorder.flush()
+        await super().close()
+
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    async def on_guild_channel_update(self, before: GuildChannel, after: GuildChannel):
+        PermissionCache.invalidate(after.id)
+
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    async def on_guild_role_update(self, before: Role, after: Role):
+        PermissionCache.invalidate()
+
+    async def on_member_update(self, before: Member, after: Member):
+        if after.id == self.user.id:
+            PermissionCache.invalidate()
 
     async def on_message(self, message: Message):
-        CommandManager.manage_message(message, self)
+        self._count_event("message")
+        ShardMonitor.mark_event(message.guild)
+        EventRecorder.record_message(message)
+        await TaskSupervisor.wait_for_capacity()
+
+        is_command = CommandManager.is_command(message)
+        span = Tracer.start_trace("on_message", channel_id=message.channel.id, is_command=is_command)
+        if not EventDispatcher.dispatch(message.channel.id,
+                                        lambda: Tracer.run(span, CommandManager.manage_message(message, self)),
+                                        is_command):
+            span.set_attribute("dropped", True)
+            span.end()
 
     # noinspection PyMethodMayBeStatic
     async def on_typing(self, channel: Messageable, user: Union[User, Member], when: datetime):
-        CommandManager.manage_typing(channel, user, when)
+        self._count_event("typing")
+        ShardMonitor.mark_event(getattr(user, "guild", None))
+        EventRecorder.record_typing(channel, user)
+        await TaskSupervisor.wait_for_capacity()
+        EventDispatcher.dispatch(channel.id, lambda: CommandManager.manage_typing(channel, user, when), False)
+
+    @classmethod
+    def _count_event(cls, event: str):
+        cls._gateway_events.inc(event)
+        cls._gateway_rate.mark()
+
+
+class DiscordBot(DiscordBotMixin, Client):
+    """Single gateway connection, its events are reported as shard 0 ones."""
+
+    async def on_ready(self):
+        ShardMonitor.on_ready(0)
+        await self._set_presence(0)
+        await super().on_ready()
+
+    async def on_connect(self):
+        await self.on_shard_connect(0)
+
+    async def on_disconnect(self):
+        await self.on_shard_disconnect(0)
+
+    async def on_resumed(self):
+        await self.on_shard_resumed(0)
+
+    # noinspection PyUnusedLocal
+    async def _set_presence(self, shard_id: int):
+        await self.change_presence(activity=self._get_activity())
+
+
+class ShardedDiscordBot(DiscordBotMixin, AutoShardedClient):
+    """One gateway connection by shard, guilds are split between shards by Discord.
+    on_ready is only called when every shard is ready.
+    """
+
+    async def _set_presence(self, shard_id: int):
+        await self.change_presence(activity=self._get_activity(), shard_id=shard_id)
+
+
+def create_bot(activity_name: str, **options) -> Union[DiscordBot, ShardedDiscordBot]:
+    """Sharded according to `sharded` property, or with the shards given by launcher.py to a worker."""
+    config = AppProperties.config()
+    MemberCache.configure(MemberCachePolicy(config.member_cache), config.member_cache_size)
+    options.update(MemberCache.client_options())
+
+    if ClusterWorker.is_worker():
+        OutboundQueue.share_global_limits(ClusterWorker.worker_count())
+        return ShardedDiscordBot(activity_name, shard_ids=ClusterWorker.shard_ids(),
+                                 shard_count=ClusterWorker.shard_count(), **options)
+
+    if not AppProperties.sharded():
+        return DiscordBot(activity_name, **options)
+
+    # None: count recommended by Discord.
+    shard_count: Optional[int] = AppProperties.shard_count() or None
+    print("Sharding enabled, %s shard(s)" % (shard_count or "recommended count of"))
+    return ShardedDiscordBot(activity_name, shard_count=shard_count, **options)
@@ -0,0 +1,174 @@
+import asyncio
+import heapq
+import json
+import os
+from typing import List, Tuple, Set, Dict, Optional
+
+from discord import Message, Client, Object, TextChannel, Forbidden
+from discord.utils import snowflake_time
+
+from core.client.outbound import OutboundQueue
+from core.client.permissions import PermissionCache
+from core.utils.clock import Clock
+from core.utils.utils import Utils
+
+
+class DeletionScheduler:
+    """One task deletes all messages scheduled for deletion, grouping them by channel
+    to use bulk deletions. Pending deletions are saved to a file to survive restarts.
+    Bulk deletions need Manage Messages, without it only bot messages are deleted, one by one.
+    """
+    _BULK_MAX_MESSAGES = 100
+    # Discord refuses bulk deletion of messages older than 14 days.
+    _BULK_MAX_AGE = 14 * 24 * 3600 - 60
+    _SAVE_INTERVAL = 5
+
+    # (due timestamp, channel id, message id, is bot message)
+    _heap: List[Tuple[float, int, int, bool]] = []
+    _scheduled_ids: Set[int] = set()
+    # Channels with scheduled deletions, and their count.
+    _channels: Dict[int, TextChannel] = {}
+    _channel_counts: Dict[int, int] = {}
+
+    _client: Optional[Client] = None
+    _storage_path: Optional[str] = None
+    _is_dirty = False
+    _last_save = 0.0
+
+    _wakeup: Optional[asyncio.Event] = None
+    _worker: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls, client: Client, storage_path: str = None):
+        """Restores deletions saved by a previous run. Call it when client is ready."""
+        cls._client = client
+        cls._storage_path = storage_path
+
+        for due, channel_id, message_id, is_own in cls._load():
+            cls._push(due, channel_id, message_id, is_own)
+
+        cls._ensure_worker()
+
+    @classmethod
+    def schedule(cls, message: Message, delay: float):
+        cls._channels[message.channel.id] = message.channel
+        cls._push(Clock.wall_time() + delay, message.channel.id, message.id, message.author.id == message.guild.me.id)
+        cls._ensure_worker()
+
+    @classmethod
+    def is_scheduled(cls, message_id: int) -> bool:
+        return message_id in cls._scheduled_ids
+
+    @classmethod
+    def pending_count(cls) -> int:
+        return len(cls._heap)
+
+    @classmethod
+    def save(cls):
+        if not cls._storage_path:
+            return
+
+        with open(cls._storage_path, "w") as storage_file:
+            json.dump(cls._heap, storage_file)
+
+        cls._is_dirty = False
+        cls._last_save = Clock.monotonic()
+
+    @classmethod
+    def _load(cls) -> List[Tuple[float, int, int, bool]]:
+        if not cls._storage_path or not os.path.exists(cls._storage_path):
+            return []
+
+        try:
+            with open(cls._storage_path, "r") as storage_file:
+                # Files saved before the author was known: try to delete them as bot messages.
+                return [tuple((entry + [True])[:4]) for entry in json.load(storage_file)]
+        except (ValueError, TypeError) as e:
+            print("Can't restore pending deletions: %s" % e)
+            return []
+
+    @classmethod
+    def _push(cls, due: float, channel_id: int, message_id: int, is_own: bool):
+        if message_id in cls._scheduled_ids:
+            return
+
+        heapq.heappush(cls._heap, (due, channel_id, message_id, is_own))
+        cls._scheduled_ids.add(message_id)
+        cls._channel_counts[channel_id] = cls._channel_counts.get(channel_id, 0) + 1
+        cls._is_dirty = True
+
+        if cls._wakeup:
+            cls._wakeup.set()
+
+    @classmethod
+    def _ensure_worker(cls):
+        if cls._worker is None or cls._worker.done():
+            cls._wakeup = asyncio.Event()
+            cls._worker = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            due_by_channel: Dict[int, List[Tuple[int, bool]]] = {}
+
+            while cls._heap and cls._heap[0][0] <= Clock.wall_time():
+                due, channel_id, message_id, is_own = heapq.heappop(cls._heap)
+                cls._scheduled_ids.discard(message_id)
+                due_by_channel.setdefault(channel_id, []).append((message_id, is_own))
+                cls._is_dirty = True
+
+            for channel_id, messages in due_by_channel.items():
+                cls._delete_messages(channel_id, messages)
+
+                cls._channel_counts[channel_id] -= len(messages)
+                if not cls._channel_counts[channel_id]:
+                    del cls._channel_counts[channel_id]
+                    cls._channels.pop(channel_id, None)
+
+            if cls._is_dirty and Clock.monotonic() - cls._last_save >= cls._SAVE_INTERVAL:
+                cls.save()
+
+            wait_time = cls._heap[0][0] - Clock.wall_time() if cls._heap else None
+            if cls._is_dirty:
+                wait_time = min(wait_time, cls._SAVE_INTERVAL) if wait_time is not None else cls._SAVE_INTERVAL
+
+            cls._wakeup.clear()
+            try:
+                await asyncio.wait_for(cls._wakeup.wait(), wait_time)
+            except asyncio.TimeoutError:
+                pass
+
+    @classmethod
+    def _delete_messages(cls, channel_id: int, messages: List[Tuple[int, bool]]):
+        channel = cls._channels.get(channel_id) or (cls._client.get_channel(channel_id) if cls._client else None)
+        if not channel:
+            return
+
+        if not PermissionCache.get_permissions(channel).manage_messages:
+            cls._delete_own_messages(channel, [message_id for message_id, is_own in messages if is_own])
+            return
+
+        bulk_messages = []
+        for message_id, is_own in messages:
+            if Clock.wall_time() - snowflake_time(message_id).timestamp() < cls._BULK_MAX_AGE:
+                bulk_messages.append((message_id, is_own))
+            else:
+                OutboundQueue.delete(channel.get_partial_message(message_id))
+
+        for chunk in Utils.chunks(bulk_messages, cls._BULK_MAX_MESSAGES):
+            future = OutboundQueue.delete_messages(channel, [Object(id=message_id) for message_id, _ in chunk])
+            future.add_done_callback(lambda fut, c=chunk: cls._on_bulk_deleted(fut, channel, c))
+
+    @classmethod
+    def _on_bulk_deleted(cls, future: asyncio.Future, channel: TextChannel, messages: List[Tuple[int, bool]]):
+        """Permission removed since it was cached: bot messages can still be deleted."""
+        if future.cancelled() or not isinstance(future.exception(), Forbidden):
+            return
+
+        PermissionCache.invalidate(channel.id)
+        cls._delete_own_messages(channel, [message_id for message_id, is_own in messages if is_own])
+
+    @staticmethod
+    def _delete_own_messages(channel: TextChannel, message_ids: List[int]):
+        for message_id in message_ids:
+            OutboundQueue.delete(channel.get_partial_message(message_id))
@@ -0,0 +1,99 @@
+import asyncio
+import traceback
+from collections import deque
+from enum import Enum
+from typing import Dict, Deque, Callable, Coroutine, List, Optional, Any
+
+
+class OverloadPolicy(Enum):
+    # When a channel queue is full, only commands are still queued.
+    DROP_HOOKS = "drop_hooks"
+    # When a channel queue is full, every new event is dropped.
+    DROP_ALL = "drop_all"
+
+
+class EventDispatcher:
+    """Gateway events are queued by channel. A pool of workers serves the channels concurrently,
+    but events of one channel are handled one after the other, in reception order.
+    """
+    _workers_count = 8
+    _max_channel_queue = 50
+    _policy = OverloadPolicy.DROP_HOOKS
+    # Under DROP_HOOKS, commands may exceed the channel limit up to this factor, then they're dropped too.
+    _COMMAND_QUEUE_FACTOR = 2
+
+    # A channel is in this dict while it has events queued or being handled.
+    _queues: Dict[int, Deque[Callable[[], Coroutine]]] = {}
+    _ready_channels: Optional[asyncio.Queue] = None
+    _workers: List[asyncio.Task] = []
+
+    _dropped_count = 0
+
+    @classmethod
+    def configure(cls, workers_count: int, max_channel_queue: int, policy: OverloadPolicy):
+        cls._workers_count = workers_count
+        cls._max_channel_queue = max_channel_queue
+        cls._policy = policy
+
+    @classmethod
+    def dispatch(cls, channel_id: int, handler: Callable[[], Coroutine], is_command: bool) -> bool:
+        """Returns False if event was dropped."""
+        cls._ensure_workers()
+
+        queue = cls._queues.get(channel_id)
+
+        if queue is None:
+            cls._queues[channel_id] = deque((handler,))
+            cls._ready_channels.put_nowait(channel_id)
+            return True
+
+        if len(queue) >= cls._max_channel_queue and (cls._policy == OverloadPolicy.DROP_ALL or not is_command):
+            cls._dropped_count += 1
+            return False
+
+        if len(queue) >= cls._max_channel_queue * cls._COMMAND_QUEUE_FACTOR:
+            # Command flood.
+            cls._dropped_count += 1
+            return False
+
+        # Channel is already waiting for a worker, or being handled.
+        queue.append(handler)
+        return True
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            "channels": len(cls._queues),
+            "queued_events": sum(len(queue) for queue in cls._queues.values()),
+            "dropped_events": cls._dropped_count,
+        }
+
+    @classmethod
+    def _ensure_workers(cls):
+        if cls._ready_channels is None:
+            cls._ready_channels = asyncio.Queue()
+
+        cls._workers = [worker for worker in cls._workers if not worker.done()]
+
+        while len(cls._workers) < cls._workers_count:
+            cls._workers.append(asyncio.create_task(cls._work()))
+
+    @classmethod
+    async def _work(cls):
+        while True:
+            channel_id = await cls._ready_channels.get()
+            queue = cls._queues[channel_id]
+            handler = queue.popleft()
+
+            try:
+                await handler()
+            except Exception:
+                print("Error while handling event in channel %s:" % channel_id)
+                traceback.print_exc()
+            finally:
+                # Even if worker is cancelled, else the channel would never be served again.
+                # One event at a time, so a busy channel doesn't hold a worker.
+                if queue:
+                    cls._ready_channels.put_nowait(channel_id)
+                else:
+                    del cls._queues[channel_id]
@@ -0,0 +1,181 @@
+import asyncio
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Any, List, Tuple, Optional
+
+from discord import Member, Message, Guild, MemberCacheFlags, Client
+
+from core.utils.ttl_cache import TtlCache
+
+
+class MemberCachePolicy(Enum):
+    # Every member of every guild, requested at startup (chunking).
+    FULL = "full"
+    # Members seen in messages and typing events, or requested by commands, up to a max count.
+    LAZY = "lazy"
+
+
+@dataclass
+class GuildMemberReport:
+    guild_id: int
+    name: str
+    member_count: int
+    cached_count: int
+    estimated_bytes: int
+
+
+class MemberCache:
+    """Which members discord.py keeps in guilds, the ones used by guild.get_member() and channel.members.
+    In lazy mode, members are added to guilds when active and removed when least recently active,
+    commands parameters are looked up with gateway member requests before the command runs.
+    """
+    _QUERY_LIMIT = 5
+    _QUERY_TIMEOUT = 5
+    _MIN_QUERY_LENGTH = 3
+    _MAX_QUERIES_PER_COMMAND = 3
+    # A word already requested in a guild isn't requested again for a while, found or not.
+    _QUERIED_TTL = 60
+    _SIZE_SAMPLE = 50
+
+    _policy = MemberCachePolicy.FULL
+    _max_size = 5000
+    _client: Optional[Client] = None
+    # (guild id, user id) by activity, last is most recent.
+    _active: "OrderedDict[Tuple[int, int], Member]" = OrderedDict()
+    _queried: TtlCache[bool] = TtlCache(_QUERIED_TTL, 10000)
+    _query_count = 0
+    _eviction_count = 0
+
+    @classmethod
+    def configure(cls, policy: MemberCachePolicy, max_size: int):
+        cls._policy = policy
+        cls._max_size = max_size
+
+    @classmethod
+    def attach(cls, client: Client):
+        cls._client = client
+
+    @classmethod
+    def policy(cls) -> MemberCachePolicy:
+        return cls._policy
+
+    @classmethod
+    def client_options(cls) -> Dict[str, Any]:
+        """Options of discord.py Client, members intent is needed by both policies."""
+        if cls._policy == MemberCachePolicy.LAZY:
+            # Nothing cached by discord.py itself, except the bot member.
+            return {"chunk_guilds_at_startup": False, "member_cache_flags": MemberCacheFlags.none()}
+
+        return {"chunk_guilds_at_startup": True}
+
+    @classmethod
+    def remember(cls, member: Member):
+        """Marks member as active. Called for messages and typing events."""
+        if cls._policy != MemberCachePolicy.LAZY or not isinstance(member, Member):
+            return
+
+        key = (member.guild.id, member.id)
+        if key in cls._active:
+            cls._active.move_to_end(key)
+        # noinspection PyProtectedMember
+        member.guild._add_member(member)
+        cls._active[key] = member
+
+        while len(cls._active) > cls._max_size:
+            _, evicted = cls._active.popitem(last=False)
+            if evicted.id != evicted.guild.me.id:
+                # noinspection PyProtectedMember
+                evicted.guild._remove_member(evicted)
+                cls._eviction_count += 1
+
+    @classmethod
+    async def load_command_members(cls, message: Message, words: List[str]):
+        """Lazy mode: requests members matching words, the values of command user parameters, so they find them.
+        Mentioned members are in the message already.
+        """
+        if cls._policy != MemberCachePolicy.LAZY:
+            return
+
+        for member in message.mentions:
+            cls.remember(member)
+
+        guild = message.guild
+        queries = []
+        for word in words:
+            word = word.lower()
+            if word.startswith("<@") or len(word) < cls._MIN_QUERY_LENGTH or (guild.id, word) in cls._queried:
+                continue
+            if any(word in member.display_name.lower() or word in member.name.lower() for member in guild.members):
+                continue
+
+            cls._queried.set((guild.id, word), True)
+            queries.append(word)
+            if len(queries) >= cls._MAX_QUERIES_PER_COMMAND:
+                break
+
+        for word in queries:
+            cls._query_count += 1
+            try:
+                members = await asyncio.wait_for(guild.query_members(word, limit=cls._QUERY_LIMIT),
+                                                 cls._QUERY_TIMEOUT)
+            except asyncio.TimeoutError:
+                print("Member request timed out in guild %s" % guild.id)
+                continue
+
+            for member in members:
+                cls.remember(member)
+
+    @classmethod
+    async def fetch_member(cls, guild: Guild, user_id: int) -> Optional[Member]:
+        """Cached member, else requested in lazy mode. None if user left the guild."""
+        member = guild.get_member(user_id)
+        if member is not None or cls._policy != MemberCachePolicy.LAZY:
+            return member
+
+        cls._query_count += 1
+        try:
+            members = await asyncio.wait_for(guild.query_members(user_ids=[user_id], limit=1),
+                                             cls._QUERY_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+
+        for member in members:
+            cls.remember(member)
+        return members[0] if members else None
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {"policy": cls._policy.value, "active": len(cls._active), "queries": cls._query_count,
+                "evictions": cls._eviction_count}
+
+    @classmethod
+    def get_guild_reports(cls) -> List[GuildMemberReport]:
+        """Members kept by guild, with their memory estimated from a sample. Biggest guilds first."""
+        reports = []
+        for guild in cls._client.guilds if cls._client else []:
+            members = guild.members
+            sample = members[:cls._SIZE_SAMPLE]
+            average_bytes = sum(cls._estimate_size(member) for member in sample) / len(sample) if sample else 0
+            reports.append(GuildMemberReport(guild.id, guild.name, guild.member_count or 0, len(members),
+                                             int(average_bytes * len(members))))
+
+        reports.sort(key=lambda report: report.estimated_bytes, reverse=True)
+        return reports
+
+    @staticmethod
+    def _estimate_size(member: Member) -> int:
+        """Member and its user, with their direct attributes (name, roles...), shared objects counted too."""
+        size = 0
+        for obj in (member, getattr(member, "_user", None)):
+            if obj is None:
+                continue
+            size += sys.getsizeof(obj)
+            slots = set()
+            for base in type(obj).__mro__:
+                base_slots = getattr(base, "__slots__", ())
+                slots.update((base_slots,) if isinstance(base_slots, str) else base_slots)
+            for slot in slots:
+                size += sys.getsizeof(getattr(obj, slot, None))
+        return size
@@ -0,0 +1,291 @@
+import asyncio
+import heapq
+import itertools
+import time
+from enum import Enum, IntEnum
+from typing import List, Dict, Tuple, Set, Optional, Union, Any
+
+from discord import Message, TextChannel, Embed, HTTPException
+from discord.abc import Snowflake
+
+from core.client.tasks import TaskSupervisor
+from core.monitoring.metrics import Metrics
+from core.monitoring.tracing import Tracer
+from core.utils.rate_limit import TokenBucket
+
+
+class ActionPriority(IntEnum):
+    """Lower value is sent first."""
+    COMMAND = 1
+    HOOK = 2
+    DELETE = 3
+    REACTION = 4
+
+
+class ActionRoute(Enum):
+    SEND = 1
+    REACTION = 2
+    DELETE = 3
+
+
+class OutboundAction:
+
+    def __init__(self, priority: ActionPriority, route: ActionRoute, channel_id: int, target: Any, method: str,
+                 **kwargs):
+        self.priority = priority
+        self.route = route
+        self.channel_id = channel_id
+        self.target = target
+        self.method = method
+        self.kwargs = kwargs
+        self.seq = 0
+        self.future: Optional[asyncio.Future] = None
+        # Actions run in the queue worker, so they keep the span of the code that submitted them.
+        self.trace_parent = Tracer.current.get()
+        self.submit_time = time.perf_counter()
+
+    @property
+    def is_ordered(self) -> bool:
+        """Messages sent in a channel must keep their order, other routes can run concurrently."""
+        return self.route == ActionRoute.SEND
+
+    @property
+    def is_coalescable(self) -> bool:
+        """Only plain channel sends with embeds and nothing else can be merged into a single message."""
+        return self.method == "send" and list(self.kwargs.keys()) == ["embeds"]
+
+    def __lt__(self, other: "OutboundAction") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundQueue:
+    """Every Discord API call goes through this queue, so we can respect rate limits
+    and send important actions (command replies) before cosmetic ones (reactions).
+    """
+    # Discord allows up to 10 embeds per message.
+    MAX_EMBEDS_PER_MESSAGE = 10
+    _MAX_BUCKETS = 1000
+
+    # (capacity, refill rate per second)
+    _CHANNEL_LIMITS: Dict[ActionRoute, Tuple[float, float]] = {
+        ActionRoute.SEND: (5, 1),
+        ActionRoute.REACTION: (4, 4),
+        ActionRoute.DELETE: (5, 1),
+    }
+    _GLOBAL_LIMITS: Dict[ActionRoute, Tuple[float, float]] = {
+        ActionRoute.SEND: (50, 25),
+        ActionRoute.REACTION: (50, 25),
+        ActionRoute.DELETE: (50, 25),
+    }
+
+    # Heap of actions by (route, channel): only the first one of each can be sent next,
+    # as they share the channel bucket and, for sends, the channel order.
+    _pending: Dict[Tuple[ActionRoute, int], List[OutboundAction]] = {}
+    _channel_buckets: Dict[Tuple[ActionRoute, int], TokenBucket] = {}
+    _route_buckets: Dict[ActionRoute, TokenBucket] = {}
+    _busy_channels: Set[int] = set()
+    _seq = itertools.count()
+    _wakeup: Optional[asyncio.Event] = None
+    _worker: Optional[asyncio.Task] = None
+
+    _rate_limited_count = 0
+    _coalesced_count = 0
+    _sent_count: Dict[ActionRoute, int] = {route: 0 for route in ActionRoute}
+    _request_duration = Metrics.histogram("tuinbot_outbound_request_duration_seconds",
+                                          "Discord API call latency, by method.", ("method",))
+
+    @classmethod
+    def share_global_limits(cls, process_count: int):
+        """Global limits are per bot, processes of a cluster each get an even part of them."""
+        cls._GLOBAL_LIMITS = {route: (capacity / process_count, rate / process_count)
+                              for route, (capacity, rate) in cls._GLOBAL_LIMITS.items()}
+        cls._route_buckets.clear()
+
+    @classmethod
+    def send(cls, channel: TextChannel, content: str = None, embed: Embed = None,
+             priority: ActionPriority = ActionPriority.HOOK, **kwargs) -> asyncio.Future:
+        if content is not None:
+            kwargs["content"] = content
+        if embed is not None:
+            kwargs["embeds"] = [embed]
+
+        return cls._submit(OutboundAction(priority, ActionRoute.SEND, channel.id, channel, "send", **kwargs))
+
+    @classmethod
+    def reply(cls, message: Message, content: Union[Embed, str, None] = None,
+              priority: ActionPriority = ActionPriority.COMMAND, **kwargs) -> asyncio.Future:
+        if isinstance(content, Embed):
+            kwargs["embed"] = content
+        elif content is not None:
+            kwargs["content"] = content
+
+        return cls._submit(OutboundAction(priority, ActionRoute.SEND, message.channel.id, message, "reply", **kwargs))
+
+    @classmethod
+    def add_reaction(cls, message: Message, emoji: str) -> asyncio.Future:
+        return cls._submit(OutboundAction(ActionPriority.REACTION, ActionRoute.REACTION, message.channel.id, message,
+                                          "add_reaction", emoji=emoji))
+
+    @classmethod
+    def delete(cls, message: Message, priority: ActionPriority = ActionPriority.DELETE) -> asyncio.Future:
+        return cls._submit(OutboundAction(priority, ActionRoute.DELETE, message.channel.id, message, "delete"))
+
+    @classmethod
+    def delete_messages(cls, channel: TextChannel, messages: List[Snowflake],
+                        priority: ActionPriority = ActionPriority.DELETE) -> asyncio.Future:
+        """Bulk deletion, at most 100 messages."""
+        return cls._submit(OutboundAction(priority, ActionRoute.DELETE, channel.id, channel, "delete_messages",
+                                          messages=messages))
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            "queue_depth": sum(len(queue) for queue in cls._pending.values()),
+            "rate_limited": cls._rate_limited_count,
+            "coalesced": cls._coalesced_count,
+            "sent": {route.name.lower(): count for route, count in cls._sent_count.items()},
+        }
+
+    @classmethod
+    def _submit(cls, action: OutboundAction) -> asyncio.Future:
+        action.seq = next(cls._seq)
+        action.future = asyncio.get_event_loop().create_future()
+        # Failures are printed by the queue, so don't warn about exceptions no one retrieved.
+        action.future.add_done_callback(lambda fut: fut.cancelled() or fut.exception())
+
+        heapq.heappush(cls._pending.setdefault((action.route, action.channel_id), []), action)
+
+        if cls._worker is None or cls._worker.done():
+            cls._wakeup = asyncio.Event()
+            cls._worker = asyncio.create_task(cls._run())
+
+        cls._wakeup.set()
+        return action.future
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            actions, wait_time = cls._pop_ready_actions()
+
+            if not actions:
+                cls._wakeup.clear()
+                try:
+                    await asyncio.wait_for(cls._wakeup.wait(), wait_time)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            TaskSupervisor.spawn(cls._execute(actions), "outbound:%s" % actions[0].method, bounded=False)
+
+    @classmethod
+    def _pop_ready_actions(cls) -> Tuple[List[OutboundAction], Optional[float]]:
+        """Returns the first action allowed by rate limits (with the ones coalesced into it),
+        or the time to wait before the next one is allowed (None if queue is empty).
+        """
+        wait_time = None
+
+        for action in sorted(queue[0] for queue in cls._pending.values()):
+            if action.is_ordered and action.channel_id in cls._busy_channels:
+                continue
+
+            channel_bucket = cls._get_channel_bucket(action.route, action.channel_id)
+            route_bucket = cls._get_route_bucket(action.route)
+            action_wait = max(channel_bucket.time_until_available(), route_bucket.time_until_available())
+
+            if action_wait > 0:
+                wait_time = action_wait if wait_time is None else min(wait_time, action_wait)
+                continue
+
+            channel_bucket.try_acquire()
+            route_bucket.try_acquire()
+
+            key = (action.route, action.channel_id)
+            queue = cls._pending[key]
+            actions = [heapq.heappop(queue)]
+            if action.is_coalescable:
+                actions.extend(cls._pop_coalescable_actions(queue, action))
+
+            if not queue:
+                del cls._pending[key]
+
+            return actions, None
+
+        return [], wait_time
+
+    @classmethod
+    def _pop_coalescable_actions(cls, queue: List[OutboundAction], lead: OutboundAction) -> List[OutboundAction]:
+        """Next actions of the channel merged into lead action, up to the first one that can't be,
+        so messages are never sent out of order.
+        """
+        embed_count = len(lead.kwargs["embeds"])
+        actions = []
+
+        while queue and queue[0].is_coalescable:
+            embed_count += len(queue[0].kwargs["embeds"])
+            if embed_count > cls.MAX_EMBEDS_PER_MESSAGE:
+                break
+
+            actions.append(heapq.heappop(queue))
+
+        return actions
+
+    @classmethod
+    async def _execute(cls, actions: List[OutboundAction]):
+        lead_action = actions[0]
+        kwargs = lead_action.kwargs
+
+        if len(actions) > 1:
+            kwargs = {"embeds": [embed for action in actions for embed in action.kwargs["embeds"]]}
+            cls._coalesced_count += len(actions) - 1
+
+        if lead_action.is_ordered:
+            cls._busy_channels.add(lead_action.channel_id)
+
+        start_time = time.perf_counter()
+        span = Tracer.child_span(lead_action.trace_parent, "outbound", method=lead_action.method,
+                                 queue_wait_ms=(start_time - lead_action.submit_time) * 1000,
+                                 coalesced=len(actions) - 1)
+        try:
+            with span:
+                result = await getattr(lead_action.target, lead_action.method)(**kwargs)
+        except Exception as e:
+            if isinstance(e, HTTPException) and e.status == 429:
+                cls._rate_limited_count += 1
+                cls._get_channel_bucket(lead_action.route, lead_action.channel_id).drain()
+
+            print("Outbound %s failed: %s" % (lead_action.method, e))
+
+            for action in actions:
+                if not action.future.done():
+                    action.future.set_exception(e)
+        else:
+            cls._sent_count[lead_action.route] += 1
+            cls._request_duration.observe(time.perf_counter() - start_time, lead_action.method)
+
+            for action in actions:
+                if not action.future.done():
+                    action.future.set_result(result)
+        finally:
+            if lead_action.is_ordered:
+                cls._busy_channels.discard(lead_action.channel_id)
+            cls._wakeup.set()
+
+    @classmethod
+    def _get_channel_bucket(cls, route: ActionRoute, channel_id: int) -> TokenBucket:
+        key = (route, channel_id)
+
+        if key not in cls._channel_buckets:
+            if len(cls._channel_buckets) >= cls._MAX_BUCKETS:
+                # A full bucket is the same as a new one, no need to keep it.
+                cls._channel_buckets = {k: bucket for k, bucket in cls._channel_buckets.items()
+                                        if not bucket.is_full()}
+            cls._channel_buckets[key] = TokenBucket(*cls._CHANNEL_LIMITS[route])
+
+        return cls._channel_buckets[key]
+
+    @classmethod
+    def _get_route_bucket(cls, route: ActionRoute) -> TokenBucket:
+        if route not in cls._route_buckets:
+            cls._route_buckets[route] = TokenBucket(*cls._GLOBAL_LIMITS[route])
+
+        return cls._route_buckets[route]
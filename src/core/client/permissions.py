@@ -0,0 +1,34 @@
+from typing import Optional
+
+from discord import TextChannel, Permissions
+
+from core.utils.ttl_cache import TtlCache
+
+
+class PermissionCache:
+    """Bot permissions by channel. Computing them walks guild roles and channel overwrites,
+    so we keep a snapshot, cleared when channels or roles are updated.
+    """
+    _permissions: TtlCache[Permissions] = TtlCache(300, 1000)
+
+    @classmethod
+    def configure(cls, ttl: float):
+        cls._permissions = TtlCache(ttl, cls._permissions.max_size)
+
+    @classmethod
+    def get_permissions(cls, channel: TextChannel) -> Permissions:
+        permissions = cls._permissions.get(channel.id)
+
+        if permissions is None:
+            permissions = channel.permissions_for(channel.guild.me)
+            cls._permissions.set(channel.id, permissions)
+
+        return permissions
+
+    @classmethod
+    def invalidate(cls, channel_id: Optional[int] = None):
+        """Without channel_id, clears all channels."""
+        if channel_id is None:
+            cls._permissions.clear()
+        else:
+            cls._permissions.invalidate(channel_id)
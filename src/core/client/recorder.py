@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import json
+import os
+from typing import Optional, List, Dict, Any, Iterator, Union
+
+from discord import Message, Member, User
+from discord.abc import Messageable
+
+from core.command.factory import CommandFactory
+from core.utils.clock import Clock
+
+
+class EventRecorder:
+    """Writes gateway events, anonymized, to replay real traffic in load tests.
+    Ids are hashed with a key drawn for each run (so they can't be reversed), and only
+    the length of message contents is kept, with the command name for commands.
+    One JSON object per line with short keys, gzipped if file name ends with .gz.
+    """
+    _FLUSH_SIZE = 200
+
+    MESSAGE = "m"
+    TYPING = "t"
+    # Each run starts with this event: times restart from 0 and hashes change.
+    RUN_START = "s"
+
+    _file_path: Optional[str] = None
+    _hash_key = b""
+    _start_time = 0.0
+    _buffer: List[str] = []
+
+    @classmethod
+    def start(cls, file_path: Optional[str]):
+        """Recording is disabled without file_path."""
+        cls._file_path = file_path or None
+        cls._hash_key = os.urandom(16)
+        cls._start_time = Clock.monotonic()
+
+        if cls._file_path:
+            cls._write({"e": cls.RUN_START})
+            print("Recording events to %s" % cls._file_path)
+
+    @classmethod
+    def is_recording(cls) -> bool:
+        return cls._file_path is not None
+
+    @classmethod
+    def record_message(cls, message: Message):
+        if cls._file_path is None:
+            return
+
+        content = message.content
+        cls._write({
+            "e": cls.MESSAGE,
+            "g": cls._hash_id(message.guild.id if message.guild else None),
+            "c": cls._hash_id(message.channel.id),
+            "u": cls._hash_id(message.author.id),
+            "b": int(message.author.bot),
+            "l": len(content),
+            "cmd": cls._command_name(content),
+            "a": len(message.attachments),
+        })
+
+    @staticmethod
+    def _command_name(content: str) -> Optional[str]:
+        """Only the name of a registered command: anything else written after "!" may be private."""
+        if not content.startswith("!"):
+            return None
+
+        words = content[1:].split(maxsplit=1)
+        command = CommandFactory.get_command(words[0]) if words else None
+        return "!" + command.name() if command else None
+
+    @classmethod
+    def record_typing(cls, channel: Messageable, user: Union[User, Member]):
+        if cls._file_path is None:
+            return
+
+        guild = getattr(user, "guild", None)
+        cls._write({
+            "e": cls.TYPING,
+            "g": cls._hash_id(guild.id if guild else None),
+            "c": cls._hash_id(channel.id),
+            "u": cls._hash_id(user.id),
+            "b": int(user.bot),
+        })
+
+    @classmethod
+    def flush(cls):
+        if not cls._buffer or cls._file_path is None:
+            return
+
+        try:
+            with cls._open(cls._file_path, "at") as record_file:
+                record_file.write("\n".join(cls._buffer) + "\n")
+        except OSError as e:
+            print("Can't write recorded events: %s" % e)
+
+        cls._buffer.clear()
+
+    @classmethod
+    def read(cls, file_path: str) -> Iterator[Dict[str, Any]]:
+        with cls._open(file_path, "rt") as record_file:
+            for line in record_file:
+                if line.strip():
+                    yield json.loads(line)
+
+    @classmethod
+    def _write(cls, event: Dict[str, Any]):
+        event["t"] = round(Clock.monotonic() - cls._start_time, 3)
+        # None values are left out, it's smaller.
+        cls._buffer.append(json.dumps({key: value for key, value in event.items() if value is not None},
+                                      separators=(",", ":")))
+
+        if len(cls._buffer) >= cls._FLUSH_SIZE:
+            cls.flush()
+
+    @classmethod
+    def _hash_id(cls, snowflake: Optional[int]) -> Optional[int]:
+        if snowflake is None:
+            return None
+
+        digest = hashlib.blake2b(str(snowflake).encode(), digest_size=6, key=cls._hash_key).digest()
+        return int.from_bytes(digest, "big")
+
+    @staticmethod
+    def _open(file_path: str, mode: str):
+        if file_path.endswith(".gz"):
+            return gzip.open(file_path, mode, encoding="utf-8")
+        return open(file_path, mode, encoding="utf-8")
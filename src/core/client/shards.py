@@ -0,0 +1,154 @@
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from discord import Client, AutoShardedClient, Guild
+
+from core.client.permissions import PermissionCache
+from core.monitoring.histogram import RateMeter
+from core.utils.clock import Clock
+
+
+@dataclass
+class ShardState:
+    is_connected: bool = False
+    is_ready: bool = False
+    # Clock.monotonic() of last state change.
+    changed_time: float = 0.0
+    ready_count: int = 0
+    disconnect_count: int = 0
+    resume_count: int = 0
+    events: RateMeter = field(default_factory=RateMeter)
+
+
+@dataclass
+class ShardReport:
+    shard_id: int
+    latency: Optional[float]
+    guild_count: int
+    is_connected: bool
+    is_ready: bool
+    # Seconds since last state change.
+    state_age: float
+    events_per_second: float
+    disconnect_count: int
+    resume_count: int
+
+
+class ShardMonitor:
+    """Gateway connection state and traffic of each shard. Without sharding, everything is on shard 0."""
+    _client: Optional[Client] = None
+    _shards: Dict[int, ShardState] = {}
+
+    @classmethod
+    def configure(cls, client: Client):
+        cls._client = client
+        cls._shards = {}
+
+    @classmethod
+    def shard_count(cls) -> int:
+        return (cls._client.shard_count if cls._client else None) or 1
+
+    @classmethod
+    def shard_ids(cls) -> List[int]:
+        """Shards of this process, a part of them when the cluster has several workers."""
+        shard_ids = getattr(cls._client, "shard_ids", None)
+        return sorted(shard_ids) if shard_ids else list(range(cls.shard_count()))
+
+    @classmethod
+    def shard_of(cls, guild: Optional[Guild]) -> int:
+        # Private messages come through shard 0.
+        return guild.shard_id if guild is not None and cls.shard_count() > 1 else 0
+
+    @classmethod
+    def on_connect(cls, shard_id: int):
+        state = cls._get_state(shard_id)
+        state.is_connected = True
+        state.changed_time = Clock.monotonic()
+
+    @classmethod
+    def on_disconnect(cls, shard_id: int):
+        state = cls._get_state(shard_id)
+        if state.is_connected:
+            state.disconnect_count += 1
+        state.is_connected = False
+        state.is_ready = False
+        state.changed_time = Clock.monotonic()
+
+    @classmethod
+    def on_ready(cls, shard_id: int):
+        """A shard becomes ready again after a new session (not a resume): updates sent to this shard
+        while it was gone are lost, so its cached data is dropped.
+        """
+        state = cls._get_state(shard_id)
+        state.is_connected = True
+        state.is_ready = True
+        state.ready_count += 1
+        state.changed_time = Clock.monotonic()
+
+        if state.ready_count > 1:
+            for guild in cls._get_guilds(shard_id):
+                for channel in guild.channels:
+                    PermissionCache.invalidate(channel.id)
+
+    @classmethod
+    def on_resumed(cls, shard_id: int):
+        state = cls._get_state(shard_id)
+        state.is_connected = True
+        state.is_ready = True
+        state.resume_count += 1
+        state.changed_time = Clock.monotonic()
+
+    @classmethod
+    def mark_event(cls, guild: Optional[Guild]):
+        cls._get_state(cls.shard_of(guild)).events.mark()
+
+    @classmethod
+    def ready_count(cls) -> int:
+        return sum(1 for state in cls._shards.values() if state.is_ready)
+
+    @classmethod
+    def get_reports(cls) -> List[ShardReport]:
+        latencies = cls._get_latencies()
+        guild_counts: Dict[int, int] = {}
+        for guild in cls._client.guilds if cls._client else []:
+            shard_id = cls.shard_of(guild)
+            guild_counts[shard_id] = guild_counts.get(shard_id, 0) + 1
+
+        now = Clock.monotonic()
+        reports = []
+
+        for shard_id in cls.shard_ids():
+            state = cls._get_state(shard_id)
+            reports.append(ShardReport(shard_id, latencies.get(shard_id), guild_counts.get(shard_id, 0),
+                                       state.is_connected, state.is_ready, now - state.changed_time,
+                                       state.events.get_rate(), state.disconnect_count, state.resume_count))
+
+        return reports
+
+    @classmethod
+    def _get_state(cls, shard_id: int) -> ShardState:
+        state = cls._shards.get(shard_id)
+        if state is None:
+            state = cls._shards[shard_id] = ShardState(changed_time=Clock.monotonic())
+        return state
+
+    @classmethod
+    def _get_latencies(cls) -> Dict[int, float]:
+        """Latencies are infinite (or nan) before the first heartbeat, considered as unknown."""
+        if cls._client is None:
+            return {}
+
+        if isinstance(cls._client, AutoShardedClient):
+            latencies = cls._client.latencies
+        else:
+            latencies = [(0, cls._client.latency)]
+
+        return {shard_id: latency for shard_id, latency in latencies if math.isfinite(latency)}
+
+    @classmethod
+    def _get_guilds(cls, shard_id: int) -> List[Guild]:
+        if cls._client is None:
+            return []
+
+        return [guild for guild in cls._client.guilds if cls.shard_of(guild) == shard_id]
@@ -0,0 +1,122 @@
+import asyncio
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Set, Dict, Optional, Coroutine, Any
+
+from core.monitoring.slow_callbacks import SlowCallbackMonitor
+
+
+@dataclass
+class TaskStats:
+    count: int = 0
+    failures: int = 0
+    total_time: float = 0
+    max_time: float = 0
+
+
+class TaskSupervisor:
+    """Keeps a strong reference on every background task (asyncio only keeps weak ones),
+    prints their failures, records their duration and limits how many run at once.
+    """
+    _MAX_RUNNING = 50
+    # Beyond this count of tracked tasks, event handlers wait before creating more work.
+    _HIGH_WATER = 500
+
+    _tasks: Set[asyncio.Task] = set()
+    _stats: Dict[str, TaskStats] = {}
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _capacity: Optional[asyncio.Event] = None
+
+    @classmethod
+    def spawn(cls, coro: Coroutine, name: str, bounded: bool = True) -> asyncio.Task:
+        """bounded : False for tasks that other tasks wait for (e.g. API calls), they must not wait for a slot."""
+        task = asyncio.create_task(cls._supervise(coro, name, bounded))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._on_task_done)
+
+        if len(cls._tasks) >= cls._HIGH_WATER:
+            cls._get_capacity_event().clear()
+
+        return task
+
+    @classmethod
+    async def wait_for_capacity(cls):
+        await cls._get_capacity_event().wait()
+
+    @classmethod
+    async def drain(cls, timeout: float = 10):
+        """Waits for running tasks, then cancels the ones still running after timeout."""
+        if not cls._tasks:
+            return
+
+        print("Waiting for %s task(s) to finish..." % len(cls._tasks))
+        done, pending = await asyncio.wait(set(cls._tasks), timeout=timeout)
+
+        for task in pending:
+            task.cancel()
+
+        if pending:
+            await asyncio.wait(pending)
+            print("%s task(s) cancelled." % len(pending))
+
+    @classmethod
+    def running_count(cls) -> int:
+        return len(cls._tasks)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            "running": len(cls._tasks),
+            "tasks": {name: vars(stats).copy() for name, stats in cls._stats.items()},
+        }
+
+    @classmethod
+    async def _supervise(cls, coro: Coroutine, name: str, bounded: bool):
+        if bounded:
+            try:
+                await cls._get_semaphore().acquire()
+            except asyncio.CancelledError:
+                # Avoids the "coroutine was never awaited" warning.
+                coro.close()
+                raise
+
+        stats = cls._stats.setdefault(name, TaskStats())
+        start_time = time.perf_counter()
+
+        try:
+            await SlowCallbackMonitor.timed(coro, name)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.failures += 1
+            print("Task '%s' failed:" % name)
+            traceback.print_exc()
+        finally:
+            duration = time.perf_counter() - start_time
+            stats.count += 1
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+
+            if bounded:
+                cls._get_semaphore().release()
+
+    @classmethod
+    def _on_task_done(cls, task: asyncio.Task):
+        cls._tasks.discard(task)
+
+        if len(cls._tasks) < cls._HIGH_WATER:
+            cls._get_capacity_event().set()
+
+    @classmethod
+    def _get_semaphore(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(cls._MAX_RUNNING)
+        return cls._semaphore
+
+    @classmethod
+    def _get_capacity_event(cls) -> asyncio.Event:
+        if cls._capacity is None:
+            cls._capacity = asyncio.Event()
+            cls._capacity.set()
+        return cls._capacity
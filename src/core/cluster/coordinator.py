@@ -0,0 +1,127 @@
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+from core.cluster.protocol import Connection, ClusterError
+
+
+@dataclass
+class WorkerInfo:
+    worker_id: int
+    pid: int
+    shard_ids: List[int]
+    connection: Connection
+
+
+class Coordinator:
+    """Runs in the launcher process: workers connect to it, so admin commands and metrics
+    can gather results of every worker.
+    """
+    _HOST = "127.0.0.1"
+    _QUERY_TIMEOUT = 5
+    _sample_reg = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)})?( .*)$")
+
+    _server: Optional[asyncio.AbstractServer] = None
+    _workers: Dict[int, WorkerInfo] = {}
+
+    @classmethod
+    async def start(cls, port: int):
+        cls._server = await asyncio.start_server(cls._on_connection, cls._HOST, port, limit=Connection._MAX_LINE)
+        print("Coordinator listening on %s:%s" % (cls._HOST, port))
+
+    @classmethod
+    async def stop(cls):
+        if cls._server is not None:
+            cls._server.close()
+            await cls._server.wait_closed()
+            cls._server = None
+
+        for worker in list(cls._workers.values()):
+            worker.connection.close()
+
+    @classmethod
+    def workers(cls) -> List[WorkerInfo]:
+        return [cls._workers[worker_id] for worker_id in sorted(cls._workers)]
+
+    @classmethod
+    async def gather(cls, query: str, args: Dict[str, Any] = None) -> Dict[int, Any]:
+        """Results by worker id, an error message for a worker which couldn't answer."""
+        workers = cls.workers()
+        results = await asyncio.gather(*[worker.connection.request(query, cls._QUERY_TIMEOUT, args)
+                                         for worker in workers], return_exceptions=True)
+
+        return {worker.worker_id: ({"error": "%s: %s" % (type(result).__name__, result)}
+                                   if isinstance(result, Exception) else result)
+                for worker, result in zip(workers, results)}
+
+    @classmethod
+    async def render_metrics(cls) -> str:
+        """Metrics of all workers, with a worker label."""
+        families: Dict[str, List[str]] = {}
+        headers: Dict[str, List[str]] = {}
+
+        for worker_id, text in (await cls.gather("metrics")).items():
+            if not isinstance(text, str):
+                continue
+
+            family = None
+            for line in text.splitlines():
+                if line.startswith("# "):
+                    family = line.split(" ")[2]
+                    family_headers = headers.setdefault(family, [])
+                    if len(family_headers) < 2:
+                        family_headers.append(line)
+                    families.setdefault(family, [])
+                elif line and family is not None:
+                    families[family].append(cls._add_worker_label(line, worker_id))
+
+        lines = ["# HELP tuinbot_cluster_workers Workers connected to coordinator.",
+                 "# TYPE tuinbot_cluster_workers gauge",
+                 "tuinbot_cluster_workers %s" % len(cls._workers)]
+        for family, samples in families.items():
+            lines.extend(headers[family])
+            lines.extend(samples)
+
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def _add_worker_label(cls, sample: str, worker_id: int) -> str:
+        match = cls._sample_reg.match(sample)
+        if match is None:
+            return sample
+
+        name, labels, value = match.groups()
+        labels = 'worker="%s"' % worker_id + ("," + labels if labels else "")
+        return "%s{%s}%s" % (name, labels, value)
+
+    @classmethod
+    async def _on_connection(cls, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = Connection(reader, writer, cls._handle)
+
+        try:
+            hello = await connection.receive()
+        except (ConnectionError, ValueError):
+            hello = None
+
+        if hello is None or hello.get("type") != "hello":
+            connection.close()
+            return
+
+        worker = WorkerInfo(hello["worker"], hello["pid"], hello["shards"], connection)
+        cls._workers[worker.worker_id] = worker
+        print("Worker %s connected (pid %s, shards %s)" % (worker.worker_id, worker.pid, worker.shard_ids))
+
+        try:
+            await connection.run()
+        finally:
+            if cls._workers.get(worker.worker_id) is worker:
+                del cls._workers[worker.worker_id]
+            print("Worker %s disconnected" % worker.worker_id)
+
+    @classmethod
+    async def _handle(cls, query: str, args: Dict[str, Any]) -> Any:
+        if query == "gather":
+            return await cls.gather(args["query"], args.get("args"))
+
+        raise ClusterError("Unknown query %s" % query)
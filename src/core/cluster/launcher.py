@@ -0,0 +1,146 @@
+import asyncio
+import os
+import signal
+import sys
+import time
+from typing import List, Optional
+
+import aiohttp
+
+from core.cluster.coordinator import Coordinator
+from core.cluster.worker import ClusterWorker
+from core.monitoring.exporter import MetricsExporter
+
+
+class Launcher:
+    """Starts worker processes running TuinBot.py, each one owning a part of the shards,
+    restarts them when they crash, and runs the coordinator.
+    """
+    _BOT_SCRIPT = "TuinBot.py"
+    _GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+    # Discord allows one shard login every 5 seconds.
+    _IDENTIFY_INTERVAL = 5
+    _RESTART_DELAYS = (5, 10, 30, 60)
+    # A worker running longer than this is considered healthy, restart delay is reset.
+    _HEALTHY_TIME = 300
+    _STOP_TIMEOUT = 30
+
+    _is_stopping = False
+    _processes: List[Optional[asyncio.subprocess.Process]] = []
+
+    @staticmethod
+    def partition(shard_count: int, worker_count: int) -> List[List[int]]:
+        """Shards spread across workers: guild shard is (guild_id >> 22) % shard_count, so each
+        worker gets an even part of guilds.
+        """
+        return [list(range(worker_id, shard_count, worker_count)) for worker_id in range(worker_count)]
+
+    @classmethod
+    async def run(cls, worker_count: int, shard_count: int, coordinator_port: int, metrics_port: int,
+                  bot_token: str):
+        """shard_count 0 uses the count recommended by Discord."""
+        if not shard_count:
+            shard_count = await cls._fetch_recommended_shard_count(bot_token)
+            print("Discord recommends %s shard(s)" % shard_count)
+        # Each worker needs at least one shard.
+        shard_count = max(shard_count, worker_count)
+        partition = cls.partition(shard_count, worker_count)
+        cls._processes = [None] * worker_count
+
+        await Coordinator.start(coordinator_port)
+        if metrics_port:
+            await MetricsExporter.start(metrics_port, render=Coordinator.render_metrics)
+
+        stop_event = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal_number, stop_event.set)
+            except NotImplementedError:
+                # Windows: Ctrl+C raises KeyboardInterrupt instead.
+                pass
+        if hasattr(signal, "SIGHUP"):
+            # Workers reload bot.properties.
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, cls._send_signal, signal.SIGHUP)
+
+        print("Starting %s workers for %s shards" % (worker_count, shard_count))
+        start_delay = 0
+        supervisors = []
+        for worker_id, shard_ids in enumerate(partition):
+            supervisors.append(asyncio.create_task(cls._supervise(worker_id, shard_ids, shard_count,
+                                                                  coordinator_port, start_delay)))
+            start_delay += len(shard_ids) * cls._IDENTIFY_INTERVAL
+
+        try:
+            await stop_event.wait()
+        finally:
+            await cls._stop(supervisors)
+
+    @classmethod
+    async def _supervise(cls, worker_id: int, shard_ids: List[int], shard_count: int, coordinator_port: int,
+                         start_delay: float):
+        await asyncio.sleep(start_delay)
+
+        env = dict(os.environ)
+        env[ClusterWorker.ENV_WORKER_ID] = str(worker_id)
+        env[ClusterWorker.ENV_SHARD_IDS] = ",".join(str(shard_id) for shard_id in shard_ids)
+        env[ClusterWorker.ENV_SHARD_COUNT] = str(shard_count)
+        env[ClusterWorker.ENV_WORKER_COUNT] = str(len(cls._processes))
+        env[ClusterWorker.ENV_COORDINATOR_PORT] = str(coordinator_port)
+
+        crash_count = 0
+        while not cls._is_stopping:
+            start_time = time.monotonic()
+            # Own session: Ctrl+C in terminal only reaches launcher, which stops workers cleanly.
+            process = await asyncio.create_subprocess_exec(sys.executable, cls._BOT_SCRIPT, env=env,
+                                                           start_new_session=True)
+            cls._processes[worker_id] = process
+            return_code = await process.wait()
+            cls._processes[worker_id] = None
+
+            if cls._is_stopping:
+                break
+
+            if time.monotonic() - start_time >= cls._HEALTHY_TIME:
+                crash_count = 0
+            delay = cls._RESTART_DELAYS[min(crash_count, len(cls._RESTART_DELAYS) - 1)]
+            crash_count += 1
+
+            print("Worker %s exited with code %s, restarting in %s s" % (worker_id, return_code, delay))
+            await asyncio.sleep(delay)
+
+    @classmethod
+    async def _fetch_recommended_shard_count(cls, bot_token: str) -> int:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(cls._GATEWAY_URL, headers={"Authorization": "Bot %s" % bot_token}) as response:
+                response.raise_for_status()
+                return (await response.json())["shards"]
+
+    @classmethod
+    def _send_signal(cls, signal_number: int):
+        for process in cls._processes:
+            if process is not None and process.returncode is None:
+                process.send_signal(signal_number)
+
+    @classmethod
+    async def _stop(cls, supervisors: List[asyncio.Task]):
+        """Workers get SIGINT, like Ctrl+C, so they save pending deletions before exiting."""
+        cls._is_stopping = True
+        print("Stopping workers...")
+
+        for process in cls._processes:
+            if process is None or process.returncode is not None:
+                continue
+            if sys.platform == "win32":
+                process.terminate()
+            else:
+                process.send_signal(signal.SIGINT)
+
+        done, pending = await asyncio.wait(supervisors, timeout=cls._STOP_TIMEOUT)
+        for process in cls._processes:
+            if process is not None and process.returncode is None:
+                process.kill()
+        for task in pending:
+            task.cancel()
+
+        await MetricsExporter.stop()
+        await Coordinator.stop()
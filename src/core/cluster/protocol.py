@@ -0,0 +1,96 @@
+import asyncio
+import itertools
+import json
+from typing import Dict, Any, Callable, Awaitable, Optional
+
+# Handles a query, returns a JSON serializable result.
+QueryHandler = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+
+class ClusterError(Exception):
+    pass
+
+
+class Connection:
+    """Requests in both directions over a local socket, one JSON object per line:
+    {"type": "request", "id", "query", "args"} is answered with {"type": "response", "id", "result"}
+    or {"type": "error", "id", "error"}.
+    """
+    _MAX_LINE = 16 * 1024 * 1024
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, handler: QueryHandler):
+        self._reader = reader
+        self._writer = writer
+        self._handler = handler
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._tasks = set()
+
+    @classmethod
+    async def open(cls, host: str, port: int, handler: QueryHandler) -> "Connection":
+        reader, writer = await asyncio.open_connection(host, port, limit=cls._MAX_LINE)
+        return cls(reader, writer, handler)
+
+    async def request(self, query: str, timeout: float, args: Dict[str, Any] = None) -> Any:
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+
+        try:
+            await self.send({"type": "request", "id": request_id, "query": query, "args": args or {}})
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def send(self, message: Dict[str, Any]):
+        self._writer.write(json.dumps(message, separators=(",", ":"), default=str).encode("utf-8") + b"\n")
+        await self._writer.drain()
+
+    async def receive(self) -> Optional[Dict[str, Any]]:
+        """Next message, None when connection is closed."""
+        line = await self._reader.readline()
+        return json.loads(line) if line else None
+
+    async def run(self):
+        """Serves requests and dispatches responses until connection is closed."""
+        try:
+            while True:
+                message = await self.receive()
+                if message is None:
+                    break
+
+                if message["type"] == "request":
+                    task = asyncio.create_task(self._answer(message))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                    continue
+
+                future = self._pending.get(message["id"])
+                if future is None or future.done():
+                    continue
+
+                if message["type"] == "error":
+                    future.set_exception(ClusterError(message["error"]))
+                else:
+                    future.set_result(message["result"])
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            print("Cluster connection lost: %s" % e)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ClusterError("Connection closed"))
+            self.close()
+
+    def close(self):
+        self._writer.close()
+
+    async def _answer(self, message: Dict[str, Any]):
+        try:
+            result = await self._handler(message["query"], message.get("args") or {})
+            response = {"type": "response", "id": message["id"], "result": result}
+        except Exception as e:
+            response = {"type": "error", "id": message["id"], "error": "%s: %s" % (type(e).__name__, e)}
+
+        try:
+            await self.send(response)
+        except ConnectionError:
+            pass
@@ -0,0 +1,138 @@
+import asyncio
+import os
+from typing import Optional, List, Dict, Any, Callable
+
+from core.cluster.protocol import Connection, ClusterError
+
+# Answers a query of the coordinator, returns a JSON serializable result.
+LocalHandler = Callable[[Dict[str, Any]], Any]
+
+
+class ClusterWorker:
+    """Place of this process in a cluster started by launcher.py, read from environment variables.
+    A worker owns some shards, so it only receives events of their guilds: in-memory caches are
+    partitioned by guild without any coordination.
+    Outside of a cluster, queries are answered locally as if there was a single worker 0.
+    """
+    ENV_WORKER_ID = "TUINBOT_WORKER_ID"
+    ENV_SHARD_IDS = "TUINBOT_SHARD_IDS"
+    ENV_SHARD_COUNT = "TUINBOT_SHARD_COUNT"
+    ENV_WORKER_COUNT = "TUINBOT_WORKER_COUNT"
+    ENV_COORDINATOR_PORT = "TUINBOT_COORDINATOR_PORT"
+
+    _HOST = "127.0.0.1"
+    _QUERY_TIMEOUT = 10
+    _RECONNECT_DELAY = 5
+
+    _worker_id: Optional[int] = None
+    _shard_ids: List[int] = []
+    _shard_count = 1
+    _worker_count = 1
+    _coordinator_port = 0
+
+    _handlers: Dict[str, LocalHandler] = {}
+    _connection: Optional[Connection] = None
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def load_environment(cls):
+        worker_id = os.environ.get(cls.ENV_WORKER_ID)
+        if worker_id is None:
+            return
+
+        cls._worker_id = int(worker_id)
+        cls._shard_ids = [int(shard_id) for shard_id in os.environ[cls.ENV_SHARD_IDS].split(",")]
+        cls._shard_count = int(os.environ[cls.ENV_SHARD_COUNT])
+        cls._worker_count = int(os.environ[cls.ENV_WORKER_COUNT])
+        cls._coordinator_port = int(os.environ[cls.ENV_COORDINATOR_PORT])
+        print("Worker %s, shards %s of %s" % (cls._worker_id, cls._shard_ids, cls._shard_count))
+
+    @classmethod
+    def is_worker(cls) -> bool:
+        return cls._worker_id is not None
+
+    @classmethod
+    def worker_id(cls) -> int:
+        return cls._worker_id or 0
+
+    @classmethod
+    def shard_ids(cls) -> List[int]:
+        return cls._shard_ids
+
+    @classmethod
+    def shard_count(cls) -> int:
+        return cls._shard_count
+
+    @classmethod
+    def worker_count(cls) -> int:
+        """Processes of the cluster, 1 outside of a cluster."""
+        return cls._worker_count
+
+    @classmethod
+    def worker_path(cls, path: str) -> str:
+        """Files written by the bot (pending deletions, traces...) get one version per worker."""
+        if not path or not cls.is_worker():
+            return path
+
+        directory, file_name = os.path.split(path)
+        base_name, dot, extension = file_name.partition(".")
+        return os.path.join(directory, "%s.worker%s%s%s" % (base_name, cls._worker_id, dot, extension))
+
+    @classmethod
+    def register(cls, query: str, handler: LocalHandler):
+        cls._handlers[query] = handler
+
+    @classmethod
+    def start(cls):
+        """Connects to the coordinator, reconnecting when connection is lost. Nothing to do outside of a cluster."""
+        if cls.is_worker() and (cls._task is None or cls._task.done()):
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
+        if cls._connection is not None:
+            cls._connection.close()
+            cls._connection = None
+
+    @classmethod
+    async def query_cluster(cls, query: str, **args) -> Dict[int, Any]:
+        """Results of every worker, by worker id. A worker which can't answer has an error message."""
+        if not cls.is_worker():
+            return {0: cls._answer_local(query, args)}
+
+        if cls._connection is None:
+            raise ClusterError("Not connected to coordinator")
+
+        results = await cls._connection.request("gather", cls._QUERY_TIMEOUT, {"query": query, "args": args})
+        return {int(worker_id): result for worker_id, result in results.items()}
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            try:
+                connection = await Connection.open(cls._HOST, cls._coordinator_port, cls._handle)
+                await connection.send({"type": "hello", "worker": cls._worker_id, "pid": os.getpid(),
+                                       "shards": cls._shard_ids})
+                cls._connection = connection
+                await connection.run()
+            except OSError as e:
+                print("Can't connect to coordinator: %s" % e)
+            finally:
+                cls._connection = None
+
+            await asyncio.sleep(cls._RECONNECT_DELAY)
+
+    @classmethod
+    async def _handle(cls, query: str, args: Dict[str, Any]) -> Any:
+        return cls._answer_local(query, args)
+
+    @classmethod
+    def _answer_local(cls, query: str, args: Dict[str, Any]) -> Any:
+        handler = cls._handlers.get(query)
+        if handler is None:
+            raise ClusterError("Unknown query %s" % query)
+
+        return handler(args)
@@ -0,0 +1,86 @@
+from enum import IntEnum
+from typing import Dict, Tuple, Type, Any
+
+from core.command.types import Command, HookType
+from core.monitoring.loop_lag import LoopLagSampler
+from core.utils.clock import Clock
+
+
+class LoadLevel(IntEnum):
+    NORMAL = 0
+    # Typing hooks are skipped.
+    SHED_TYPING = 1
+    # Cosmetic message hooks (reactions) are also skipped.
+    SHED_COSMETIC = 2
+
+
+class AdmissionController:
+    """Skips hooks when the bot is overloaded, so commands stay responsive.
+    Commands are never shed.
+    """
+    # Weight of a new sample in the moving average.
+    _DB_SMOOTHING = 0.2
+    # Without recent DB request, DB latency is considered as recovered.
+    _DB_SAMPLE_MAX_AGE = 10
+
+    # (loop lag, DB latency) in seconds, reaching one of them activates the level.
+    _thresholds: Dict[LoadLevel, Tuple[float, float]] = {
+        LoadLevel.SHED_TYPING: (0.1, 0.2),
+        LoadLevel.SHED_COSMETIC: (0.3, 0.5),
+    }
+
+    _db_latency = 0.0
+    _db_latency_time = 0.0
+    _shed_counts: Dict[str, int] = {}
+
+    @classmethod
+    def configure(cls, thresholds: Dict[LoadLevel, Tuple[float, float]]):
+        cls._thresholds = thresholds
+
+    @classmethod
+    def record_db_latency(cls, duration: float):
+        cls._db_latency += (duration - cls._db_latency) * cls._DB_SMOOTHING
+        cls._db_latency_time = Clock.monotonic()
+
+    @classmethod
+    def get_db_latency(cls) -> float:
+        if Clock.monotonic() - cls._db_latency_time > cls._DB_SAMPLE_MAX_AGE:
+            return 0.0
+        return cls._db_latency
+
+    @classmethod
+    def get_level(cls) -> LoadLevel:
+        loop_lag = LoopLagSampler.get_lag()
+        db_latency = cls.get_db_latency()
+
+        for level in sorted(cls._thresholds.keys(), reverse=True):
+            max_loop_lag, max_db_latency = cls._thresholds[level]
+            if loop_lag >= max_loop_lag or db_latency >= max_db_latency:
+                return level
+
+        return LoadLevel.NORMAL
+
+    @classmethod
+    def admit_hook(cls, hook: Type[Command]) -> bool:
+        level = cls.get_level()
+
+        if level >= LoadLevel.SHED_COSMETIC and hook.hook_is_cosmetic():
+            is_shed = True
+        elif level >= LoadLevel.SHED_TYPING and hook.hook_type() == HookType.TYPING:
+            is_shed = True
+        else:
+            is_shed = False
+
+        if is_shed:
+            cls._shed_counts[hook.name()] = cls._shed_counts.get(hook.name(), 0) + 1
+
+        return not is_shed
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            "level": cls.get_level().name.lower(),
+            "loop_lag": LoopLagSampler.get_lag(),
+            "db_latency": cls.get_db_latency(),
+            "shed_hooks": cls._shed_counts.copy(),
+        }
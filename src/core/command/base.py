@@ -1,14 +1,21 @@
-import asyncio
+import math
 import sys
+import time
 from abc import ABC, abstractmethod
 from typing import List, Dict, Callable, Union, Coroutine
 
 from discord import Message, Client, Embed
 
+from core.client.deletion import DeletionScheduler
+from core.client.outbound import OutboundQueue, ActionPriority
+from core.client.tasks import TaskSupervisor
+from core.command.repository import CommandRepository
 from core.command.types import Command
 from core.executor.base import ParamResultType
 from core.executor.factory import ParamExecutorFactory
 from core.message.messages import Messages
+from core.monitoring.metrics import Metrics
+from core.monitoring.tracing import Tracer
 from core.param.syntax import CommandSyntax
 from core.utils.utils import Utils
 
@@ -23,17 +30,32 @@ class BaseCommand(Command, ABC):
     _min_params_count = None
     _max_params_count = None
 
+    _HELP_SYNTAX = "help"
+    _ERROR_SYNTAX = "error"
+    _command_duration = Metrics.histogram("tuinbot_command_duration_seconds",
+                                          "Command execution time, by command and syntax title.",
+                                          ("command", "syntax"))
+
     @classmethod
     def execute(cls, message: Message, command_params: List[str], client: Client):
+        start_time = time.perf_counter()
+        with Tracer.span("execute", command=cls.name()) as span:
+            syntax_title = cls._execute_syntax(message, command_params, client)
+            span.set_attribute("syntax", syntax_title)
+        cls._command_duration.observe(time.perf_counter() - start_time, cls.name(), syntax_title)
+
+    @classmethod
+    def _execute_syntax(cls, message: Message, command_params: List[str], client: Client) -> str:
+        """Returns title of executed syntax."""
         if not command_params or not cls.get_syntaxes():
             cls._display_help(message)
-            return
+            return cls._HELP_SYNTAX
 
         syntaxes = cls._get_sorted_syntaxes()
 
         if len(command_params) < cls._min_params_count or len(command_params) > cls._max_params_count:
             cls._display_error(message, "Nombre de paramètres inattendu !")
-            return
+            return cls._ERROR_SYNTAX
 
         """ Stores one executor by parameter index and parameter name,
         so we parse each parameter only once.
@@ -71,7 +93,7 @@ class BaseCommand(Command, ABC):
                     break
                 elif executor.get_result_type() == ParamResultType.INVALID:
                     cls._display_error(message, executor.get_error())
-                    return
+                    return cls._ERROR_SYNTAX
                 # else:
                 #     if executor.get_result_type() == ParamResultType.INVALID:
                 #         cls._display_error(message, executor.get_error())
@@ -81,16 +103,17 @@ class BaseCommand(Command, ABC):
 
             if syntax_is_valid:
                 syntax.callback(message, *syntax_executors)  # [:len(syntax.params)])
-                return
+                return syntax.title
 
             last_syntax = syntax
             last_executor = executor
 
         if last_syntax and last_executor and last_executor.get_error():
             cls._display_error(message, last_executor.get_error())
-            return
+            return cls._ERROR_SYNTAX
 
         cls._display_error(message, """Oups, tu as dû faire une petite erreur quelque part.""")
+        return cls._ERROR_SYNTAX
 
         # cls._display_error(message, """Oups, il semble que quelque chose ne tourne pas rond...""")
 
@@ -111,6 +134,11 @@ class BaseCommand(Command, ABC):
 
         return cls._syntaxes
 
+    @classmethod
+    def reset_syntaxes(cls):
+        cls._syntaxes = None
+        cls._sorted_syntaxes = None
+
     @classmethod
     def _get_sorted_syntaxes(cls) -> List[CommandSyntax]:
         if cls._sorted_syntaxes is None:
@@ -130,7 +158,11 @@ class BaseCommand(Command, ABC):
 
     @classmethod
     def _display_help(cls, message: Message):
-        cls._reply(message, cls.get_help(), cls._delete_delay_help)
+        cls._reply(message, CommandRepository.get_help(cls), cls._delete_delay_help)
+
+    @classmethod
+    def display_throttle_notice(cls, message: Message, retry_after: float):
+        cls._reply(message, Messages.throttled.format(math.ceil(retry_after)), cls._delete_delay_error)
 
     @classmethod
     def _execute_db_bool_request(cls, func: Callable, message):
@@ -147,18 +179,15 @@ class BaseCommand(Command, ABC):
     @classmethod
     async def _reply_and_delete(cls, message: Message, content: Union[Embed, str], delete_delay: int = None):
         """delay : use negative value to avoid deletion"""
-        if isinstance(content, Embed):
-            response = await message.reply(embed=content)
-        else:
-            response = await message.reply(content=content)
+        response = await OutboundQueue.reply(message, content, ActionPriority.COMMAND)
 
         if delete_delay is None or delete_delay >= 0:
-            await response.delete(delay=delete_delay if delete_delay is not None else cls._delete_delay)
-            await message.delete(delay=delete_delay if delete_delay is not None else cls._delete_delay)
+            DeletionScheduler.schedule(response, delete_delay if delete_delay is not None else cls._delete_delay)
+            DeletionScheduler.schedule(message, delete_delay if delete_delay is not None else cls._delete_delay)
 
-    @staticmethod
-    def _async(coro: Coroutine):
-        asyncio.create_task(coro)
+    @classmethod
+    def _async(cls, coro: Coroutine):
+        TaskSupervisor.spawn(coro, "%s:%s" % (cls.name(), coro.__name__))
 
     # @classmethod
     # def _send(cls, channel:TextChannel, content:[Embed, str]):
@@ -1,21 +1,49 @@
+import asyncio
+import contextvars
 import re
 import shlex
+import time
 from datetime import datetime
-from typing import Union
+from typing import Union, Type, Tuple, Optional, List
 
 from discord import Message, Client, TextChannel, User, Member
 from discord.abc import Messageable
 
+from core.client.members import MemberCache
+from core.command.admission import AdmissionController
 from core.command.factory import CommandFactory
+from core.command.rate_limit import CommandRateLimiter
 from core.command.repository import CommandRepository
-from core.command.types import HookType
+from core.command.types import HookType, Command
+from core.data.invalidation import CacheKey
+from core.monitoring.metrics import Metrics
+from core.monitoring.slow_callbacks import SlowCallbackMonitor
+from core.monitoring.tracing import Tracer
+from core.param.params import ParamType
+from core.utils.ttl_cache import TtlCache
 
 
 class CommandManager:
     _remove_bound_quotes_reg = re.compile(r"^\"(.*?)\"$", re.DOTALL)
 
+    # Discord sends a typing event every ~10 seconds while user types, so we remember
+    # (guild, channel, user) for which typing hooks had nothing to do.
+    _idle_typing_targets: TtlCache[bool] = TtlCache(120, 10000)
+
+    _hook_lookup_duration = Metrics.histogram("tuinbot_hook_lookup_duration_seconds",
+                                              "Hook lookups (mostly DB time), by hook. Count is hook executions.",
+                                              ("hook",))
+    _hook_action_duration = Metrics.histogram("tuinbot_hook_action_duration_seconds",
+                                              "Hooks applied because they had something to do, by hook.",
+                                              ("hook",))
+
+    @classmethod
+    def configure(cls, idle_typing_ttl: float, idle_typing_cache_size: int):
+        """Starts with an empty cache."""
+        cls._idle_typing_targets = TtlCache(idle_typing_ttl, idle_typing_cache_size)
+
     @classmethod
-    def manage_message(cls, message: Message, client: Client):
+    async def manage_message(cls, message: Message, client: Client):
         if message.author.bot:
             return
 
@@ -26,16 +54,58 @@ class CommandManager:
         if not isinstance(message.channel, TextChannel):
             return
 
-        if not cls._parse_command(message, client):
+        MemberCache.remember(message.author)
+        if not await cls._handle_command(message, client):
             # we don't apply hooks on a command message
-            for hook in CommandRepository.get_hooks(HookType.MESSAGE):
-                # stop if a hook deletes the user message
-                if hook.execute_message_hook(message):
-                    break
+            await cls._execute_message_hooks(message)
+
+    @classmethod
+    async def _handle_command(cls, message: Message, client: Client) -> bool:
+        """Members named by user parameters are requested once the command is known and allowed to run,
+        so a throttled or unknown command never sends member requests.
+        """
+        if not cls.is_command(message):
+            return False
+
+        with Tracer.span("parse_command"):
+            is_command, call = cls._prepare_command(message)
+            if call is not None:
+                command, params = call
+                # Only values of user parameters can name a member
+                await MemberCache.load_command_members(message, cls._get_user_param_values(command, params))
+                cls._execute_command(message, client, command, params)
+
+            return is_command
+
+    @classmethod
+    async def _execute_message_hooks(cls, message: Message):
+        hooks = [hook for hook in CommandRepository.get_hooks(HookType.MESSAGE) if AdmissionController.admit_hook(hook)]
+        loop = asyncio.get_running_loop()
+
+        # Lookups are blocking DB requests, so they run concurrently in threads.
+        # They are read only, so a hook skipped below doesn't lose anything.
+        # Executor doesn't propagate context, it's copied for traces.
+        has_actions = await asyncio.gather(*[loop.run_in_executor(None, contextvars.copy_context().run,
+                                                                  cls._lookup_message_hook, hook, message)
+                                             for hook in hooks])
+
+        # Actions are applied in hooks order, as before.
+        for hook, has_action in zip(hooks, has_actions):
+            if not has_action:
+                continue
+
+            start_time = time.perf_counter()
+            with SlowCallbackMonitor.measure("hook:%s" % hook.name()), Tracer.span("hook", hook=hook.name()):
+                is_message_deleted = hook.execute_message_hook(message)
+            cls._hook_action_duration.observe(time.perf_counter() - start_time, hook.name())
+
+            # stop if a hook deletes the user message
+            if is_message_deleted:
+                break
 
     # noinspection PyUnusedLocal
     @classmethod
-    def manage_typing(cls, channel: Messageable, user: Union[User, Member], when: datetime):
+    async def manage_typing(cls, channel: Messageable, user: Union[User, Member], when: datetime):
         if user.bot:
             return
 
@@ -46,22 +116,53 @@ class CommandManager:
         if not user.guild:
             return
 
+        MemberCache.remember(user)
+        typing_key = (user.guild.id, channel.id, user.id)
+        if typing_key in cls._idle_typing_targets:
+            return
+
+        has_action = False
         for hook in CommandRepository.get_hooks(HookType.TYPING):
-            hook.execute_typing_hook(channel, user)
+            if not AdmissionController.admit_hook(hook):
+                # Not checked, so we can't tell there's nothing to do.
+                has_action = True
+            else:
+                start_time = time.perf_counter()
+                with SlowCallbackMonitor.measure("hook:%s" % hook.name()):
+                    if hook.execute_typing_hook(channel, user):
+                        has_action = True
+                cls._hook_lookup_duration.observe(time.perf_counter() - start_time, hook.name())
+
+        if not has_action:
+            cls._idle_typing_targets.set(typing_key, True)
+
+    @classmethod
+    def _lookup_message_hook(cls, hook: Type[Command], message: Message) -> bool:
+        start_time = time.perf_counter()
+        with Tracer.span("hook_lookup", hook=hook.name()):
+            has_action = hook.has_message_hook_action(message)
+        cls._hook_lookup_duration.observe(time.perf_counter() - start_time, hook.name())
+        return has_action
 
     @classmethod
-    def _parse_command(cls, message: Message, client: Client) -> bool:
+    def invalidate_typing_target(cls, key: CacheKey):
+        """Called by InvalidationBus when a typing message is added for (guild, user), in any channel."""
+        guild_id, user_id = key
+        cls._idle_typing_targets.invalidate_matching(lambda typing_key: typing_key[0] == guild_id
+                                                     and typing_key[2] == user_id)
+
+    @staticmethod
+    def is_command(message: Message) -> bool:
+        """Quick check, doesn't tell if command exists."""
         content = message.content
 
         # Dunno when, but we can have a zero length message (maybe when a new user join the channel ?)
-        if not content:
-            return False
-
-        if content[0] != "!":
-            return False
+        return bool(content) and content[0] == "!" and len(content) >= 2
 
-        if len(content) < 2:
-            return False
+    @classmethod
+    def _prepare_command(cls, message: Message) -> Tuple[bool, Optional[Tuple[Type[Command], List[str]]]]:
+        """Whether message is a known command, with the command and its params if it's allowed to run now."""
+        content = message.content
 
         # Use quotes to insert spaces in a parameter value
         command_split = [
@@ -73,8 +174,30 @@ class CommandManager:
         command = CommandFactory.get_command(command_name)
 
         if not command:
-            return False
-
-        command.execute(message, command_split[1:], client)
-
-        return True
+            return False, None
+
+        retry_after = CommandRateLimiter.check(message.guild.id, message.author.id, command.name())
+        if retry_after is not None:
+            if CommandRateLimiter.should_notify(message.guild.id, message.author.id):
+                command.display_throttle_notice(message, retry_after)
+            return True, None
+
+        return True, (command, command_split[1:])
+
+    @staticmethod
+    def _execute_command(message: Message, client: Client, command: Type[Command], params: List[str]):
+        with SlowCallbackMonitor.measure("command:%s" % command.name()):
+            command.execute(message, params, client)
+
+    @staticmethod
+    def _get_user_param_values(command: Type[Command], params: List[str]) -> List[str]:
+        """Values given to user parameters, by any syntax taking this many parameters."""
+        values = []
+        for syntax in command.get_syntaxes() or ():
+            if len(syntax.params) != len(params):
+                continue
+            for value, param in zip(params, syntax.params):
+                if param.param_type == ParamType.USER and value not in values:
+                    values.append(value)
+
+        return values
@@ -0,0 +1,72 @@
+from typing import Tuple, Optional, Hashable
+
+from core.utils.rate_limit import TokenBucket
+from core.utils.ttl_cache import TtlCache
+
+
+class CommandRateLimiter:
+    """Limits commands by user, by guild and by user command, before any command work is done."""
+    # Unused buckets are forgotten after this time, they are full anyway.
+    _BUCKET_TTL = 600
+
+    # (capacity, refill rate per second)
+    _user_limit: Tuple[float, float] = (6, 6 / 30)
+    _guild_limit: Tuple[float, float] = (30, 30 / 30)
+    _command_limit: Tuple[float, float] = (4, 4 / 30)
+
+    _buckets: TtlCache[TokenBucket] = TtlCache(_BUCKET_TTL, 50000)
+    # Throttled users already told to slow down.
+    _notified_users: TtlCache[bool] = TtlCache(_BUCKET_TTL, 10000)
+
+    _throttled_count = 0
+
+    @classmethod
+    def configure(cls, user_limit: Tuple[float, float], guild_limit: Tuple[float, float],
+                  command_limit: Tuple[float, float]):
+        cls._user_limit = user_limit
+        cls._guild_limit = guild_limit
+        cls._command_limit = command_limit
+        cls._buckets.clear()
+
+    @classmethod
+    def check(cls, guild_id: int, user_id: int, command_name: str) -> Optional[float]:
+        """Returns None if command is allowed, else seconds to wait before next try."""
+        buckets = [cls._get_bucket(("user", guild_id, user_id), cls._user_limit),
+                   cls._get_bucket(("guild", guild_id), cls._guild_limit),
+                   cls._get_bucket(("command", guild_id, user_id, command_name), cls._command_limit)]
+
+        # Don't use a token of a bucket if another one refuses.
+        retry_after = max(bucket.time_until_available() for bucket in buckets)
+        if retry_after > 0:
+            cls._throttled_count += 1
+            return retry_after
+
+        for bucket in buckets:
+            bucket.try_acquire()
+
+        cls._notified_users.invalidate((guild_id, user_id))
+        return None
+
+    @classmethod
+    def should_notify(cls, guild_id: int, user_id: int) -> bool:
+        """True only the first time a user is throttled, until they are allowed again."""
+        if (guild_id, user_id) in cls._notified_users:
+            return False
+
+        cls._notified_users.set((guild_id, user_id), True)
+        return True
+
+    @classmethod
+    def throttled_count(cls) -> int:
+        return cls._throttled_count
+
+    @classmethod
+    def _get_bucket(cls, key: Hashable, limit: Tuple[float, float]) -> TokenBucket:
+        bucket = cls._buckets.get(key)
+
+        if bucket is None:
+            bucket = TokenBucket(*limit)
+
+        # Refreshes expiration.
+        cls._buckets.set(key, bucket)
+        return bucket
@@ -1,4 +1,7 @@
-from typing import List, Dict, Type, Iterable
+import time
+from typing import List, Dict, Type, Iterable, Union
+
+from discord import Embed
 
 from core.command.types import Command, HookType
 from core.param.validator import SyntaxValidator
@@ -8,14 +11,36 @@ from core.utils.utils import Utils
 class CommandRepository:
     _hooks: Dict[HookType, List[Type[Command]]] = None
 
+    # Help embeds are serialized once at startup, see get_help().
+    _help_cache: Dict[Type[Command], Union[dict, str]] = {}
+
     # List is not filled here cause of cyclic import issue.
     LIST: Iterable[Type[Command]] = []
 
     @classmethod
     def set_command_list(cls, *command_list: Type[Command]):
+        start_time = time.perf_counter()
         cls._validate_commands_syntax(command_list)
+        validation_time = time.perf_counter() - start_time
+
         cls.LIST = command_list
 
+        # After LIST assignment, cause the main help page lists all commands.
+        start_time = time.perf_counter()
+        cls._prebuild_help()
+        help_time = time.perf_counter() - start_time
+
+        print("%s commands ready: syntaxes validated in %.1f ms, help prebuilt in %.1f ms." %
+              (len(command_list), validation_time * 1000, help_time * 1000))
+
+    @classmethod
+    def reload_commands(cls):
+        """After a config reload: syntaxes and help may show limits which changed."""
+        for command in cls.LIST:
+            command.reset_syntaxes()
+        cls._validate_commands_syntax(cls.LIST)
+        cls._prebuild_help()
+
     @classmethod
     def get_hooks(cls, hook_type: HookType) -> List[Type[Command]]:
         if cls._hooks is None:
@@ -34,6 +59,30 @@ class CommandRepository:
 
         return []
 
+    @classmethod
+    def get_help(cls, command: Type[Command]) -> Union[Embed, str]:
+        """Returns a new Embed built from the cached help, far cheaper than Command.get_help()."""
+        if command not in cls._help_cache:
+            cls._help_cache[command] = cls._serialize_help(command.get_help())
+
+        help_content = cls._help_cache[command]
+
+        if isinstance(help_content, str):
+            return help_content
+
+        # from_dict() shares nested fields with the cache, so returned embed must not be modified.
+        return Embed.from_dict(help_content)
+
+    @classmethod
+    def _prebuild_help(cls):
+        cls._help_cache = {command: cls._serialize_help(command.get_help()) for command in cls.LIST}
+
+    @staticmethod
+    def _serialize_help(help_content: Union[Embed, str]) -> Union[dict, str]:
+        if isinstance(help_content, Embed):
+            return help_content.to_dict()
+        return help_content
+
     @classmethod
     def _validate_commands_syntax(cls, commands: Iterable[Type[Command]]):
         for command in commands:
@@ -44,6 +44,16 @@ class Command(ABC):
     def get_help(cls) -> Union[Embed, str]:
         pass
 
+    @classmethod
+    def reset_syntaxes(cls):
+        """Syntaxes are built again on next use, after a config reload."""
+        pass
+
+    @classmethod
+    def display_throttle_notice(cls, message: Message, retry_after: float):
+        """Called when user sends commands too fast."""
+        pass
+
     @staticmethod
     def has_hook() -> bool:
         return False
@@ -56,11 +66,24 @@ class Command(ABC):
     def hook_type() -> HookType:
         return HookType.NONE
 
+    @staticmethod
+    def hook_is_cosmetic() -> bool:
+        """Cosmetic hooks are the first skipped when bot is overloaded."""
+        return False
+
+    @classmethod
+    def has_message_hook_action(cls, message: Message) -> bool:
+        """Read only lookup, return False if execute_message_hook() has nothing to do for this message.
+        Called from a worker thread, concurrently with other hooks, so it must not use the event loop.
+        """
+        return True
+
     @classmethod
     def execute_message_hook(cls, message: Message) -> bool:
         """Return True if hook deleted user message. hook_can_delete_message() must also return True."""
         pass
 
     @classmethod
-    def execute_typing_hook(cls, channel: TextChannel, user: Member):
+    def execute_typing_hook(cls, channel: TextChannel, user: Member) -> bool:
+        """Return True if hook had something to do for this user."""
         pass
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Callable, Tuple, Optional, Set
+
+# Key of a changed row, as ids: (guild_id, target_id) for hooks tables, (author_id,) for memos.
+CacheKey = Tuple[int, ...]
+# (id, origin, table, key)
+LogEntry = Tuple[int, str, str, CacheKey]
+
+
+class InvalidationLog(ABC):
+    """Storage shared by bot processes, written and read by InvalidationBus (blocking calls, run in executor)."""
+
+    @abstractmethod
+    def append(self, origin: str, changes: List[Tuple[str, CacheKey]]):
+        pass
+
+    @abstractmethod
+    def read_after(self, entry_id: int, limit: int) -> List[LogEntry]:
+        """Entries with an id greater than entry_id, by id."""
+        pass
+
+    @abstractmethod
+    def last_id(self) -> int:
+        pass
+
+    @abstractmethod
+    def purge(self, max_age: int):
+        pass
+
+
+class InvalidationBus:
+    """Tells caches when rows they depend on change, in this process or in another one writing to the same DB.
+
+    Db classes publish (table, key) after each mutation: subscribers of this process are called right away,
+    changes are written to the shared log at the next poll. Each poll also reads changes of other processes,
+    so their caches are invalidated within about one poll interval.
+    """
+    _BATCH_SIZE = 500
+    # Auto increment ids are given before commit, so a row can appear after a greater one was read:
+    # last ids are read again.
+    _LOOKBACK = 50
+    _PURGE_INTERVAL = 600
+    _MAX_AGE = 3600
+
+    # Identifies our own entries, already applied when published.
+    _origin = os.urandom(8).hex()
+    _subscribers: Dict[str, List[Callable[[CacheKey], None]]] = {}
+    # Published from executor threads too.
+    _lock = threading.Lock()
+    _outbox: List[Tuple[str, CacheKey]] = []
+
+    _log: Optional[InvalidationLog] = None
+    _poll_interval = 2.0
+    _cursor = 0
+    _seen_ids: Set[int] = set()
+    _received_count = 0
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def configure(cls, log: Optional[InvalidationLog], poll_interval: float):
+        """Without log, changes are only published to this process."""
+        cls._log = log
+        cls._poll_interval = poll_interval
+
+    @classmethod
+    def subscribe(cls, table: str, callback: Callable[[CacheKey], None]):
+        cls._subscribers.setdefault(table, []).append(callback)
+
+    @classmethod
+    def publish(cls, table: str, *key: int):
+        cls._notify(table, key)
+
+        if cls._log is not None:
+            with cls._lock:
+                cls._outbox.append((table, key))
+
+    @classmethod
+    def start(cls):
+        if cls._log is not None and (cls._task is None or cls._task.done()):
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        """Publishes last changes. Never raises, so the rest of shutdown still runs."""
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, cls._flush)
+            except Exception as e:
+                print("Invalidation log error: %s" % e)
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        return {"cursor": cls._cursor, "pending": len(cls._outbox), "received": cls._received_count}
+
+    @classmethod
+    async def _run(cls):
+        loop = asyncio.get_running_loop()
+        purge_countdown = 0.0
+
+        try:
+            # Older changes don't matter, caches are empty.
+            cls._cursor = await loop.run_in_executor(None, cls._log.last_id)
+        except Exception as e:
+            print("Can't read invalidation log: %s" % e)
+
+        while True:
+            await asyncio.sleep(cls._poll_interval)
+
+            try:
+                await loop.run_in_executor(None, cls._flush)
+                for _, _, table, key in await loop.run_in_executor(None, cls._read):
+                    cls._notify(table, key)
+
+                purge_countdown -= cls._poll_interval
+                if purge_countdown <= 0:
+                    purge_countdown = cls._PURGE_INTERVAL
+                    await loop.run_in_executor(None, cls._log.purge, cls._MAX_AGE)
+            except Exception as e:
+                # DB unavailable, retried at next poll.
+                print("Invalidation log error: %s" % e)
+
+    @classmethod
+    def _flush(cls):
+        with cls._lock:
+            changes = cls._outbox
+            cls._outbox = []
+
+        if not changes:
+            return
+
+        try:
+            cls._log.append(cls._origin, changes)
+        except Exception:
+            with cls._lock:
+                cls._outbox = changes + cls._outbox
+            raise
+
+    @classmethod
+    def _read(cls) -> List[LogEntry]:
+        entries = []
+        for entry in cls._log.read_after(max(0, cls._cursor - cls._LOOKBACK), cls._BATCH_SIZE):
+            entry_id, origin = entry[0], entry[1]
+            if entry_id in cls._seen_ids:
+                continue
+
+            cls._seen_ids.add(entry_id)
+            cls._cursor = max(cls._cursor, entry_id)
+            if origin != cls._origin:
+                entries.append(entry)
+
+        cls._seen_ids = {entry_id for entry_id in cls._seen_ids if entry_id > cls._cursor - cls._LOOKBACK}
+        cls._received_count += len(entries)
+        return entries
+
+    @classmethod
+    def _notify(cls, table: str, key: CacheKey):
+        for callback in cls._subscribers.get(table, ()):
+            callback(key)
@@ -1,45 +1,334 @@
+from dataclasses import dataclass, fields
+from typing import Tuple, FrozenSet, Mapping, List, Callable
+
 from jproperties import Properties
 
+# (capacity, refill rate per second)
+Rate = Tuple[float, float]
+# (loop lag, DB latency) in seconds
+Thresholds = Tuple[float, float]
+
+
+@dataclass(frozen=True)
+class BotConfig:
+    """bot.properties parsed once. Replaced as a whole on reload, never modified."""
+    is_beta: bool
+    bot_token: str
+    db_name: str
+    db_host: str
+    db_user: str
+    db_password: str
+    db_pool_size: int
+    pending_deletions_file: str
+    dispatcher_workers: int
+    dispatcher_queue_size: int
+    dispatcher_overload_policy: str
+    shed_typing_thresholds: Thresholds
+    shed_cosmetic_thresholds: Thresholds
+    rate_limit_user: Rate
+    rate_limit_guild: Rate
+    rate_limit_command: Rate
+    admin_ids: FrozenSet[int]
+    slow_callback_threshold: float
+    metrics_port: int
+    trace_file: str
+    trace_sample_rate: float
+    record_file: str
+    sharded: bool
+    shard_count: int
+    workers: int
+    coordinator_port: int
+    invalidation_poll_interval: float
+    idle_typing_ttl: float
+    idle_typing_cache_size: int
+    permission_cache_ttl: float
+    member_cache: str
+    member_cache_size: int
+    reaction_max_per_target: int
+    reaction_shots: int
+    reply_max_per_user: int
+    typing_message_max_per_user: int
+    memo_max_per_user: int
+    memo_max_lines: int
+    memo_max_chars: int
+
+    # Sizes, limits, delays and rates: 0 or less would disable a feature by accident, or break it.
+    _POSITIVE_FIELDS = ("db_pool_size", "dispatcher_workers", "dispatcher_queue_size", "shed_typing_thresholds",
+                        "shed_cosmetic_thresholds", "rate_limit_user", "rate_limit_guild", "rate_limit_command",
+                        "slow_callback_threshold", "workers", "coordinator_port", "idle_typing_ttl",
+                        "idle_typing_cache_size", "permission_cache_ttl", "member_cache_size",
+                        "reaction_max_per_target", "reaction_shots", "reply_max_per_user",
+                        "typing_message_max_per_user", "memo_max_per_user", "memo_max_lines", "memo_max_chars")
+    # 0 disables or means default.
+    _NON_NEGATIVE_FIELDS = ("metrics_port", "shard_count", "invalidation_poll_interval")
+
+    def __post_init__(self):
+        for name in self._POSITIVE_FIELDS:
+            value = getattr(self, name)
+            # Rates and thresholds are tuples.
+            if any(part <= 0 for part in (value if isinstance(value, tuple) else (value,))):
+                raise ValueError("Config '%s' should be positive" % name)
+
+        for name in self._NON_NEGATIVE_FIELDS:
+            if getattr(self, name) < 0:
+                raise ValueError("Config '%s' should be positive or 0" % name)
+
+        if not 0 <= self.trace_sample_rate <= 1:
+            raise ValueError("Config 'trace_sample_rate' should be between 0 and 1")
+
+    @classmethod
+    def parse(cls, values: Mapping[str, str]) -> "BotConfig":
+        """Missing optional values get their default. Raises ValueError on an invalid value."""
+        def get(key: str, default: str = "") -> str:
+            return values.get(key, default)
+
+        def get_rate(key: str, default: str) -> Rate:
+            """Parses "count/seconds"."""
+            count, seconds = get(key, default).split("/")
+            if float(seconds) <= 0:
+                raise ValueError("Config '%s' should have a positive duration" % key)
+            return float(count), float(count) / float(seconds)
+
+        is_beta = get("is_beta", "0")
+        if is_beta != "0" and is_beta != "1":
+            raise ValueError("Config 'is_beta' should be 0 or 1")
+
+        return cls(
+            is_beta=is_beta == "1",
+            bot_token=get("bot_token_beta" if is_beta == "1" else "bot_token"),
+            db_name=get("db_name"),
+            db_host=get("db_host"),
+            db_user=get("db_user"),
+            db_password=get("db_password"),
+            db_pool_size=int(get("db_pool_size", "8")),
+            pending_deletions_file=get("pending_deletions_file", "../data/pending_deletions.json"),
+            dispatcher_workers=int(get("dispatcher_workers", "8")),
+            dispatcher_queue_size=int(get("dispatcher_queue_size", "50")),
+            dispatcher_overload_policy=get("dispatcher_overload_policy", "drop_hooks"),
+            shed_typing_thresholds=(int(get("shed_typing_loop_lag_ms", "100")) / 1000,
+                                    int(get("shed_typing_db_latency_ms", "200")) / 1000),
+            shed_cosmetic_thresholds=(int(get("shed_cosmetic_loop_lag_ms", "300")) / 1000,
+                                      int(get("shed_cosmetic_db_latency_ms", "500")) / 1000),
+            rate_limit_user=get_rate("rate_limit_user", "6/30"),
+            rate_limit_guild=get_rate("rate_limit_guild", "30/30"),
+            rate_limit_command=get_rate("rate_limit_command", "4/30"),
+            admin_ids=frozenset(int(user_id) for user_id in get("admin_ids").split(",") if user_id.strip()),
+            slow_callback_threshold=int(get("slow_callback_ms", "50")) / 1000,
+            metrics_port=int(get("metrics_port", "0")),
+            trace_file=get("trace_file"),
+            trace_sample_rate=float(get("trace_sample_rate", "1")),
+            record_file=get("record_file"),
+            sharded=get("sharded", "0") == "1",
+            shard_count=int(get("shard_count", "0")),
+            workers=int(get("workers", "2")),
+            coordinator_port=int(get("coordinator_port", "8790")),
+            invalidation_poll_interval=float(get("invalidation_poll_interval", "2")),
+            idle_typing_ttl=float(get("idle_typing_ttl", "120")),
+            idle_typing_cache_size=int(get("idle_typing_cache_size", "10000")),
+            permission_cache_ttl=float(get("permission_cache_ttl", "300")),
+            member_cache=get("member_cache", "full"),
+            member_cache_size=int(get("member_cache_size", "5000")),
+            reaction_max_per_target=int(get("reaction_max_per_target", "6")),
+            reaction_shots=int(get("reaction_shots", "10")),
+            reply_max_per_user=int(get("reply_max_per_user", "2")),
+            typing_message_max_per_user=int(get("typing_message_max_per_user", "1")),
+            memo_max_per_user=int(get("memo_max_per_user", "20")),
+            memo_max_lines=int(get("memo_max_lines", "10")),
+            memo_max_chars=int(get("memo_max_chars", "1000")),
+        )
+
+    def changed_fields(self, other: "BotConfig") -> List[str]:
+        return [field.name for field in fields(self) if getattr(self, field.name) != getattr(other, field.name)]
+
+
+# Called with (old config, new config) after a reload.
+ReloadListener = Callable[[BotConfig, BotConfig], None]
+
 
 class AppProperties:
-    _config: Properties
+    """Current BotConfig. Getters are kept for readability, they only read a field."""
+    # Used at startup only: changing them needs a restart.
+    RESTART_FIELDS = ("is_beta", "bot_token", "pending_deletions_file", "dispatcher_workers",
+                      "dispatcher_queue_size", "dispatcher_overload_policy", "metrics_port", "trace_file",
+                      "record_file", "sharded", "shard_count", "workers", "coordinator_port",
+                      "invalidation_poll_interval", "member_cache", "member_cache_size")
+
+    # Defaults until load(), for benchmarks and simulations.
+    _config = BotConfig.parse({})
+    _path = None
+    _reload_listeners: List[ReloadListener] = []
 
     @classmethod
     def load(cls, path: str):
-        cls._config = Properties()
+        cls._path = path
+        cls._config = cls._read(path)
+        print("Using config %s!" % ("Beta" if cls.is_beta() else "Release"))
 
-        with open(path, 'rb') as config_file:
-            cls._config.load(config_file)
+    @classmethod
+    def reload(cls) -> List[str]:
+        """Reads the file again and replaces the config at once, then listeners apply it.
+        Returns changed fields. On error, current config is kept: if a listener fails,
+        the ones already called apply the current config again.
+        """
+        new_config = cls._read(cls._path)
+        old_config = cls._config
+        changed_fields = old_config.changed_fields(new_config)
+        cls._config = new_config
 
-        is_beta = cls._config.get("is_beta").data
-        if is_beta != "0" and is_beta != "1":
-            raise Exception("Config 'is_beta' should be 0 or 1")
+        applied_listeners = []
+        for listener in cls._reload_listeners:
+            try:
+                listener(old_config, new_config)
+            except Exception as e:
+                cls._config = old_config
+                for applied_listener in reversed(applied_listeners):
+                    try:
+                        applied_listener(new_config, old_config)
+                    except Exception as rollback_error:
+                        print("Config rollback error: %s" % rollback_error)
+                raise ValueError("Config not applied: %s" % e) from e
+
+            applied_listeners.append(listener)
+
+        print("Config reloaded, changed: %s" % (", ".join(changed_fields) or "nothing"))
+        restart_fields = [name for name in changed_fields if name in cls.RESTART_FIELDS]
+        if restart_fields:
+            print("Restart needed to apply: %s" % ", ".join(restart_fields))
+
+        return changed_fields
 
-        print("Using config %s!" % "Beta" if cls.is_beta() else "Release")
+    @classmethod
+    def add_reload_listener(cls, listener: ReloadListener):
+        cls._reload_listeners.append(listener)
+
+    @classmethod
+    def config(cls) -> BotConfig:
+        return cls._config
 
     @classmethod
     def is_beta(cls) -> bool:
-        return cls._config.get("is_beta").data == "1"
+        return cls._config.is_beta
 
     @classmethod
     def bot_token(cls) -> str:
-        if cls.is_beta():
-            return cls._config.get("bot_token_beta").data
-
-        return cls._config.get("bot_token").data
+        return cls._config.bot_token
 
     @classmethod
     def db_name(cls) -> str:
-        return cls._config.get("db_name").data
+        return cls._config.db_name
 
     @classmethod
     def db_host(cls) -> str:
-        return cls._config.get("db_host").data
+        return cls._config.db_host
 
     @classmethod
     def db_user(cls) -> str:
-        return cls._config.get("db_user").data
+        return cls._config.db_user
 
     @classmethod
     def db_password(cls) -> str:
-        return cls._config.get("db_password").data
+        return cls._config.db_password
+
+    @classmethod
+    def pending_deletions_file(cls) -> str:
+        return cls._config.pending_deletions_file
+
+    @classmethod
+    def dispatcher_workers(cls) -> int:
+        return cls._config.dispatcher_workers
+
+    @classmethod
+    def dispatcher_queue_size(cls) -> int:
+        return cls._config.dispatcher_queue_size
+
+    @classmethod
+    def dispatcher_overload_policy(cls) -> str:
+        """drop_hooks or drop_all"""
+        return cls._config.dispatcher_overload_policy
+
+    @classmethod
+    def shed_typing_thresholds(cls) -> Thresholds:
+        return cls._config.shed_typing_thresholds
+
+    @classmethod
+    def shed_cosmetic_thresholds(cls) -> Thresholds:
+        return cls._config.shed_cosmetic_thresholds
+
+    @classmethod
+    def rate_limit_user(cls) -> Rate:
+        return cls._config.rate_limit_user
+
+    @classmethod
+    def rate_limit_guild(cls) -> Rate:
+        return cls._config.rate_limit_guild
+
+    @classmethod
+    def rate_limit_command(cls) -> Rate:
+        return cls._config.rate_limit_command
+
+    @classmethod
+    def admin_ids(cls) -> FrozenSet[int]:
+        """Users allowed to use admin commands."""
+        return cls._config.admin_ids
+
+    @classmethod
+    def slow_callback_threshold(cls) -> float:
+        return cls._config.slow_callback_threshold
+
+    @classmethod
+    def metrics_port(cls) -> int:
+        """0 disables metrics endpoint."""
+        return cls._config.metrics_port
+
+    @classmethod
+    def db_pool_size(cls) -> int:
+        return cls._config.db_pool_size
+
+    @classmethod
+    def trace_file(cls) -> str:
+        """Empty disables tracing."""
+        return cls._config.trace_file
+
+    @classmethod
+    def trace_sample_rate(cls) -> float:
+        return cls._config.trace_sample_rate
+
+    @classmethod
+    def record_file(cls) -> str:
+        """Empty disables event recording."""
+        return cls._config.record_file
+
+    @classmethod
+    def sharded(cls) -> bool:
+        return cls._config.sharded
+
+    @classmethod
+    def shard_count(cls) -> int:
+        """0 uses the count recommended by Discord."""
+        return cls._config.shard_count
+
+    @classmethod
+    def workers(cls) -> int:
+        """Processes started by launcher.py."""
+        return cls._config.workers
+
+    @classmethod
+    def coordinator_port(cls) -> int:
+        return cls._config.coordinator_port
+
+    @classmethod
+    def invalidation_poll_interval(cls) -> float:
+        """0 when caches aren't shared with other processes."""
+        return cls._config.invalidation_poll_interval
+
+    @staticmethod
+    def _read(path: str) -> BotConfig:
+        properties = Properties()
+
+        with open(path, 'rb') as config_file:
+            properties.load(config_file)
+
+        if properties.get("is_beta") is None:
+            raise ValueError("Config 'is_beta' is missing")
+
+        return BotConfig.parse({key: value.data for key, value in properties.items()})
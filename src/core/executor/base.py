@@ -4,6 +4,7 @@ from typing import TypeVar, Generic, Optional
 
 from discord import Message, Client
 
+from core.monitoring.tracing import Tracer
 from core.param.params import CommandParam
 
 
@@ -33,7 +34,11 @@ class CommandParamExecutor(Generic[ValidatedType]):
                 self.__not_validating_configs.append(config)
 
     def set_value(self, value: str, message: Message, client: Client):
+        with Tracer.span("set_value", param=self.param.name, executor=type(self).__name__) as span:
+            self._set_value(value, message, client)
+            span.set_attribute("result", self.__result_type.name)
 
+    def _set_value(self, value: str, message: Message, client: Client):
         validated_value = self._validate_input_format(value)
 
         if validated_value is None:
@@ -8,6 +8,7 @@ from core.param.params import ParamType
 
 class Messages:
     nothing_to_do = "Il n'y a rien à faire."
+    throttled = "Doucement, tu vas trop vite ! Réessaie dans {} seconde(s)."
 
     @staticmethod
     def build_help(command: Type[Command]) -> Embed:
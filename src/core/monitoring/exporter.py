@@ -0,0 +1,113 @@
+from typing import Optional, Callable, Awaitable
+
+from aiohttp import web
+
+from core.client.deletion import DeletionScheduler
+from core.client.dispatcher import EventDispatcher
+from core.client.members import MemberCache
+from core.client.outbound import OutboundQueue
+from core.client.shards import ShardMonitor
+from core.client.tasks import TaskSupervisor
+from core.command.admission import AdmissionController
+from core.command.rate_limit import CommandRateLimiter
+from core.data.invalidation import InvalidationBus
+from core.monitoring.loop_lag import LoopLagSampler
+from core.monitoring.metrics import Metrics
+from core.monitoring.slow_callbacks import SlowCallbackMonitor
+from core.monitoring.startup import StartupTimer
+
+
+class MetricsExporter:
+    """Local HTTP endpoint serving metrics in Prometheus text format.
+    aiohttp is already a discord.py dependency.
+    """
+    _runner: Optional[web.AppRunner] = None
+    _render: Optional[Callable[[], Awaitable[str]]] = None
+
+    @classmethod
+    async def start(cls, port: int, host: str = "127.0.0.1", render: Callable[[], Awaitable[str]] = None):
+        """render : replaces metrics of this process (e.g. cluster coordinator)."""
+        if cls._runner is not None:
+            return
+
+        cls._render = render
+
+        app = web.Application()
+        app.router.add_get("/metrics", cls._handle_metrics)
+
+        cls._runner = web.AppRunner(app)
+        await cls._runner.setup()
+        await web.TCPSite(cls._runner, host, port).start()
+
+        print(f"Metrics available on http://{host}:{port}/metrics")
+
+    @classmethod
+    async def stop(cls):
+        if cls._runner is not None:
+            await cls._runner.cleanup()
+            cls._runner = None
+
+    # noinspection PyUnusedLocal
+    @staticmethod
+    async def _handle_metrics(request: web.Request) -> web.Response:
+        text = await MetricsExporter._render() if MetricsExporter._render else Metrics.render()
+        return web.Response(body=text.encode("utf-8"),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+# Components stats, read on export.
+
+Metrics.collected("tuinbot_outbound_queue_depth", "Discord API calls waiting in outbound queue.",
+                  lambda: {(): OutboundQueue.stats()["queue_depth"]})
+Metrics.collected("tuinbot_outbound_rate_limited_total", "Discord API calls answered with HTTP 429.",
+                  lambda: {(): OutboundQueue.stats()["rate_limited"]}, metric_type="counter")
+Metrics.collected("tuinbot_outbound_coalesced_total", "Sends merged into a previous message.",
+                  lambda: {(): OutboundQueue.stats()["coalesced"]}, metric_type="counter")
+Metrics.collected("tuinbot_pending_deletions", "Messages scheduled for deletion.",
+                  lambda: {(): DeletionScheduler.pending_count()})
+Metrics.collected("tuinbot_tasks_running", "Supervised background tasks.",
+                  lambda: {(): TaskSupervisor.running_count()})
+Metrics.collected("tuinbot_task_failures_total", "Failed background tasks, by task name.",
+                  lambda: {(name,): stats["failures"] for name, stats in TaskSupervisor.stats()["tasks"].items()},
+                  ("task",), "counter")
+Metrics.collected("tuinbot_dispatcher_queued_events", "Gateway events waiting in channel queues.",
+                  lambda: {(): EventDispatcher.stats()["queued_events"]})
+Metrics.collected("tuinbot_dispatcher_dropped_events_total", "Gateway events dropped by overload policy.",
+                  lambda: {(): EventDispatcher.stats()["dropped_events"]}, metric_type="counter")
+Metrics.collected("tuinbot_hooks_shed_total", "Hooks skipped by admission control, by hook.",
+                  lambda: {(name,): count for name, count in AdmissionController.stats()["shed_hooks"].items()},
+                  ("hook",), "counter")
+Metrics.collected("tuinbot_commands_throttled_total", "Commands refused by rate limiter.",
+                  lambda: {(): CommandRateLimiter.throttled_count()}, metric_type="counter")
+Metrics.collected("tuinbot_loop_lag_seconds", "Smoothed event loop lag.",
+                  lambda: {(): LoopLagSampler.get_lag()})
+Metrics.collected("tuinbot_slow_callbacks_total", "Event loop blocked longer than threshold, by command or hook.",
+                  lambda: {(name,): count for name, count in SlowCallbackMonitor.stats()["slow_counts"].items()},
+                  ("name",), "counter")
+Metrics.collected("tuinbot_shard_latency_seconds", "Gateway heartbeat latency, by shard.",
+                  lambda: {(str(report.shard_id),): report.latency for report in ShardMonitor.get_reports()
+                           if report.latency is not None},
+                  ("shard",))
+Metrics.collected("tuinbot_shard_ready", "1 if shard is connected and ready, by shard.",
+                  lambda: {(str(report.shard_id),): int(report.is_ready) for report in ShardMonitor.get_reports()},
+                  ("shard",))
+Metrics.collected("tuinbot_shard_guilds", "Guilds handled, by shard.",
+                  lambda: {(str(report.shard_id),): report.guild_count for report in ShardMonitor.get_reports()},
+                  ("shard",))
+Metrics.collected("tuinbot_shard_events_per_second", "Messages and typing events per second, last minute, by shard.",
+                  lambda: {(str(report.shard_id),): report.events_per_second for report in ShardMonitor.get_reports()},
+                  ("shard",))
+Metrics.collected("tuinbot_shard_disconnects_total", "Gateway disconnections, by shard.",
+                  lambda: {(str(report.shard_id),): report.disconnect_count for report in ShardMonitor.get_reports()},
+                  ("shard",), "counter")
+Metrics.collected("tuinbot_invalidations_received_total", "Cache invalidations read from other processes.",
+                  lambda: {(): InvalidationBus.stats()["received"]}, metric_type="counter")
+Metrics.collected("tuinbot_invalidations_pending", "Cache invalidations waiting to be written for other processes.",
+                  lambda: {(): InvalidationBus.stats()["pending"]})
+Metrics.collected("tuinbot_startup_phase_seconds", "Duration of startup phases, until ready.",
+                  lambda: {(phase,): duration for phase, duration in StartupTimer.phases()},
+                  ("phase",))
+Metrics.collected("tuinbot_member_cache_active", "Members kept by lazy member cache.",
+                  lambda: {(): MemberCache.stats()["active"]})
+Metrics.collected("tuinbot_member_requests_total", "Gateway member requests of lazy member cache.",
+                  lambda: {(): MemberCache.stats()["queries"]}, metric_type="counter")
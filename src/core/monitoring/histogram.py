@@ -0,0 +1,110 @@
+import bisect
+from typing import List, Sequence, Optional
+
+from core.utils.clock import Clock
+
+
+class Histogram:
+    """Counts values in fixed buckets (upper bounds, in seconds by default), like Prometheus does."""
+    DEFAULT_BOUNDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BOUNDS):
+        self.bounds = tuple(bounds)
+        # Last bucket is +Inf.
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram"):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Upper bound of the bucket containing the percentile, so it's an approximation."""
+        if not self.count:
+            return None
+
+        rank = self.count * percent / 100
+        cumulated = 0
+        for index, count in enumerate(self.counts):
+            cumulated += count
+            if cumulated >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+
+        return self.max
+
+    def cumulative_counts(self) -> List[int]:
+        result = []
+        cumulated = 0
+        for count in self.counts:
+            cumulated += count
+            result.append(cumulated)
+        return result
+
+
+class RollingHistogram:
+    """Histogram of the last `slot_count` * `slot_duration` seconds."""
+
+    def __init__(self, slot_duration: float = 60, slot_count: int = 10,
+                 bounds: Sequence[float] = Histogram.DEFAULT_BOUNDS):
+        self.slot_duration = slot_duration
+        self.bounds = bounds
+        self._slots: List[Histogram] = [Histogram(bounds) for _ in range(slot_count)]
+        self._slot_ids: List[int] = [-1] * slot_count
+
+    def observe(self, value: float):
+        slot_id = int(Clock.monotonic() // self.slot_duration)
+        index = slot_id % len(self._slots)
+
+        if self._slot_ids[index] != slot_id:
+            self._slots[index] = Histogram(self.bounds)
+            self._slot_ids[index] = slot_id
+
+        self._slots[index].observe(value)
+
+    def get_histogram(self) -> Histogram:
+        """Merge of the slots still in the time window."""
+        current_slot_id = int(Clock.monotonic() // self.slot_duration)
+        result = Histogram(self.bounds)
+
+        for slot_id, slot in zip(self._slot_ids, self._slots):
+            if current_slot_id - slot_id < len(self._slots):
+                result.merge(slot)
+
+        return result
+
+
+class RateMeter:
+    """Events per second over the last `slot_count` * `slot_duration` seconds."""
+
+    def __init__(self, slot_duration: float = 10, slot_count: int = 6):
+        self.slot_duration = slot_duration
+        self._counts: List[int] = [0] * slot_count
+        self._slot_ids: List[int] = [-1] * slot_count
+
+    def mark(self):
+        slot_id = int(Clock.monotonic() // self.slot_duration)
+        index = slot_id % len(self._counts)
+
+        if self._slot_ids[index] != slot_id:
+            self._counts[index] = 0
+            self._slot_ids[index] = slot_id
+
+        self._counts[index] += 1
+
+    def get_rate(self) -> float:
+        current_slot_id = int(Clock.monotonic() // self.slot_duration)
+        total = sum(count for slot_id, count in zip(self._slot_ids, self._counts)
+                    if current_slot_id - slot_id < len(self._counts))
+
+        return total / (len(self._counts) * self.slot_duration)
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Optional
+
+from core.monitoring.histogram import RollingHistogram, Histogram
+
+
+class LoopLagSampler:
+    """Measures how late the event loop wakes up a sleeping task. A high lag means
+    something blocks the loop, or there is too much work for it.
+    """
+    _INTERVAL = 0.5
+    # Weight of a new sample in the moving average.
+    _SMOOTHING = 0.2
+
+    _lag = 0.0
+    _last_lag = 0.0
+    _histogram = RollingHistogram()
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls):
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    def get_lag(cls) -> float:
+        """Smoothed lag, in seconds."""
+        return cls._lag
+
+    @classmethod
+    def get_last_lag(cls) -> float:
+        return cls._last_lag
+
+    @classmethod
+    def get_histogram(cls) -> Histogram:
+        """Lag samples of the last 10 minutes."""
+        return cls._histogram.get_histogram()
+
+    @classmethod
+    async def _run(cls):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            start_time = loop.time()
+            await asyncio.sleep(cls._INTERVAL)
+            cls._last_lag = max(0.0, loop.time() - start_time - cls._INTERVAL)
+            cls._lag += (cls._last_lag - cls._lag) * cls._SMOOTHING
+            cls._histogram.observe(cls._last_lag)
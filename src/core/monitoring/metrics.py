@@ -0,0 +1,117 @@
+from typing import Dict, Tuple, Sequence, Callable, List
+
+from core.monitoring.histogram import Histogram
+
+Labels = Tuple[str, ...]
+
+
+class Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._render_values())
+        return lines
+
+    def _render_values(self) -> List[str]:
+        pass
+
+    def _format_labels(self, labels: Labels, extra: str = None) -> str:
+        parts = ['%s="%s"' % (name, Metrics.escape(value)) for name, value in zip(self.label_names, labels)]
+        if extra:
+            parts.append(extra)
+        return "{%s}" % ",".join(parts) if parts else ""
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        super().__init__(name, description, label_names)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _render_values(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(labels)} {value}" for labels, value in self._values.items()]
+
+
+class HistogramMetric(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = (),
+                 bounds: Sequence[float] = Histogram.DEFAULT_BOUNDS):
+        super().__init__(name, description, label_names)
+        self.bounds = bounds
+        self._values: Dict[Labels, Histogram] = {}
+
+    def observe(self, value: float, *labels: str):
+        histogram = self._values.get(labels)
+        if histogram is None:
+            histogram = self._values[labels] = Histogram(self.bounds)
+        histogram.observe(value)
+
+    def _render_values(self) -> List[str]:
+        lines = []
+        for labels, histogram in self._values.items():
+            bounds = [str(bound) for bound in histogram.bounds] + ["+Inf"]
+            for bound, count in zip(bounds, histogram.cumulative_counts()):
+                bound_label = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{self._format_labels(labels, bound_label)} {count}")
+            lines.append(f"{self.name}_sum{self._format_labels(labels)} {histogram.sum}")
+            lines.append(f"{self.name}_count{self._format_labels(labels)} {histogram.count}")
+        return lines
+
+
+class CollectedMetric(Metric):
+    """Values are read when metrics are exported, so it costs nothing to the code it describes."""
+
+    def __init__(self, name: str, description: str, collect: Callable[[], Dict[Labels, float]],
+                 label_names: Sequence[str] = (), metric_type: str = "gauge"):
+        super().__init__(name, description, label_names)
+        self.collect = collect
+        self.metric_type = metric_type
+
+    def _render_values(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(labels)} {value}" for labels, value in self.collect().items()]
+
+
+class Metrics:
+    """Registry of exported metrics, rendered in Prometheus text format."""
+    _registry: List[Metric] = []
+
+    @classmethod
+    def counter(cls, name: str, description: str, label_names: Sequence[str] = ()) -> Counter:
+        return cls._register(Counter(name, description, label_names))
+
+    @classmethod
+    def histogram(cls, name: str, description: str, label_names: Sequence[str] = ()) -> HistogramMetric:
+        return cls._register(HistogramMetric(name, description, label_names))
+
+    @classmethod
+    def collected(cls, name: str, description: str, collect: Callable[[], Dict[Labels, float]],
+                  label_names: Sequence[str] = (), metric_type: str = "gauge") -> CollectedMetric:
+        """collect returns values by labels tuple, use an empty tuple without labels."""
+        return cls._register(CollectedMetric(name, description, collect, label_names, metric_type))
+
+    @classmethod
+    def render(cls) -> str:
+        lines = []
+        for metric in cls._registry:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def escape(value: str) -> str:
+        return str(value).replace("\\", r"\\").replace("\"", r"\"").replace("\n", r"\n")
+
+    @classmethod
+    def _register(cls, metric):
+        cls._registry.append(metric)
+        return metric
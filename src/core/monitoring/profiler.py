@@ -0,0 +1,41 @@
+import asyncio
+import cProfile
+import io
+import pstats
+
+
+class LiveProfiler:
+    """Profiles the running bot for a while, without restart.
+    cProfile only sees the thread it's enabled in: here the event loop one, where events are handled
+    (DB requests of message hook lookups, run in executor threads, aren't included).
+    """
+    _running = False
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._running
+
+    @classmethod
+    async def profile(cls, duration: float, top_count: int = 50) -> str:
+        """Returns top functions by cumulative time, as printed by pstats."""
+        if cls._running:
+            raise RuntimeError("Profiler already running")
+
+        cls._running = True
+        profiler = cProfile.Profile()
+
+        try:
+            profiler.enable()
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                profiler.disable()
+        finally:
+            cls._running = False
+
+        report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=report)
+        stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_count)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(top_count)
+
+        return report.getvalue()
@@ -0,0 +1,97 @@
+import time
+import types
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, Dict, Coroutine, Any, List
+
+from core.monitoring.histogram import RollingHistogram
+from core.utils.clock import Clock
+
+
+@dataclass
+class SlowCallback:
+    name: str
+    duration: float
+    timestamp: float
+
+
+class SlowCallbackMonitor:
+    """Records code running on the event loop for longer than a threshold without giving control back,
+    with the name of the command or hook that ran it.
+    """
+    _threshold = 0.05
+    _MAX_RECORDS = 50
+
+    _records: Deque[SlowCallback] = deque(maxlen=_MAX_RECORDS)
+    _counts: Dict[str, int] = {}
+    _histogram = RollingHistogram()
+
+    @classmethod
+    def configure(cls, threshold: float):
+        cls._threshold = threshold
+
+    @classmethod
+    @contextmanager
+    def measure(cls, name: str):
+        """For synchronous code."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.record(name, time.perf_counter() - start_time)
+
+    @classmethod
+    @types.coroutine
+    def timed(cls, coro: Coroutine, name: str):
+        """Awaits coro and measures each of its steps: a step is what runs between two suspensions,
+        so it's the time the coroutine blocks the event loop.
+        """
+        send_value = None
+        error = None
+
+        while True:
+            start_time = time.perf_counter()
+            try:
+                if error is None:
+                    awaited = coro.send(send_value)
+                else:
+                    awaited = coro.throw(error)
+            except StopIteration as stop:
+                cls.record(name, time.perf_counter() - start_time)
+                return stop.value
+            except BaseException:
+                cls.record(name, time.perf_counter() - start_time)
+                raise
+
+            cls.record(name, time.perf_counter() - start_time)
+
+            try:
+                send_value = yield awaited
+                error = None
+            except BaseException as e:
+                send_value = None
+                error = e
+
+    @classmethod
+    def record(cls, name: str, duration: float):
+        cls._histogram.observe(duration)
+
+        if duration >= cls._threshold:
+            cls._records.append(SlowCallback(name, duration, Clock.wall_time()))
+            cls._counts[name] = cls._counts.get(name, 0) + 1
+
+    @classmethod
+    def get_records(cls) -> List[SlowCallback]:
+        return list(cls._records)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        histogram = cls._histogram.get_histogram()
+        return {
+            "threshold": cls._threshold,
+            "slow_counts": cls._counts.copy(),
+            "step_p50": histogram.percentile(50),
+            "step_p99": histogram.percentile(99),
+            "step_max": histogram.max,
+        }
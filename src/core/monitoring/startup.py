@@ -0,0 +1,30 @@
+import time
+from typing import List, Tuple
+
+
+class StartupTimer:
+    """Durations of startup phases, from the import of this module (first one of TuinBot.py) to ready."""
+    _last_time = time.perf_counter()
+    _phases: List[Tuple[str, float]] = []
+    _is_reported = False
+
+    @classmethod
+    def mark(cls, phase: str):
+        """Ends phase, started at previous mark."""
+        now = time.perf_counter()
+        cls._phases.append((phase, now - cls._last_time))
+        cls._last_time = now
+
+    @classmethod
+    def phases(cls) -> List[Tuple[str, float]]:
+        return cls._phases
+
+    @classmethod
+    def report(cls):
+        """Printed once, reconnections don't start the bot again."""
+        if cls._is_reported:
+            return
+        cls._is_reported = True
+
+        print("Startup in %.2f s: %s" % (sum(duration for _, duration in cls._phases),
+                                         ", ".join("%s %.2f s" % phase for phase in cls._phases)))
@@ -0,0 +1,171 @@
+import functools
+import json
+import random
+import threading
+import time
+from contextvars import ContextVar, Token
+from typing import Optional, Dict, Any, List, Coroutine, Union
+
+from core.utils.clock import Clock
+
+
+class Span:
+    """Timed step of an event handling, exported when it ends.
+    Used as a context manager, it becomes the parent of spans created inside.
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "_start_time", "_start_perf", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self._start_time = Clock.wall_time()
+        self._start_perf = time.perf_counter()
+        self._token: Optional[Token] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self):
+        Tracer.export({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self._start_time,
+            "duration_ms": (time.perf_counter() - self._start_perf) * 1000,
+            "attributes": self.attributes,
+        })
+
+    def __enter__(self) -> "Span":
+        self._token = Tracer.current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Tracer.current.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.end()
+        return False
+
+
+class _NullSpan:
+    """Returned when event isn't traced, so callers don't check."""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+AnySpan = Union[Span, _NullSpan]
+
+
+class Tracer:
+    """Spans of traced events, written to a JSONL file (one span per line) to be aggregated offline.
+    Only root spans are sampled: a span is created only inside a traced event, so untraced code
+    pays a ContextVar lookup.
+    """
+    NULL_SPAN = _NullSpan()
+    _FLUSH_SIZE = 100
+
+    current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+    _file_path: Optional[str] = None
+    _sample_rate = 1.0
+    # Spans also end in executor threads (DB requests).
+    _lock = threading.Lock()
+    _buffer: List[str] = []
+
+    @classmethod
+    def configure(cls, file_path: Optional[str], sample_rate: float = 1.0):
+        """Tracing is disabled without file_path."""
+        cls._file_path = file_path or None
+        cls._sample_rate = sample_rate
+
+    @classmethod
+    def start_trace(cls, name: str, **attributes) -> AnySpan:
+        """Root span of an event, not made current: use it as a context manager where the event is handled."""
+        if cls._file_path is None or random.random() >= cls._sample_rate:
+            return cls.NULL_SPAN
+
+        return Span(name, "%032x" % random.getrandbits(128), None, attributes)
+
+    @classmethod
+    def span(cls, name: str, **attributes) -> AnySpan:
+        """Child of current span."""
+        return cls.child_span(cls.current.get(), name, **attributes)
+
+    @classmethod
+    def child_span(cls, parent: Optional[Span], name: str, **attributes) -> AnySpan:
+        """For work done outside of parent context (e.g. queued API calls)."""
+        if parent is None:
+            return cls.NULL_SPAN
+
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+
+    @classmethod
+    async def run(cls, span: AnySpan, coro: Coroutine):
+        with span:
+            return await coro
+
+    @classmethod
+    def trace_methods(cls, traced_class: type) -> type:
+        """Class decorator: a span for each static and class method."""
+        for attr_name, attr in list(vars(traced_class).items()):
+            if attr_name.startswith("__") or not isinstance(attr, (staticmethod, classmethod)):
+                continue
+
+            wrapped = cls._traced(attr.__func__, "%s.%s" % (traced_class.__name__, attr_name))
+            setattr(traced_class, attr_name, type(attr)(wrapped))
+
+        return traced_class
+
+    @classmethod
+    def export(cls, record: Dict[str, Any]):
+        line = json.dumps(record, default=str)
+
+        with cls._lock:
+            cls._buffer.append(line)
+            if len(cls._buffer) >= cls._FLUSH_SIZE:
+                cls._flush_locked()
+
+    @classmethod
+    def flush(cls):
+        with cls._lock:
+            cls._flush_locked()
+
+    @classmethod
+    def _flush_locked(cls):
+        if not cls._buffer or cls._file_path is None:
+            return
+
+        try:
+            with open(cls._file_path, "a", encoding="utf-8") as trace_file:
+                trace_file.write("\n".join(cls._buffer) + "\n")
+        except OSError as e:
+            print("Can't write traces: %s" % e)
+
+        cls._buffer.clear()
+
+    @classmethod
+    def _traced(cls, func, span_name: str):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            parent = cls.current.get()
+            if parent is None:
+                return func(*args, **kwargs)
+
+            with Span(span_name, parent.trace_id, parent.span_id, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
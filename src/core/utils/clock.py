@@ -0,0 +1,19 @@
+import time
+from typing import Callable
+
+
+class Clock:
+    """Time source of everything depending on delays (deletions, rate limits, caches, rolling stats),
+    so a simulation can replace it with a virtual clock. Durations measurements keep time.perf_counter.
+    """
+    monotonic: Callable[[], float] = staticmethod(time.monotonic)
+    wall_time: Callable[[], float] = staticmethod(time.time)
+
+    @classmethod
+    def set_source(cls, monotonic: Callable[[], float], wall_time: Callable[[], float]):
+        cls.monotonic = staticmethod(monotonic)
+        cls.wall_time = staticmethod(wall_time)
+
+    @classmethod
+    def reset(cls):
+        cls.set_source(time.monotonic, time.time)
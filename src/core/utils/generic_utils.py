@@ -1,9 +1,12 @@
+from functools import lru_cache
 from typing import get_args, Union, get_origin
 
 
 class GenericUtils:
 
     @staticmethod
+    # Syntax validation asks for the same executors and configs classes many times.
+    @lru_cache(maxsize=None)
     def get_generic_param_type(clazz: type, parent_level: int, param_index: int) -> type:
         # noinspection PyUnresolvedReferences
         param_type = get_args(clazz.__orig_bases__[parent_level])[param_index]
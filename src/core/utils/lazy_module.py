@@ -0,0 +1,34 @@
+import importlib
+import threading
+from types import ModuleType
+from typing import List
+
+
+class LazyModule:
+    """Module imported on first attribute access, for dependencies only used by some commands.
+    preload() imports all of them in a thread while the bot connects, so the first command doesn't wait.
+    """
+    _instances: List["LazyModule"] = []
+    _import_lock = threading.Lock()
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        LazyModule._instances.append(self)
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    @classmethod
+    def preload(cls):
+        """Blocking, run in executor."""
+        for instance in cls._instances:
+            instance._load()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            # Executor threads can load the same module.
+            with self._import_lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
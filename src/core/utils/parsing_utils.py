@@ -3,11 +3,14 @@ from dataclasses import dataclass
 from typing import List
 
 from discord import User, Client
-from emoji import emoji_lis
-from unidecode import unidecode
 
+from core.utils.lazy_module import LazyModule
 from core.utils.utils import Utils
 
+# Only needed by user search and reaction commands.
+_emoji = LazyModule("emoji")
+_unidecode = LazyModule("unidecode")
+
 
 @dataclass
 class LinkExtract:
@@ -26,7 +29,7 @@ class ParsingUtils:
         But smarter cause it checks pertinence.
         """
 
-        name_part = unidecode(name_part.lower())
+        name_part = _unidecode.unidecode(name_part.lower())
         """ Ordre d'importance :
         * Est le display name
         * Pseudo démarre avec la recherche
@@ -39,8 +42,8 @@ class ParsingUtils:
             if user.bot:
                 continue
 
-            display_name = unidecode(user.display_name.lower())
-            username = unidecode(user.name.lower())
+            display_name = _unidecode.unidecode(user.display_name.lower())
+            username = _unidecode.unidecode(user.name.lower())
 
             match = None
             names_comparaison = []
@@ -96,7 +99,7 @@ class ParsingUtils:
 
     @staticmethod
     def get_emoji(text: str, client: Client) -> [str, None]:
-        emojis = emoji_lis(text, "en")
+        emojis = _emoji.emoji_lis(text, "en")
 
         if emojis:
             return emojis[0]["emoji"]
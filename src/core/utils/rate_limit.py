@@ -0,0 +1,45 @@
+from core.utils.clock import Clock
+
+
+class TokenBucket:
+    """Classic token bucket: holds at most `capacity` tokens, refilled at `refill_rate` tokens per second."""
+
+    def __init__(self, capacity: float, refill_rate: float):
+        if capacity <= 0 or refill_rate <= 0:
+            raise ValueError("Capacity and refill rate must be positive!")
+
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = capacity
+        self._updated = Clock.monotonic()
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        self._refill()
+
+        if self._tokens < tokens:
+            return False
+
+        self._tokens -= tokens
+        return True
+
+    def time_until_available(self, tokens: float = 1) -> float:
+        """Seconds to wait before try_acquire(tokens) can succeed."""
+        self._refill()
+
+        if self._tokens >= tokens:
+            return 0
+        return (tokens - self._tokens) / self.refill_rate
+
+    def is_full(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity
+
+    def drain(self):
+        """Empties the bucket, e.g. when the remote side told us we went too fast."""
+        self._refill()
+        self._tokens = 0
+
+    def _refill(self):
+        now = Clock.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
@@ -0,0 +1,51 @@
+from collections import OrderedDict
+from typing import TypeVar, Generic, Hashable, Optional, Tuple, Callable
+
+from core.utils.clock import Clock
+
+CachedType = TypeVar('CachedType')
+
+
+class TtlCache(Generic[CachedType]):
+    """Entries expire `ttl` seconds after being set. When `max_size` is reached, the oldest entry is dropped."""
+
+    def __init__(self, ttl: float, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, Tuple[float, CachedType]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[CachedType] = None) -> Optional[CachedType]:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return default
+
+        if entry[0] <= Clock.monotonic():
+            del self._entries[key]
+            return default
+
+        return entry[1]
+
+    def set(self, key: Hashable, value: CachedType):
+        self._entries[key] = (Clock.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def invalidate_matching(self, predicate: Callable[[Hashable], bool]):
+        """Scans all entries, for rare invalidations of a group of keys."""
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
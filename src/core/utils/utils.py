@@ -1,5 +1,5 @@
 from operator import attrgetter
-from typing import Tuple, List
+from typing import Tuple, List, Iterable
 
 
 class Utils:
@@ -11,3 +11,8 @@ class Utils:
                 key = attrgetter(key)
             list_to_sort.sort(key=key, reverse=reverse)
         return list_to_sort
+
+    @staticmethod
+    def chunks(items: List, size: int) -> Iterable[List]:
+        for index in range(0, len(items), size):
+            yield items[index:index + size]
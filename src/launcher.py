@@ -0,0 +1,12 @@
+import asyncio
+
+from core.cluster.launcher import Launcher
+from core.data.properties import AppProperties
+
+AppProperties.load("../data/bot.properties")
+
+asyncio.run(Launcher.run(AppProperties.workers(),
+                         AppProperties.shard_count(),
+                         AppProperties.coordinator_port(),
+                         AppProperties.metrics_port(),
+                         AppProperties.bot_token()))
@@ -0,0 +1,100 @@
+import asyncio
+import itertools
+from datetime import datetime
+from typing import List, Coroutine, Any
+
+from benchmark.fakes import FakeGuild, FakeTextChannel, FakeMember, FakeMessage, FakeClient, FakeApi, ApiCall
+from benchmark.memory_db import InMemoryDb
+from benchmark.throughput import setup_bot
+from core.client.deletion import DeletionScheduler
+from core.client.outbound import OutboundQueue
+from core.command.manager import CommandManager
+from core.command.rate_limit import CommandRateLimiter
+from core.utils.clock import Clock
+from simulation.loop import VirtualClock, VirtualTimeEventLoop, SynchronousExecutor
+
+# 2024-01-01 00:00 UTC, messages have realistic snowflakes.
+_START_WALL_TIME = 1704067200.0
+
+# Real limits, benchmark setup_bot removes them.
+_COMMAND_LIMITS = (CommandRateLimiter._user_limit, CommandRateLimiter._guild_limit, CommandRateLimiter._command_limit)
+_CHANNEL_LIMITS = dict(OutboundQueue._CHANNEL_LIMITS)
+_GLOBAL_LIMITS = dict(OutboundQueue._GLOBAL_LIMITS)
+
+
+class Simulation:
+    """The bot on fake Discord objects and in-memory storage, in virtual time.
+
+    Rate limits are the real ones (commands and Discord routes), DB entries are consumed like in the real DB.
+    Each scenario should use its own channels and members: state (rate limits, caches) is kept between them.
+    Every API call is recorded with its virtual time in `api_calls`.
+    """
+
+    def __init__(self, start_wall_time: float = _START_WALL_TIME):
+        self.clock = VirtualClock(start_wall_time)
+        self.loop = VirtualTimeEventLoop(self.clock)
+        self.loop.set_default_executor(SynchronousExecutor())
+        Clock.set_source(self.clock.monotonic, self.clock.wall_time)
+
+        setup_bot()
+        CommandRateLimiter.configure(*_COMMAND_LIMITS)
+        OutboundQueue._CHANNEL_LIMITS.update(_CHANNEL_LIMITS)
+        OutboundQueue._GLOBAL_LIMITS.update(_GLOBAL_LIMITS)
+        OutboundQueue._channel_buckets.clear()
+        OutboundQueue._route_buckets.clear()
+
+        InMemoryDb.install(consume=True)
+        InMemoryDb.clear()
+        FakeApi.reset(record=True)
+
+        self.guild = FakeGuild(1)
+        self.guild.me = self.guild.add_member(1000, "TuinBot", bot=True)
+        self.client = FakeClient(self.guild)
+        self._ids = itertools.count(2000)
+
+        self.run(self._start())
+
+    async def _start(self):
+        DeletionScheduler.start(self.client)
+
+    def run(self, coro: Coroutine) -> Any:
+        return self.loop.run_until_complete(coro)
+
+    def close(self):
+        self.loop.close()
+        Clock.reset()
+
+    @property
+    def now(self) -> float:
+        """Virtual seconds since simulation start."""
+        return self.clock.now
+
+    def channel(self) -> FakeTextChannel:
+        channel = FakeTextChannel(next(self._ids), self.guild)
+        self.guild.channels.append(channel)
+        self.client._channels[channel.id] = channel
+        return channel
+
+    def member(self, name: str = None) -> FakeMember:
+        member_id = next(self._ids)
+        return self.guild.add_member(member_id, name or "tuin%s" % member_id)
+
+    def message(self, channel: FakeTextChannel, author: FakeMember, content: str) -> FakeMessage:
+        """Handles the message like on_message, without waiting for its replies (see advance)."""
+        message = FakeMessage(channel, author, content)
+        self.run(CommandManager.manage_message(message, self.client))
+        return message
+
+    def typing(self, channel: FakeTextChannel, member: FakeMember):
+        self.run(CommandManager.manage_typing(channel, member, datetime.fromtimestamp(Clock.wall_time())))
+
+    def advance(self, seconds: float):
+        """Lets the bot run for this virtual time: queued API calls, deletions..."""
+        self.run(asyncio.sleep(seconds))
+
+    def api_calls(self, method: str = None, channel: FakeTextChannel = None,
+                  since: float = None) -> List[ApiCall]:
+        return [call for call in FakeApi.records
+                if (method is None or call.method == method)
+                and (channel is None or call.channel_id == channel.id)
+                and (since is None or call.time >= since)]
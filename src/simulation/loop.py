@@ -0,0 +1,88 @@
+import asyncio
+import selectors
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+
+class VirtualClock:
+    """Time only moves when the event loop has nothing to do until its next timer."""
+
+    def __init__(self, start_wall_time: float):
+        self.start_wall_time = start_wall_time
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def wall_time(self) -> float:
+        return self.start_wall_time + self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    """Polls real file descriptors (the loop self-pipe) without waiting: instead of blocking
+    until the next timer, virtual time jumps to it.
+    """
+
+    def __init__(self, clock: VirtualClock):
+        self._clock = clock
+        self._selector = selectors.DefaultSelector()
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events:
+            return events
+
+        if timeout is None:
+            raise RuntimeError("Simulation stalled: nothing scheduled and nothing to wait for")
+
+        self._clock.advance(timeout)
+        return []
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self):
+        self._selector.close()
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """Event loop whose time is a VirtualClock: sleeps and timeouts take no real time,
+    and the order of callbacks only depends on the simulated code.
+    """
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__(_VirtualSelector(clock))
+        self._clock = clock
+
+    def time(self) -> float:
+        return self._clock.now
+
+
+class SynchronousExecutor(ThreadPoolExecutor):
+    """Runs run_in_executor calls (DB requests) right away, in the loop thread: a thread would run
+    in real time, so virtual time would jump while it works.
+    A ThreadPoolExecutor only because the loop default executor must be one, no thread is started.
+    """
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        pass
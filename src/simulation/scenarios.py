@@ -0,0 +1,214 @@
+"""Delayed behaviors of the bot checked in virtual time: reply deletions, hook shots, rate limits, caches.
+Hours of bot activity take a few seconds, and runs are deterministic.
+
+Run from src directory:
+    python -m simulation.scenarios
+    python -m simulation.scenarios --hours 24 --seed 7
+"""
+import argparse
+import random
+import sys
+import time
+from typing import List, Callable, Tuple
+
+from application.database.db_reaction import AutoReac
+from application.database.db_typing_mess import TypingMessage
+from benchmark.fakes import FakeMessage, ApiCall
+from benchmark.memory_db import InMemoryDb
+from core.client.deletion import DeletionScheduler
+from core.command.base import BaseCommand
+from core.command.manager import CommandManager
+from simulation.harness import Simulation
+
+# Float sums of virtual time.
+_TOLERANCE = 1e-3
+_NO_MEMO = "Tu n'as aucun mémo"
+
+
+def _check(condition: bool, error: str, *args):
+    if not condition:
+        raise AssertionError(error % args)
+
+
+def _check_deleted_with_reply(sim: Simulation, command: FakeMessage, reply: ApiCall, delay: float):
+    deletions = [call for call in sim.api_calls("delete_messages", command.channel) if command.id in call.detail]
+    _check(len(deletions) == 1, "command %s deleted %s times", command.content, len(deletions))
+    deletion = deletions[0]
+
+    _check(deletion.detail == sorted((command.id, reply.message_id)),
+           "command %s and its reply should be deleted together, got %s", command.content, deletion.detail)
+    _check(abs(deletion.time - (reply.time + delay)) < _TOLERANCE,
+           "command %s deleted at %.3f, expected %.3f", command.content, deletion.time, reply.time + delay)
+
+
+def scenario_reply_deletion_delays(sim: Simulation):
+    """Replies and commands are deleted together, after a delay depending on the reply kind."""
+    for content, delay in (("!memo list", BaseCommand._delete_delay),
+                           ("!memo inconnu", BaseCommand._delete_delay_error),
+                           ("!memo", BaseCommand._delete_delay_help)):
+        channel = sim.channel()
+        command = sim.message(channel, sim.member(), content)
+        sim.advance(delay - 1)
+
+        replies = sim.api_calls("reply", channel)
+        _check(len(replies) == 1, "%s: expected 1 reply, got %s", content, len(replies))
+        _check(not sim.api_calls("delete_messages", channel), "%s: deleted before its delay", content)
+
+        sim.advance(2)
+        _check_deleted_with_reply(sim, command, replies[0], delay)
+
+
+def scenario_reaction_shots(sim: Simulation):
+    """A reaction with 3 shots is added under the next 3 messages of its target only."""
+    channel = sim.channel()
+    target = sim.member()
+    key = (sim.guild.id, channel.id, target.id)
+    InMemoryDb.reactions[key] = [AutoReac("👍", sim.member().id)]
+    InMemoryDb.reaction_shots[(key, "👍")] = 3
+
+    messages = []
+    for _ in range(5):
+        messages.append(sim.message(channel, target, "salut"))
+        sim.advance(10)
+
+    reactions = sim.api_calls("add_reaction", channel)
+    _check([call.message_id for call in reactions] == [message.id for message in messages[:3]],
+           "reactions expected on the 3 first messages, got %s calls", len(reactions))
+    _check(key not in InMemoryDb.reactions, "reaction should be removed after its last shot")
+
+
+def scenario_typing_message_once(sim: Simulation):
+    """A typing message is sent once, then typing events of its target are ignored for a while."""
+    channel = sim.channel()
+    target = sim.member()
+    InMemoryDb.typing_messages[(sim.guild.id, channel.id, target.id)] = [TypingMessage("tu tapes quoi ?",
+                                                                                       sim.member().id)]
+
+    for _ in range(3):
+        sim.typing(channel, target)
+        sim.advance(10)
+
+    sends = sim.api_calls("send", channel)
+    _check(len(sends) == 1, "expected 1 typing message, got %s", len(sends))
+
+
+def scenario_command_rate_limit(sim: Simulation):
+    """4 uses of a command per 30 s by user, then one throttle notice, then commands are ignored until refill."""
+    channel = sim.channel()
+    member = sim.member()
+
+    for _ in range(6):
+        sim.message(channel, member, "!memo list")
+    sim.advance(1)
+
+    replies = sim.api_calls("reply", channel)
+    answers = [call for call in replies if call.detail.startswith(_NO_MEMO)]
+    _check(len(answers) == 4, "expected 4 answered commands, got %s", len(answers))
+    _check(len(replies) == 5, "expected 4 answers and 1 throttle notice, got %s replies", len(replies))
+
+    sim.message(channel, member, "!memo list")
+    sim.advance(1)
+    _check(len(sim.api_calls("reply", channel)) == 5, "throttled user should be notified only once")
+
+    # One token every 7.5 s.
+    sim.advance(6)
+    since = sim.now
+    sim.message(channel, member, "!memo list")
+    sim.advance(1)
+    _check([call.detail.startswith(_NO_MEMO) for call in sim.api_calls("reply", channel, since)] == [True],
+           "command should be allowed again after refill")
+
+
+def scenario_idle_typing_cache(sim: Simulation):
+    """Typing events of a user without typing message are checked once per cache TTL."""
+    channel = sim.channel()
+    member = sim.member()
+    ttl = CommandManager._idle_typing_targets.ttl
+
+    query_count = InMemoryDb.query_count
+    for _ in range(int(ttl / 10)):
+        sim.typing(channel, member)
+        sim.advance(10)
+    _check(InMemoryDb.query_count - query_count == 1, "expected 1 query during TTL, got %s",
+           InMemoryDb.query_count - query_count)
+
+    sim.typing(channel, member)
+    _check(InMemoryDb.query_count - query_count == 2, "expected a new query after TTL")
+
+
+def scenario_hours_of_activity(sim: Simulation, hours: float, seed: int):
+    """Random chat and commands: every reply is deleted with its command, after one of the reply delays."""
+    rng = random.Random(seed)
+    channels = [sim.channel() for _ in range(5)]
+    members = [sim.member() for _ in range(30)]
+    contents = ["salut", "quelqu'un ?", "!memo list", "!memo inconnu", "!memo"]
+    delays = {"!memo list": BaseCommand._delete_delay, "!memo inconnu": BaseCommand._delete_delay_error,
+              "!memo": BaseCommand._delete_delay_help}
+
+    commands: List[FakeMessage] = []
+    start_time = sim.now
+    end_time = start_time + hours * 3600
+    while sim.now < end_time:
+        sim.advance(rng.expovariate(1 / 20))
+        content = rng.choice(contents)
+        message = sim.message(rng.choice(channels), rng.choice(members), content)
+        if content in delays:
+            commands.append(message)
+
+    sim.advance(max(delays.values()) + 10)
+
+    replies = sim.api_calls("reply", since=start_time)
+    deletions = {message_id: call for call in sim.api_calls("delete_messages", since=start_time)
+                 for message_id in call.detail}
+    allowed_delays = set(delays.values()) | {BaseCommand._delete_delay_error}
+
+    for reply in replies:
+        deletion = deletions.get(reply.message_id)
+        _check(deletion is not None, "reply at %.3f not deleted", reply.time)
+        _check(any(abs(deletion.time - reply.time - delay) < _TOLERANCE for delay in allowed_delays),
+               "reply deleted after %.3f s", deletion.time - reply.time)
+
+    # Silently throttled commands have no reply and are not deleted.
+    deleted_commands = sum(1 for command in commands if command.id in deletions)
+    _check(deleted_commands == len(replies), "%s commands deleted for %s replies", deleted_commands, len(replies))
+    _check(DeletionScheduler.pending_count() == 0, "%s deletions still pending", DeletionScheduler.pending_count())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="TuinBot scenarios in virtual time.")
+    parser.add_argument("--hours", type=float, default=6, help="Virtual duration of the activity scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    scenarios: List[Tuple[str, Callable[[Simulation], None]]] = [
+        ("reply_deletion_delays", scenario_reply_deletion_delays),
+        ("reaction_shots", scenario_reaction_shots),
+        ("typing_message_once", scenario_typing_message_once),
+        ("command_rate_limit", scenario_command_rate_limit),
+        ("idle_typing_cache", scenario_idle_typing_cache),
+        ("hours_of_activity", lambda sim: scenario_hours_of_activity(sim, args.hours, args.seed)),
+    ]
+
+    sim = Simulation()
+    failures = 0
+    try:
+        for name, scenario in scenarios:
+            start_time = time.perf_counter()
+            virtual_start = sim.now
+            try:
+                scenario(sim)
+            except AssertionError as e:
+                failures += 1
+                print("FAIL %-25s %s" % (name, e))
+                continue
+
+            print("PASS %-25s %10.1f s virtual in %.2f s" % (name, sim.now - virtual_start,
+                                                             time.perf_counter() - start_time))
+    finally:
+        sim.close()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Run from src directory:
+    python -m unittest tests.test_hook_order
+"""
+import threading
+import unittest
+from typing import List, Optional
+
+from benchmark.fakes import FakeGuild, FakeTextChannel, FakeMessage
+from core.command.manager import CommandManager
+from core.command.repository import CommandRepository
+from core.command.types import HookType
+
+
+class _FakeHook:
+    """Message hook whose lookup waits for the lookups of all other hooks, so they must run concurrently."""
+    has_action = True
+    deletes_message = False
+
+    lookup_barrier: Optional[threading.Barrier] = None
+    executions: List[str] = []
+
+    @classmethod
+    def name(cls) -> str:
+        return cls.__name__
+
+    @staticmethod
+    def hook_type() -> HookType:
+        return HookType.MESSAGE
+
+    @staticmethod
+    def hook_is_cosmetic() -> bool:
+        return False
+
+    @classmethod
+    def has_message_hook_action(cls, message) -> bool:
+        # Raises BrokenBarrierError if lookups run one after the other.
+        _FakeHook.lookup_barrier.wait()
+        return cls.has_action
+
+    @classmethod
+    def execute_message_hook(cls, message) -> bool:
+        _FakeHook.executions.append(cls.name())
+        return cls.deletes_message
+
+
+class FirstHook(_FakeHook):
+    pass
+
+
+class IdleHook(_FakeHook):
+    has_action = False
+
+
+class DeletingHook(_FakeHook):
+    pass
+
+
+class LastHook(_FakeHook):
+    pass
+
+
+class HookOrderTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        guild = FakeGuild(1)
+        guild.me = guild.add_member(1000, "TuinBot", bot=True)
+        self.message = FakeMessage(FakeTextChannel(2000, guild), guild.add_member(3000, "tuin"), "salut")
+
+        hooks = [FirstHook, IdleHook, DeletingHook, LastHook]
+        _FakeHook.lookup_barrier = threading.Barrier(len(hooks), timeout=5)
+        _FakeHook.executions = []
+        DeletingHook.deletes_message = False
+        self._hooks = CommandRepository._hooks
+        CommandRepository._hooks = {HookType.MESSAGE: hooks}
+
+    def tearDown(self):
+        CommandRepository._hooks = self._hooks
+
+    async def test_hooks_applied_in_order(self):
+        await CommandManager._execute_message_hooks(self.message)
+
+        # Actions are applied in hooks order, without the hook having nothing to do.
+        self.assertEqual(["FirstHook", "DeletingHook", "LastHook"], _FakeHook.executions)
+
+    async def test_deleted_message_stops_next_hooks(self):
+        DeletingHook.deletes_message = True
+
+        await CommandManager._execute_message_hooks(self.message)
+
+        # LastHook found an action, but the message is gone.
+        self.assertEqual(["FirstHook", "DeletingHook"], _FakeHook.executions)
+
+
+if __name__ == "__main__":
+    unittest.main()